@@ -11,7 +11,12 @@ from dataclasses import dataclass, field
 from typing import Optional, List, Dict, Any
 
 from ..providers.llm import LLMClient, LLMError
-from ..utils.anonymizer import anonymize, deanonymize, display_anonymized_preview
+from ..utils.anonymizer import (
+    anonymize,
+    anonymize_obj,
+    deanonymize,
+    display_anonymized_preview,
+)
 from ..utils.web_search import search_all, format_results_for_llm
 from ..config import FixOsConfig
 from ..utils.timeout import SessionTimeout
@@ -167,7 +172,7 @@ class AutonomousSession:
 
     def _initialize_messages(self) -> None:
         """Initialize LLM message history with system prompt and diagnostics."""
-        anon_str, anon_report = anonymize(str(self.diagnostics))
+        anon_str, anon_report = anonymize_obj(self.diagnostics)
         if self.show_data:
             display_anonymized_preview(anon_str, anon_report)
 
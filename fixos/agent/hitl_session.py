@@ -7,7 +7,11 @@ import time
 from typing import Dict, Any, List, Tuple
 
 from ..providers.llm import LLMClient, LLMError
-from ..utils.anonymizer import anonymize, deanonymize, display_anonymized_preview
+from ..utils.anonymizer import (
+    anonymize_obj,
+    deanonymize,
+    display_anonymized_preview,
+)
 from ..utils.web_search import search_all, format_results_for_llm
 from ..config import FixOsConfig
 from ..platform_utils import (
@@ -70,7 +74,7 @@ class HITLSession:
 
     def _initialize_messages(self) -> bool:
         """Initialize LLM message history with system prompt and diagnostics."""
-        anon_str, report = anonymize(str(self.diagnostics))
+        anon_str, report = anonymize_obj(self.diagnostics)
 
         if self.show_data:
             display_anonymized_preview(anon_str, report)
@@ -41,9 +41,9 @@ def _collect_diagnostics(
         _run_disk_analysis(data, fmt=fmt, is_fix_mode=True)
 
     if output:
-        from fixos.utils.anonymizer import anonymize
+        from fixos.utils.anonymizer import anonymize_obj
 
-        anon_str, _ = anonymize(str(data))
+        anon_str, _ = anonymize_obj(data)
         try:
             Path(output).write_text(
                 json.dumps(
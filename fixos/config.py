@@ -8,7 +8,8 @@ from __future__ import annotations
 
 import os
 import sys
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 
@@ -171,6 +172,7 @@ class FixOsConfig:
     agent_mode: str = "hitl"  # hitl | autonomous
     session_timeout: int = TIMEOUT_3600
     max_auto_fixes: int = 10  # limit dla trybu autonomous
+    session_log_max: int = 10_000  # ile zdarzeń orkiestratora trzymać w pamięci
 
     # UI
     show_anonymized_data: bool = True  # Pokaż dane użytkownikowi przed wysłaniem
@@ -200,63 +202,21 @@ class FixOsConfig:
     ) -> "FixOsConfig":
         """Tworzy konfigurację z połączonych źródeł."""
         env_file = _load_env_files()
-        cfg = cls(env_file_loaded=env_file)
-
-        # Provider
-        cfg.provider = (provider or os.environ.get("LLM_PROVIDER", "gemini")).lower()
-
-        if cfg.provider not in PROVIDER_DEFAULTS:
-            print(
-                f"⚠️  Nieznany provider '{cfg.provider}', używam 'gemini'",
-                file=sys.stderr,
-            )
-            cfg.provider = "gemini"
-
-        pdef = PROVIDER_DEFAULTS[cfg.provider]
-
-        # API Key: argument CLI > env specyficzny dla providera > OPENAI_API_KEY (fallback)
-        key_env = pdef.get("key_env")
-        cfg.api_key = (
-            api_key
-            or (os.environ.get(key_env) if key_env else None)
-            or os.environ.get("API_KEY")
-            or os.environ.get("OPENAI_API_KEY")  # universal fallback
-        )
-
-        # Model
-        model_env_key = f"{cfg.provider.upper()}_MODEL"
-        cfg.model = model or os.environ.get(model_env_key) or pdef["model"]
-
-        # Base URL
-        url_env_key = f"{cfg.provider.upper()}_BASE_URL"
-        cfg.base_url = base_url or os.environ.get(url_env_key) or pdef["base_url"]
-
-        # Agent mode
-        cfg.agent_mode = (agent_mode or os.environ.get("AGENT_MODE", "hitl")).lower()
-
-        # Timeout
-        cfg.session_timeout = session_timeout or int(
-            os.environ.get("SESSION_TIMEOUT", "3600")
+        # Migawka env jest kluczem cache – zmiana zmiennych to nowy wpis
+        cfg = _load_cached(
+            cls,
+            tuple(sorted(os.environ.items())),
+            env_file,
+            provider,
+            api_key,
+            model,
+            base_url,
+            agent_mode,
+            session_timeout,
+            show_anonymized_data,
         )
-
-        # Show data
-        if show_anonymized_data is not None:
-            cfg.show_anonymized_data = show_anonymized_data
-        else:
-            val = os.environ.get("SHOW_ANONYMIZED_DATA", "true").lower()
-            cfg.show_anonymized_data = val not in ("false", "0", "no")
-
-        # Web search
-        val = os.environ.get("ENABLE_WEB_SEARCH", "true").lower()
-        cfg.enable_web_search = val not in ("false", "0", "no")
-        cfg.serpapi_key = os.environ.get("SERPAPI_KEY")
-
-        # Reports
-        val = os.environ.get("SAVE_REPORTS", "false").lower()
-        cfg.save_reports = val in ("true", "1", "yes")
-        cfg.reports_dir = Path(os.environ.get("REPORTS_DIR", "/tmp/fixos-reports"))
-
-        return cfg
+        # Kopia – wywołujący mogą modyfikować pola bez psucia cache
+        return replace(cfg)
 
     def validate(self) -> list[str]:
         """Zwraca listę błędów walidacji (pusta = OK)."""
@@ -295,6 +255,78 @@ class FixOsConfig:
         )
 
 
+@lru_cache(maxsize=32)
+def _load_cached(
+    cls: type[FixOsConfig],
+    env_items: tuple[tuple[str, str], ...],
+    env_file: Optional[str],
+    provider: Optional[str],
+    api_key: Optional[str],
+    model: Optional[str],
+    base_url: Optional[str],
+    agent_mode: Optional[str],
+    session_timeout: Optional[int],
+    show_anonymized_data: Optional[bool],
+) -> FixOsConfig:
+    """FixOsConfig.load() dla danej migawki środowiska – wynik zapamiętany."""
+    env = dict(env_items)
+    cfg = cls(env_file_loaded=env_file)
+
+    # Provider
+    cfg.provider = (provider or env.get("LLM_PROVIDER", "gemini")).lower()
+
+    if cfg.provider not in PROVIDER_DEFAULTS:
+        print(
+            f"⚠️  Nieznany provider '{cfg.provider}', używam 'gemini'",
+            file=sys.stderr,
+        )
+        cfg.provider = "gemini"
+
+    pdef = PROVIDER_DEFAULTS[cfg.provider]
+
+    # API Key: argument CLI > env specyficzny dla providera > OPENAI_API_KEY (fallback)
+    key_env = pdef.get("key_env")
+    cfg.api_key = (
+        api_key
+        or (env.get(key_env) if key_env else None)
+        or env.get("API_KEY")
+        or env.get("OPENAI_API_KEY")  # universal fallback
+    )
+
+    # Model
+    model_env_key = f"{cfg.provider.upper()}_MODEL"
+    cfg.model = model or env.get(model_env_key) or pdef["model"]
+
+    # Base URL
+    url_env_key = f"{cfg.provider.upper()}_BASE_URL"
+    cfg.base_url = base_url or env.get(url_env_key) or pdef["base_url"]
+
+    # Agent mode
+    cfg.agent_mode = (agent_mode or env.get("AGENT_MODE", "hitl")).lower()
+
+    # Timeout
+    cfg.session_timeout = session_timeout or int(env.get("SESSION_TIMEOUT", "3600"))
+
+    # Show data
+    if show_anonymized_data is not None:
+        cfg.show_anonymized_data = show_anonymized_data
+    else:
+        val = env.get("SHOW_ANONYMIZED_DATA", "true").lower()
+        cfg.show_anonymized_data = val not in ("false", "0", "no")
+
+    # Web search
+    val = env.get("ENABLE_WEB_SEARCH", "true").lower()
+    cfg.enable_web_search = val not in ("false", "0", "no")
+    cfg.serpapi_key = env.get("SERPAPI_KEY")
+
+    # Reports
+    val = env.get("SAVE_REPORTS", "false").lower()
+    cfg.save_reports = val in ("true", "1", "yes")
+    cfg.reports_dir = Path(env.get("REPORTS_DIR", "/tmp/fixos-reports"))
+
+    return cfg
+
+
 KEY_PREFIXES: list[tuple[str, str]] = [
     ("AIzaSy", "gemini"),
     ("sk-ant-", "anthropic"),
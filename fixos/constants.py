@@ -11,6 +11,10 @@ DEFAULT_COMMAND_TIMEOUT = 300  # Default command timeout in HITL session
 LONG_COMMAND_TIMEOUT = 1800  # Long-running operations like system updates
 FAST_COMMAND_TIMEOUT = 60  # Read-only and quick diagnostic commands
 DIAGNOSTIC_CMD_TIMEOUT = 20  # Timeout for quick diagnostic shell commands
+PROBE_TIMEOUT_SYSFS = 2  # cat /proc, /sys reads
+PROBE_TIMEOUT_SYSTEMCTL = 3  # systemctl queries (D-Bus round trip)
+PROBE_TIMEOUT_LOGS = 5  # journalctl / dmesg reads
+PROBE_TIMEOUT_PACKAGES = 15  # rpm / dnf / flatpak / snap queries
 
 # String lengths / limits
 MAX_COMMAND_LENGTH = 200  # Maximum length for command display
@@ -30,6 +34,8 @@ UI_BORDER_WIDTH = 65  # Border width for panels
 # Token/API limits
 DEFAULT_TOKEN_LIMIT = 2000  # Default token estimate
 MAX_WEB_SEARCH_COUNT = 5  # Maximum web searches per session
+WEB_SEARCH_CACHE_TTL = 3600  # Seconds a cached web search result stays fresh
+WEB_SEARCH_TARGET_RESULTS = 8  # search_all stops waiting once this many arrive
 
 # Service/process limits
 DEFAULT_HISTORY_LIMIT = 20  # Default history items to show
@@ -56,6 +62,7 @@ CACHE_SIZE_MEDIUM_MB = 100
 
 # Resource/Process limits
 MAX_TOP_PROCESSES = 10
+CPU_SAMPLE_INTERVAL = 0.3  # Seconds between cpu_percent() priming and reading
 MAX_AUTOSTART_SERVICES = 30
 MAX_USER_AUTOSTART = 20
 MAX_SLOW_SERVICES = 15
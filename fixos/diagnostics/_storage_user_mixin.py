@@ -314,13 +314,13 @@ class _UserAnalyzerMixin:
         min_size = min_size_mb * 1024 * 1024
 
         skip_names = {".git", ".cache", ".local", ".config", ".cargo", ".rustup"}
-        skip_paths = {os.path.expanduser("~/github"), os.path.expanduser("~/projects")}
+        skip_paths = (os.path.expanduser("~/github"), os.path.expanduser("~/projects"))
 
         try:
             for root, dirs, files in os.walk(path):
                 dirs[:] = [d for d in dirs if d not in skip_names]
 
-                if any(root.startswith(p) for p in skip_paths):
+                if root.startswith(skip_paths):
                     dirs[:] = []
                     continue
 
@@ -2,12 +2,12 @@
 Shared utilities for diagnostic check modules.
 """
 
+import os
 import subprocess
+from functools import lru_cache
+from pathlib import Path
 
-try:
-    import psutil
-except ModuleNotFoundError:  # pragma: no cover
-    psutil = None
+psutil = None  # imported on first use by _load_psutil()
 
 from ...platform_utils import (
     IS_LINUX as _IS_LINUX,
@@ -15,22 +15,83 @@ from ...platform_utils import (
     IS_MAC as _IS_MAC,
     SYSTEM as _SYSTEM,
 )
-from ...constants import DIAGNOSTIC_CMD_TIMEOUT
+from ...constants import (
+    DIAGNOSTIC_CMD_TIMEOUT,
+    PROBE_TIMEOUT_SYSFS,
+    PROBE_TIMEOUT_SYSTEMCTL,
+    PROBE_TIMEOUT_LOGS,
+    PROBE_TIMEOUT_PACKAGES,
+)
+
+# Command prefix -> timeout (s). First match wins. Only probe classes known to
+# answer quickly get a shorter timeout; everything unmatched (lspci, pactl,
+# systemd-analyze, filesystem scans...) keeps DIAGNOSTIC_CMD_TIMEOUT.
+_CMD_TIMEOUTS: dict[str, int] = {
+    "cat /proc/": PROBE_TIMEOUT_SYSFS,
+    "cat /sys/": PROBE_TIMEOUT_SYSFS,
+    "journalctl ": PROBE_TIMEOUT_LOGS,
+    "dmesg ": PROBE_TIMEOUT_LOGS,
+    "systemctl ": PROBE_TIMEOUT_SYSTEMCTL,
+    "dnf ": PROBE_TIMEOUT_PACKAGES,
+    "rpm ": PROBE_TIMEOUT_PACKAGES,
+    "flatpak ": PROBE_TIMEOUT_PACKAGES,
+    "snap ": PROBE_TIMEOUT_PACKAGES,
+    "brew ": PROBE_TIMEOUT_PACKAGES,
+    "powershell ": PROBE_TIMEOUT_PACKAGES,
+}
+
+
+def _load_psutil():
+    """Import psutil on first use and memoize it on this module.
+
+    Keeps the import cost off module load when only non-psutil checks
+    (audio, thumbnails, hardware, ...) are selected.
+    """
+    global psutil
+    if psutil is None:
+        try:
+            import psutil as _psutil
+        except ModuleNotFoundError:  # pragma: no cover
+            return None
+        psutil = _psutil
+    return psutil
 
 
 def _psutil_required() -> bool:
     """Check if psutil is available."""
-    return psutil is not None
+    return _load_psutil() is not None
+
+
+def _timeout_for(cmd: str) -> int:
+    """Pick a probe timeout from the command prefix."""
+    head = cmd.lstrip() + " "
+    for prefix, timeout in _CMD_TIMEOUTS.items():
+        if head.startswith(prefix):
+            return timeout
+    return DIAGNOSTIC_CMD_TIMEOUT
+
 
+def _cmd(cmd: str, timeout: int | None = None) -> str:
+    """Run a command and return output as string.
 
-def _cmd(cmd: str, timeout: int = DIAGNOSTIC_CMD_TIMEOUT) -> str:
-    """Run a command and return output as string."""
+    When ``timeout`` is omitted it is derived from the command class
+    (see ``_CMD_TIMEOUTS``) so a single hung probe cannot stall diagnostics.
+    """
+    if timeout is None:
+        timeout = _timeout_for(cmd)
     try:
+        # stdin=DEVNULL + close_fds=False keep the fork cheap (no fd sweep,
+        # no inherited tty); output is decoded once instead of via text=True.
         result = subprocess.run(
-            cmd, shell=True, capture_output=True, text=True, timeout=timeout
+            cmd,
+            shell=True,
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+            close_fds=False,
+            timeout=timeout,
         )
-        out = result.stdout.strip()
-        err = result.stderr.strip()
+        out = result.stdout.decode("utf-8", "replace").strip()
+        err = result.stderr.decode("utf-8", "replace").strip()
         combined = out
         if result.returncode != 0 and err:
             combined = f"{out}\n[ERR]: {err}" if out else f"[ERR]: {err}"
@@ -41,9 +102,157 @@ def _cmd(cmd: str, timeout: int = DIAGNOSTIC_CMD_TIMEOUT) -> str:
         return f"[WYJĄTEK: {e}]"
 
 
+@lru_cache(maxsize=1)
+def _dmesg() -> tuple[tuple[str | None, str], ...]:
+    """Read the kernel ring buffer once as ``(level, message)`` pairs.
+
+    Audio, system and resources checks all filter the same buffer, so it is
+    read a single time per diagnostics run; ``get_full_diagnostics`` clears
+    the cache before each run. Falls back to plain ``dmesg`` (level ``None``)
+    where ``--decode`` is unsupported, e.g. busybox.
+    """
+    for argv in (["dmesg", "--notime", "--decode"], ["dmesg"]):
+        try:
+            result = subprocess.run(
+                argv,
+                stdin=subprocess.DEVNULL,
+                capture_output=True,
+                close_fds=False,
+                timeout=PROBE_TIMEOUT_LOGS,
+            )
+        except (OSError, subprocess.TimeoutExpired):
+            return ()
+        if result.returncode != 0:
+            continue
+        lines = result.stdout.decode("utf-8", "replace").splitlines()
+        if argv[-1] != "--decode":
+            return tuple((None, line) for line in lines)
+        entries = []
+        for line in lines:
+            # "kern  :err   : message"
+            _facility, sep, rest = line.partition(":")
+            level, sep2, message = rest.partition(":")
+            if sep and sep2:
+                entries.append((level.strip(), message.strip()))
+            else:
+                entries.append(("", line))
+        return tuple(entries)
+    return ()
+
+
+def _dmesg_grep(
+    pattern,
+    tail: int,
+    levels: frozenset[str] | None = None,
+    empty: str = "(brak outputu)",
+) -> str:
+    """Filter cached dmesg by compiled ``pattern`` and/or level, keep last ``tail``."""
+    entries = _dmesg()
+    if levels is not None and entries and entries[0][0] is None:
+        # Plain dmesg carries no levels – let dmesg --level filter them itself
+        entries = tuple((None, line) for line in _dmesg_at_levels(levels))
+        levels = None
+    matched = [
+        message
+        for level, message in entries
+        if (levels is None or level in levels)
+        and (pattern is None or pattern.search(message))
+    ]
+    return "\n".join(matched[-tail:]) or empty
+
+
+def _dmesg_at_levels(levels: frozenset[str]) -> list[str]:
+    """``dmesg --level=...`` lines for systems where ``--decode`` is unavailable."""
+    try:
+        result = subprocess.run(
+            ["dmesg", f"--level={','.join(sorted(levels))}", "--notime"],
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+            close_fds=False,
+            timeout=PROBE_TIMEOUT_LOGS,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return []
+    if result.returncode != 0:
+        return []
+    return result.stdout.decode("utf-8", "replace").splitlines()
+
+
+@lru_cache(maxsize=1)
+def _systemctl_user_units() -> dict[str, dict[str, str]]:
+    """Map user service units to their load/active/sub state in one call.
+
+    Replaces per-service ``systemctl --user status`` probes (one fork and one
+    D-Bus handshake each); cleared by ``get_full_diagnostics`` like ``_dmesg``.
+    """
+    try:
+        result = subprocess.run(
+            [
+                "systemctl",
+                "--user",
+                "list-units",
+                "--all",
+                "--type=service",
+                "--no-legend",
+                "--no-pager",
+                "--plain",
+            ],
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+            close_fds=False,
+            timeout=PROBE_TIMEOUT_SYSTEMCTL,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return {}
+    units: dict[str, dict[str, str]] = {}
+    for line in result.stdout.decode("utf-8", "replace").splitlines():
+        parts = line.split(None, 4)
+        if len(parts) >= 4:
+            units[parts[0]] = {"load": parts[1], "active": parts[2], "sub": parts[3]}
+    return units
+
+
+def _user_service_status(unit: str, log_lines: int) -> str:
+    """One-line state of a user unit; failed units get their last journal lines."""
+    state = _systemctl_user_units().get(unit)
+    if state is None:
+        return f"{unit}: (not found)"
+    status = f"{unit}: {state['load']} {state['active']} ({state['sub']})"
+    if state["active"] == "failed":
+        log = _cmd(f"journalctl --user -u {unit} -n {log_lines} --no-pager 2>/dev/null")
+        status = f"{status}\n{log}"
+    return status
+
+
+def _du_and_count(root: Path, ext: str | None = None) -> tuple[int, int]:
+    """Total bytes and file count under ``root`` in one traversal.
+
+    Counts only files ending in ``ext`` when given (size covers all files).
+    Symlinks are not followed; unreadable entries are skipped like ``du``.
+    """
+    total = count = 0
+    stack = [os.fspath(root)]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        total += entry.stat(follow_symlinks=False).st_size
+                        if ext is None or entry.name.endswith(ext):
+                            count += 1
+                except OSError:
+                    continue
+    return total, count
+
+
 # Export platform constants
 IS_LINUX = _IS_LINUX
 IS_WINDOWS = _IS_WINDOWS
 IS_MAC = _IS_MAC
 SYSTEM = _SYSTEM
-psutil_module = psutil
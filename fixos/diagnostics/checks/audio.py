@@ -3,10 +3,13 @@ Audio diagnostics module.
 Checks ALSA, PipeWire, PulseAudio, SOF firmware.
 """
 
+import re
 from typing import Any
-from ._shared import _cmd
+from ._shared import _cmd, _dmesg_grep, _user_service_status
 from ...constants import MAX_AUDIO_STATUS_LINES, MAX_AUDIO_RESULTS
 
+_AUDIO_DMESG_RE = re.compile(r"(snd|audio|alsa|hda|sof|codec|speaker|mic|hdmi)", re.I)
+
 
 def diagnose_audio() -> dict[str, Any]:
     """
@@ -20,18 +23,16 @@ def diagnose_audio() -> dict[str, Any]:
     return {
         # System audio
         "pipewire_version": _cmd("pipewire --version 2>/dev/null | head -1"),
-        "pipewire_status": _cmd(
-            f"systemctl --user status pipewire.service --no-pager -l 2>/dev/null | head -{MAX_AUDIO_STATUS_LINES}"
-        ),
-        "pipewire_pulse_status": _cmd(
-            f"systemctl --user status pipewire-pulse.service --no-pager -l 2>/dev/null | head -{MAX_AUDIO_STATUS_LINES}"
+        "pipewire_status": _user_service_status(
+            "pipewire.service", MAX_AUDIO_STATUS_LINES
         ),
-        "wireplumber_status": _cmd(
-            f"systemctl --user status wireplumber.service --no-pager -l 2>/dev/null | head -{MAX_AUDIO_STATUS_LINES}"
+        "pipewire_pulse_status": _user_service_status(
+            "pipewire-pulse.service", MAX_AUDIO_STATUS_LINES
         ),
-        "pulseaudio_status": _cmd(
-            "systemctl --user status pulseaudio.service --no-pager 2>/dev/null | head -10"
+        "wireplumber_status": _user_service_status(
+            "wireplumber.service", MAX_AUDIO_STATUS_LINES
         ),
+        "pulseaudio_status": _user_service_status("pulseaudio.service", 10),
         # ALSA
         "alsa_cards": _cmd("cat /proc/asound/cards 2>/dev/null"),
         "alsa_devices": _cmd("aplay -l 2>/dev/null"),
@@ -53,9 +54,7 @@ def diagnose_audio() -> dict[str, Any]:
         "sof_modules": _cmd(
             "lsmod | grep -E '(sof|snd_hda|intel_sst|avs)' 2>/dev/null"
         ),
-        "kernel_audio_dmesg": _cmd(
-            f"dmesg | grep -iE '(snd|audio|alsa|hda|sof|codec|speaker|mic|hdmi)' | tail -{MAX_AUDIO_RESULTS}"
-        ),
+        "kernel_audio_dmesg": _dmesg_grep(_AUDIO_DMESG_RE, MAX_AUDIO_RESULTS),
         "hdaudio_codec": _cmd(
             f"cat /proc/asound/card*/codec* 2>/dev/null | grep -E '(Codec|Address|Vendor)' | head -{MAX_AUDIO_STATUS_LINES}"
         ),
@@ -3,14 +3,15 @@ Resources diagnostics module.
 Checks disk usage, memory, processes, autostart services.
 """
 
+import heapq
+import time
 from typing import Any
 from ._shared import (
     _cmd,
-    _psutil_required,
+    _load_psutil,
     IS_LINUX,
     IS_WINDOWS,
     IS_MAC,
-    psutil_module as psutil,
 )
 from ...constants import (
     MAX_TOP_PROCESSES,
@@ -19,8 +20,19 @@ from ...constants import (
     MAX_SLOW_SERVICES,
     MAX_NETWORK_INTERFACES,
     MIN_FILE_SIZE_MB,
+    CPU_SAMPLE_INTERVAL,
 )
 
+_PROC_ATTRS = [
+    "pid",
+    "name",
+    "cpu_percent",
+    "memory_percent",
+    "memory_info",
+    "status",
+    "username",
+]
+
 
 def diagnose_resources() -> dict[str, Any]:
     """
@@ -28,36 +40,41 @@ def diagnose_resources() -> dict[str, Any]:
     Sprawdza: dysk (co zajmuje miejsce), pamięć (co ją żre),
     procesy startujące automatycznie, usługi w tle.
     """
-    if not _psutil_required():
+    psutil = _load_psutil()
+    if psutil is None:
         return {
             "error": "psutil is required for resources diagnostics but is not installed",
         }
-    # Top procesów wg CPU i RAM
-    top_cpu: list[dict] = []
-    top_mem: list[dict] = []
-    for p in psutil.process_iter(
-        [
-            "pid",
-            "name",
-            "cpu_percent",
-            "memory_percent",
-            "memory_info",
-            "status",
-            "username",
-        ]
-    ):
+    vm = psutil.virtual_memory()
+    sw = psutil.swap_memory()
+    # Top procesów wg CPU i RAM. cpu_percent() na świeżym uchwycie zwraca 0.0,
+    # więc najpierw "zaczepiamy" pomiar, czekamy raz i dopiero wtedy czytamy.
+    primed = []
+    for p in psutil.process_iter():
+        try:
+            p.cpu_percent(None)
+            primed.append(p)
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+    time.sleep(CPU_SAMPLE_INTERVAL)
+
+    procs: list[dict] = []
+    for p in primed:
         try:
-            info = p.info
+            info = p.as_dict(attrs=_PROC_ATTRS)
             info["memory_mb"] = round(
                 (info.get("memory_info") or type("", (), {"rss": 0})()).rss / 1024**2, 1
             )
-            top_cpu.append(info)
-            top_mem.append(dict(info))
+            procs.append(info)
         except (psutil.NoSuchProcess, psutil.AccessDenied):
             pass
 
-    top_cpu.sort(key=lambda x: x.get("cpu_percent") or 0, reverse=True)
-    top_mem.sort(key=lambda x: x.get("memory_percent") or 0, reverse=True)
+    top_cpu = heapq.nlargest(
+        MAX_TOP_PROCESSES, procs, key=lambda x: x.get("cpu_percent") or 0
+    )
+    top_mem = heapq.nlargest(
+        MAX_TOP_PROCESSES, procs, key=lambda x: x.get("memory_percent") or 0
+    )
 
     result: dict[str, Any] = {
         "top_cpu_processes": [
@@ -68,7 +85,7 @@ def diagnose_resources() -> dict[str, Any]:
                 "mem_mb": p.get("memory_mb", 0),
                 "user": p.get("username", "?"),
             }
-            for p in top_cpu[:MAX_TOP_PROCESSES]
+            for p in top_cpu
         ],
         "top_mem_processes": [
             {
@@ -78,12 +95,12 @@ def diagnose_resources() -> dict[str, Any]:
                 "mem_mb": p.get("memory_mb", 0),
                 "user": p.get("username", "?"),
             }
-            for p in top_mem[:MAX_TOP_PROCESSES]
+            for p in top_mem
         ],
-        "total_processes": len(top_cpu),
-        "ram_available_gb": round(psutil.virtual_memory().available / 1024**3, 2),
-        "ram_used_percent": psutil.virtual_memory().percent,
-        "swap_used_percent": psutil.swap_memory().percent,
+        "total_processes": len(procs),
+        "ram_available_gb": round(vm.available / 1024**3, 2),
+        "ram_used_percent": vm.percent,
+        "swap_used_percent": sw.percent,
     }
 
     if IS_LINUX:
@@ -122,6 +139,7 @@ def diagnose_resources() -> dict[str, Any]:
                 ),
                 # Pamięć – szczegóły
                 "memory_details": _cmd("free -h 2>/dev/null"),
+                # journalctl -k, nie dmesg – bufor jądra bywa nieczytelny bez roota
                 "oom_events": _cmd(
                     "journalctl -k --no-pager -n 20 2>/dev/null | grep -i 'oom\\|killed process\\|out of memory' | tail -10 || echo 'Brak zdarzeń OOM'"
                 ),
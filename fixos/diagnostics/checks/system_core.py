@@ -3,17 +3,18 @@ System core diagnostics module.
 Checks CPU, RAM, disks, processes - cross-platform.
 """
 
+import heapq
 from datetime import datetime
 from typing import Any
 import platform
 
 from ._shared import (
     _cmd,
-    _psutil_required,
+    _dmesg_grep,
+    _load_psutil,
     IS_LINUX,
     IS_WINDOWS,
     IS_MAC,
-    psutil_module as psutil,
 )
 from ...constants import (
     MAX_PKG_HISTORY,
@@ -22,6 +23,8 @@ from ...constants import (
     MAX_TOP_PROCESSES,
 )
 
+_DMESG_ERROR_LEVELS = frozenset({"err", "crit", "emerg"})
+
 
 def _collect_os_info() -> tuple[str, str, str]:
     """Return (os_release, kernel, uptime) for the current platform."""
@@ -61,8 +64,8 @@ def _collect_platform_details() -> dict[str, Any]:
             "journal_errors_24h": _cmd(
                 f"journalctl -p err -n {MAX_LOG_ERRORS} --no-pager --since '24 hours ago' 2>/dev/null"
             ),
-            "dmesg_errors": _cmd(
-                f"dmesg --level=err,crit,emerg --notime 2>/dev/null | tail -{MAX_DMESG_ERRORS}"
+            "dmesg_errors": _dmesg_grep(
+                None, MAX_DMESG_ERRORS, levels=_DMESG_ERROR_LEVELS
             ),
             "selinux": _cmd("getenforce 2>/dev/null || echo 'N/A'"),
             "firewall": _cmd("firewall-cmd --state 2>/dev/null || echo 'N/A'"),
@@ -95,7 +98,8 @@ def _collect_platform_details() -> dict[str, Any]:
 
 def diagnose_system() -> dict[str, Any]:
     """System metrics – cross-platform: CPU, RAM, disks, processes."""
-    if not _psutil_required():
+    psutil = _load_psutil()
+    if psutil is None:
         return {
             "error": "psutil is required for system diagnostics but is not installed"
         }
@@ -124,7 +128,9 @@ def diagnose_system() -> dict[str, Any]:
             procs.append(p.info)
         except (psutil.NoSuchProcess, psutil.AccessDenied):
             pass
-    procs.sort(key=lambda x: x.get("cpu_percent", 0), reverse=True)
+    top_procs = heapq.nlargest(
+        MAX_TOP_PROCESSES, procs, key=lambda x: x.get("cpu_percent") or 0
+    )
 
     os_release, kernel, uptime = _collect_os_info()
 
@@ -141,7 +147,7 @@ def diagnose_system() -> dict[str, Any]:
         "ram_used_percent": vm.percent,
         "swap_used_percent": sw.percent,
         "disks": disks,
-        "top_processes": procs[:MAX_TOP_PROCESSES],
+        "top_processes": top_procs,
     }
 
     if IS_LINUX or IS_MAC:
@@ -3,8 +3,10 @@ Thumbnails diagnostics module.
 Checks file preview functionality in file managers.
 """
 
+from pathlib import Path
 from typing import Any
-from ._shared import _cmd
+from ._shared import _cmd, _du_and_count
+from ..utils import format_size
 
 
 def diagnose_thumbnails() -> dict[str, Any]:
@@ -17,6 +19,12 @@ def diagnose_thumbnails() -> dict[str, Any]:
     - Brak codec-ów GStreamer
     - Brakujące uprawnienia ~/.cache/thumbnails
     """
+    cache_dir = Path.home() / ".cache" / "thumbnails"
+    if cache_dir.is_dir():
+        cache_bytes, cache_count = _du_and_count(cache_dir, ".png")
+        cache_size = f"{format_size(cache_bytes)}\t{cache_dir}"
+    else:
+        cache_size, cache_count = "brak cache", 0
     return {
         # Desktop Environment / File manager
         "desktop_env": _cmd("echo $XDG_CURRENT_DESKTOP 2>/dev/null || echo 'nieznane'"),
@@ -36,12 +44,8 @@ def diagnose_thumbnails() -> dict[str, Any]:
         "thumbnailer_configs": _cmd("ls /usr/share/thumbnailers/ 2>/dev/null"),
         "local_thumbnailers": _cmd("ls ~/.local/share/thumbnailers/ 2>/dev/null"),
         # Cache stanu
-        "thumbnail_cache_size": _cmd(
-            "du -sh ~/.cache/thumbnails/ 2>/dev/null || echo 'brak cache'"
-        ),
-        "thumbnail_cache_count": _cmd(
-            "find ~/.cache/thumbnails/ -name '*.png' 2>/dev/null | wc -l"
-        ),
+        "thumbnail_cache_size": cache_size,
+        "thumbnail_cache_count": str(cache_count),
         "thumbnail_cache_perms": _cmd("ls -la ~/.cache/ 2>/dev/null | grep thumb"),
         "thumbnail_fail_files": _cmd(
             "find ~/.cache/thumbnails/fail/ -name '*.png' 2>/dev/null | wc -l"
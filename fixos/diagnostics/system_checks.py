@@ -5,8 +5,10 @@ Delegates to specialized check modules.
 
 from __future__ import annotations
 
+from contextlib import nullcontext
 from typing import Any
 
+from .checks._shared import _dmesg, _systemctl_user_units
 from .checks import (
     diagnose_audio,
     diagnose_thumbnails,
@@ -46,22 +48,35 @@ def get_full_diagnostics(
     """
     selected = modules or list(DIAGNOSTIC_MODULES.keys())
     result = {}
+    # Fresh kernel log / user units per run, shared by all modules
+    _dmesg.cache_clear()
+    _systemctl_user_units.cache_clear()
 
-    for key in selected:
-        if key not in DIAGNOSTIC_MODULES:
-            continue
-        desc, fn = DIAGNOSTIC_MODULES[key]
-        if progress_callback:
-            progress_callback(key, desc)
-        else:
-            print(f"  → {desc}...", end="\r", flush=True)
-        try:
-            result[key] = fn()
-        except Exception as e:
-            result[key] = {"error": str(e)}
+    # Bez callbacka: jeden wskaźnik rich (spinner przerysowywany w miejscu,
+    # poza TTY nic nie wypisuje) zamiast print(..., end="\r") per moduł.
+    if progress_callback:
+        status = nullcontext()
+    else:
+        from ..utils.terminal import console
+
+        status = console.status("  → Diagnostyka...")
+
+    with status:
+        for key in selected:
+            if key not in DIAGNOSTIC_MODULES:
+                continue
+            desc, fn = DIAGNOSTIC_MODULES[key]
+            if progress_callback:
+                progress_callback(key, desc)
+            else:
+                status.update(f"  → {desc}...")
+            try:
+                result[key] = fn()
+            except Exception as e:
+                result[key] = {"error": str(e)}
 
     if not progress_callback:
-        print("  → Diagnostyka zakończona.  ")
+        print("  → Diagnostyka zakończona.")
 
     return result
 
@@ -4,9 +4,10 @@ Interactive Cleanup Planner for fixOS
 Groups cleanup actions and provides interactive selection
 """
 
+import heapq
 import json
-from typing import Dict, List, Any
-from dataclasses import dataclass
+from typing import Dict, Iterator, List, Any, Tuple
+from dataclasses import dataclass, field
 from enum import Enum
 
 
@@ -28,6 +29,58 @@ class CleanupType(Enum):
     PACKAGE_MGR = "package_cleanup"
 
 
+_CTYPE_BY_VALUE = {m.value: m for m in CleanupType}
+_PRIO_BY_VALUE = {m.value: m for m in Priority}
+
+_PRIORITY_SCORE = {
+    Priority.CRITICAL: 4,
+    Priority.HIGH: 3,
+    Priority.MEDIUM: 2,
+    Priority.LOW: 1,
+}
+
+
+def _to_float(value: Any) -> float:
+    """Coerce a suggestion's size field, treating garbage as 0."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _iter_actions(
+    grouped: Dict[str, List["CleanupAction"]],
+) -> Iterator["CleanupAction"]:
+    """Walk all grouped actions without building a flattened list."""
+    for actions in grouped.values():
+        yield from actions
+
+
+def _category_key(action: "CleanupAction") -> tuple:
+    """Order within a category: priority, then size."""
+    return (_PRIORITY_SCORE.get(action.priority, 1), action.size_gb)
+
+
+def _prioritized_key(action: "CleanupAction") -> tuple:
+    """Global order: priority, reclaimable safe size, safety, then size."""
+    return (
+        _PRIORITY_SCORE.get(action.priority, 1),
+        action.size_gb if action.safe else 0,
+        action.safe,
+        action.size_gb,
+    )
+
+
+# Types whose category never depends on the path
+_TYPE_TO_CATEGORY = {
+    CleanupType.CACHE: "cache",
+    CleanupType.LOG: "logs",
+    CleanupType.TEMP: "temp",
+    CleanupType.LARGE_FILE: "large_files",
+    CleanupType.DOCKER: "docker",
+}
+
+
 @dataclass
 class CleanupAction:
     """Represents a cleanup action"""
@@ -44,6 +97,8 @@ class CleanupAction:
     estimated_time: str = ""
     dependencies: List[str] = None
     preview_command: str = ""
+    # Canonical dict form, built once by CleanupPlanner._action_to_dict
+    raw: Dict[str, Any] = field(default=None, repr=False, compare=False)
 
     def __post_init__(self):
         if self.dependencies is None:
@@ -119,7 +174,32 @@ class CleanupPlanner:
         self, suggestions: List[Dict]
     ) -> Dict[str, List[CleanupAction]]:
         """Group cleanup suggestions by category"""
-        grouped = {}
+        grouped, _ = self.group_by_category_with_stats(suggestions)
+
+        # Sort actions within each category by priority and size
+        for actions in grouped.values():
+            actions.sort(key=_category_key, reverse=True)
+
+        return grouped
+
+    def group_by_category_with_stats(
+        self, suggestions: List[Dict]
+    ) -> Tuple[Dict[str, List[CleanupAction]], Dict[str, Any]]:
+        """Group cleanup suggestions by category, unsorted, with size totals.
+
+        Returns ``(grouped, stats)``; the totals are accumulated in the same
+        pass so create_cleanup_plan never re-walks the actions.
+        """
+        grouped: Dict[str, List[CleanupAction]] = {}
+        stats: Dict[str, Any] = {
+            "total": 0.0,
+            "safe": 0.0,
+            "high_prio": 0.0,
+            "per_category_total": {},
+            "per_category_safe": {},
+        }
+        per_total = stats["per_category_total"]
+        per_safe = stats["per_category_safe"]
 
         for suggestion in suggestions:
             try:
@@ -128,84 +208,53 @@ class CleanupPlanner:
 
                 # Determine category
                 category = self._get_category_for_action(action)
-
-                if category not in grouped:
-                    grouped[category] = []
-                grouped[category].append(action)
-
             except Exception:
                 # Skip invalid suggestions
                 continue
 
-        # Sort actions within each category by priority and size
-        for category in grouped:
-            grouped[category].sort(
-                key=lambda x: (self._priority_score(x.priority), x.size_gb),
-                reverse=True,
-            )
+            if category not in grouped:
+                grouped[category] = []
+                per_total[category] = 0.0
+                per_safe[category] = 0.0
+            grouped[category].append(action)
 
-        return grouped
+            size = action.size_gb
+            stats["total"] += size
+            per_total[category] += size
+            if action.safe:
+                stats["safe"] += size
+                per_safe[category] += size
+            if action.priority in (Priority.CRITICAL, Priority.HIGH):
+                stats["high_prio"] += size
+
+        return grouped, stats
 
     def prioritize_actions(
         self, grouped_actions: Dict[str, List[CleanupAction]]
     ) -> List[CleanupAction]:
         """Create prioritized list of all actions"""
-        all_actions = []
-
-        # Add high priority actions first
-        for category, actions in grouped_actions.items():
-            high_priority = [
-                a for a in actions if a.priority in [Priority.CRITICAL, Priority.HIGH]
-            ]
-            all_actions.extend(high_priority)
-
-        # Add medium priority actions
-        for category, actions in grouped_actions.items():
-            medium_priority = [a for a in actions if a.priority == Priority.MEDIUM]
-            all_actions.extend(medium_priority)
-
-        # Add low priority actions
-        for category, actions in grouped_actions.items():
-            low_priority = [a for a in actions if a.priority == Priority.LOW]
-            all_actions.extend(low_priority)
-
-        # Sort by impact and safety
-        all_actions.sort(
-            key=lambda x: (
-                self._priority_score(x.priority),
-                x.size_gb if x.safe else 0,
-                x.safe,
-            ),
-            reverse=True,
-        )
+        all_actions = [a for actions in grouped_actions.values() for a in actions]
+
+        # Sort by priority, then impact and safety
+        all_actions.sort(key=_prioritized_key, reverse=True)
 
         return all_actions
 
     def create_cleanup_plan(self, suggestions: List[Dict]) -> Dict[str, Any]:
         """Create comprehensive cleanup plan"""
-        grouped = self.group_by_category(suggestions)
-        prioritized = self.prioritize_actions(grouped)
-
-        # Calculate statistics
-        total_size_gb = sum(action.size_gb for action in prioritized)
-        safe_size_gb = sum(action.size_gb for action in prioritized if action.safe)
-        high_priority_size = sum(
-            action.size_gb
-            for action in prioritized
-            if action.priority in [Priority.CRITICAL, Priority.HIGH]
-        )
+        grouped, stats = self.group_by_category_with_stats(suggestions)
 
         plan = {
             "summary": {
-                "total_actions": len(prioritized),
-                "total_size_gb": round(total_size_gb, 2),
-                "safe_size_gb": round(safe_size_gb, 2),
-                "high_priority_size_gb": round(high_priority_size, 2),
+                "total_actions": sum(len(actions) for actions in grouped.values()),
+                "total_size_gb": round(stats["total"], 2),
+                "safe_size_gb": round(stats["safe"], 2),
+                "high_priority_size_gb": round(stats["high_prio"], 2),
                 "categories_count": len(grouped),
             },
             "categories": {},
             "prioritized_actions": [],
-            "recommendations": self._generate_recommendations(grouped, prioritized),
+            "recommendations": self._generate_recommendations(grouped),
         }
 
         # Add category details
@@ -223,16 +272,18 @@ class CleanupPlanner:
             plan["categories"][category] = {
                 "info": category_info,
                 "actions_count": len(actions),
-                "total_size_gb": round(sum(a.size_gb for a in actions), 2),
-                "safe_size_gb": round(sum(a.size_gb for a in actions if a.safe), 2),
+                "total_size_gb": round(stats["per_category_total"][category], 2),
+                "safe_size_gb": round(stats["per_category_safe"][category], 2),
                 "actions": [
-                    self._action_to_dict(a) for a in actions[:5]
+                    self._action_to_dict(a)
+                    for a in heapq.nlargest(5, actions, key=_category_key)
                 ],  # Top 5 per category
             }
 
-        # Add prioritized actions (top 15)
+        # Add prioritized actions (top 15); no full sorted list is materialized
         plan["prioritized_actions"] = [
-            self._action_to_dict(a) for a in prioritized[:15]
+            self._action_to_dict(a)
+            for a in heapq.nlargest(15, _iter_actions(grouped), key=_prioritized_key)
         ]
 
         return plan
@@ -257,50 +308,35 @@ class CleanupPlanner:
 
     def _dict_to_action(self, suggestion: Dict) -> CleanupAction:
         """Convert dictionary suggestion to CleanupAction"""
-        try:
-            # Need to handle strings if suggestion payload comes in as string not Enum
-            ctype_val = suggestion.get("type", "large_file")
-            try:
-                ctype = CleanupType(ctype_val)
-            except ValueError:
-                ctype = CleanupType.LARGE_FILE
-
-            prio_val = suggestion.get("priority", "low")
-            try:
-                prio = Priority(prio_val)
-            except ValueError:
-                prio = Priority.LOW
-
-            return CleanupAction(
-                type=ctype,
-                priority=prio,
-                path=suggestion.get("path", ""),
-                size_gb=float(suggestion.get("size_gb", 0)),
-                description=suggestion.get("description", ""),
-                command=suggestion.get("command", ""),
-                safe=bool(suggestion.get("safe", False)),
-                impact=suggestion.get("impact", "low"),
-                category=suggestion.get("category", ""),
-                estimated_time=suggestion.get("estimated_time", ""),
-                dependencies=suggestion.get("dependencies", []),
-                preview_command=suggestion.get("preview_command", ""),
-            )
-        except Exception:
-            # Create default action for invalid suggestions
-            return CleanupAction(
-                type=CleanupType.LARGE_FILE,
-                priority=Priority.LOW,
-                path="",
-                size_gb=0,
-                description="Invalid action",
-                command="",
-                safe=False,
-                impact="none",
-            )
+        # Payload carries enum values as strings; unknown values get defaults
+        return CleanupAction(
+            type=_CTYPE_BY_VALUE.get(
+                suggestion.get("type", "large_file"), CleanupType.LARGE_FILE
+            ),
+            priority=_PRIO_BY_VALUE.get(
+                suggestion.get("priority", "low"), Priority.LOW
+            ),
+            path=suggestion.get("path", ""),
+            size_gb=_to_float(suggestion.get("size_gb", 0)),
+            description=suggestion.get("description", ""),
+            command=suggestion.get("command", ""),
+            safe=bool(suggestion.get("safe", False)),
+            impact=suggestion.get("impact", "low"),
+            category=suggestion.get("category", ""),
+            estimated_time=suggestion.get("estimated_time", ""),
+            dependencies=suggestion.get("dependencies", []),
+            preview_command=suggestion.get("preview_command", ""),
+        )
 
     def _action_to_dict(self, action: CleanupAction) -> Dict[str, Any]:
-        """Convert CleanupAction to dictionary"""
-        return {
+        """Convert CleanupAction to dictionary.
+
+        The dict is cached on ``action.raw`` so an action listed both in its
+        category's top 5 and in the prioritized top 15 is converted once.
+        """
+        if action.raw is not None:
+            return action.raw
+        action.raw = {
             "type": action.type.value,
             "priority": action.priority.value,
             "path": action.path,
@@ -314,41 +350,32 @@ class CleanupPlanner:
             "dependencies": action.dependencies,
             "preview_command": action.preview_command,
         }
+        return action.raw
 
     def _get_category_for_action(self, action: CleanupAction) -> str:
         """Determine category for action based on type and path"""
-        if action.type == CleanupType.CACHE:
-            return "cache"
-        elif action.type == CleanupType.LOG:
-            return "logs"
-        elif action.type == CleanupType.TEMP:
-            return "temp"
-        elif action.type == CleanupType.LARGE_FILE:
-            return "large_files"
-        elif action.type.value == "docker_cleanup" or "docker" in action.path.lower():
+        category = _TYPE_TO_CATEGORY.get(action.type)
+        if category is not None:
+            return category
+        # Path heuristics for package/system/user types
+        path = action.path
+        if "docker" in path.lower():
             return "docker"
-        elif action.type.value == "package_cleanup" or action.path == "/var/cache":
+        if action.type == CleanupType.PACKAGE_MGR or path == "/var/cache":
             return "package_manager"
-        elif "system" in action.path.lower() or action.path.startswith("/"):
+        if "system" in path.lower() or path.startswith("/"):
             return "system"
-        else:
-            return "user"
+        return "user"
 
     def _priority_score(self, priority: Priority) -> int:
         """Convert priority to numeric score"""
-        scores = {
-            Priority.CRITICAL: 4,
-            Priority.HIGH: 3,
-            Priority.MEDIUM: 2,
-            Priority.LOW: 1,
-        }
-        return scores.get(priority, 1)
+        return _PRIORITY_SCORE.get(priority, 1)
 
     @staticmethod
-    def _rec_safe_high_impact(prioritized: List[CleanupAction]) -> List[Dict]:
+    def _rec_safe_high_impact(grouped: Dict[str, List[CleanupAction]]) -> List[Dict]:
         actions = [
             a
-            for a in prioritized
+            for a in _iter_actions(grouped)
             if a.safe
             and a.size_gb > 0.5
             and a.priority in [Priority.HIGH, Priority.CRITICAL]
@@ -406,8 +433,8 @@ class CleanupPlanner:
         ]
 
     @staticmethod
-    def _rec_manual(prioritized: List[CleanupAction]) -> List[Dict]:
-        actions = [a for a in prioritized if not a.safe and a.size_gb > 1.0]
+    def _rec_manual(grouped: Dict[str, List[CleanupAction]]) -> List[Dict]:
+        actions = [a for a in _iter_actions(grouped) if not a.safe and a.size_gb > 1.0]
         if not actions:
             return []
         size = sum(a.size_gb for a in actions)
@@ -423,14 +450,14 @@ class CleanupPlanner:
         ]
 
     def _generate_recommendations(
-        self, grouped: Dict[str, List[CleanupAction]], prioritized: List[CleanupAction]
+        self, grouped: Dict[str, List[CleanupAction]]
     ) -> List[Dict]:
         """Generate cleanup recommendations"""
         recs: List[Dict] = []
-        recs.extend(self._rec_safe_high_impact(prioritized))
+        recs.extend(self._rec_safe_high_impact(grouped))
         recs.extend(self._rec_cache(grouped))
         recs.extend(self._rec_logs(grouped))
-        recs.extend(self._rec_manual(prioritized))
+        recs.extend(self._rec_manual(grouped))
         return recs
 
 
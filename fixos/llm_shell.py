@@ -4,6 +4,7 @@ Sesja trwa maksymalnie 1 godzinę (3600 sekund).
 Dane diagnostyczne są wysyłane jawnie do modelu.
 """
 
+import json
 import signal
 import subprocess
 import sys
@@ -25,9 +26,12 @@ except ImportError:
     sys.exit(1)
 
 from .anonymizer import anonymize
+from .platform_utils import split_simple_command
 
 # ── Stałe ──────────────────────────────────────────────────────────────────
 SESSION_TIMEOUT = 3600  # 1 godzina w sekundach
+HISTORY_HEAD_KEEP = 2  # prompt systemowy + dane diagnostyczne (zawsze wysyłane)
+HISTORY_TAIL_KEEP = 12  # ostatnie wiadomości rozmowy wysyłane do modelu
 SYSTEM_PROMPT = """Jesteś ekspertem od diagnostyki i naprawy systemu Linux, Windows, macOS.
 Otrzymujesz anonimizowane dane diagnostyczne z systemu użytkownika.
 
@@ -57,36 +61,54 @@ def _timeout_handler(signum, frame):
 
 # ── Formatowanie czasu ──────────────────────────────────────────────────────
 def format_time(seconds: int) -> str:
-    h = seconds // 3600
-    m = (seconds % 3600) // 60
-    s = seconds % 60
+    h, rem = divmod(seconds, 3600)
+    m, s = divmod(rem, 60)
     return f"{h:02d}:{m:02d}:{s:02d}"
 
 
+# Komendy wymagające sudo
+_DANGEROUS_PREFIXES = (
+    "dnf",
+    "rpm",
+    "systemctl",
+    "firewall-cmd",
+    "setenforce",
+    "chmod",
+    "chown",
+    "rm ",
+    "mv ",
+    "dd ",
+    "mkfs",
+)
+
+
+# ── Historia rozmowy ────────────────────────────────────────────────────────
+def _trim_history(
+    messages: list,
+    head_keep: int = HISTORY_HEAD_KEEP,
+    tail_keep: int = HISTORY_TAIL_KEEP,
+) -> int:
+    """
+    Przycina historię w miejscu: zostawia pierwsze head_keep i ostatnie
+    tail_keep wiadomości, żeby koszt każdego zapytania nie rósł z liczbą tur.
+    Zwraca liczbę usuniętych wiadomości.
+    """
+    excess = len(messages) - head_keep - tail_keep
+    if excess <= 0:
+        return 0
+    del messages[head_keep : head_keep + excess]
+    return excess
+
+
 # ── Bezpieczne wykonanie komendy ────────────────────────────────────────────
 def execute_command(cmd: str) -> tuple[bool, str]:
     """
     Wykonuje komendę systemową z potwierdzeniem użytkownika.
     Zwraca (sukces, output).
     """
-    # Komendy wymagające sudo
-    dangerous_prefixes = [
-        "dnf",
-        "rpm",
-        "systemctl",
-        "firewall-cmd",
-        "setenforce",
-        "chmod",
-        "chown",
-        "rm ",
-        "mv ",
-        "dd ",
-        "mkfs",
-    ]
-    is_dangerous = any(cmd.strip().startswith(p) for p in dangerous_prefixes)
-
-    if is_dangerous and not cmd.strip().startswith("sudo "):
-        cmd = "sudo " + cmd.strip()
+    stripped = cmd.strip()
+    if stripped.startswith(_DANGEROUS_PREFIXES) and not stripped.startswith("sudo "):
+        cmd = "sudo " + stripped
 
     print(f"\n  [exec] {cmd}")
     confirm = input("  Potwierdź wykonanie (Y/n): ").strip().lower()
@@ -94,8 +116,13 @@ def execute_command(cmd: str) -> tuple[bool, str]:
         return False, "Anulowano przez użytkownika."
 
     try:
+        argv = split_simple_command(cmd)
         result = subprocess.run(
-            cmd, shell=True, capture_output=True, text=True, timeout=120
+            cmd if argv is None else argv,
+            shell=argv is None,
+            capture_output=True,
+            text=True,
+            timeout=120,
         )
         output = result.stdout.strip() or result.stderr.strip() or "(brak outputu)"
         success = result.returncode == 0
@@ -104,21 +131,39 @@ def execute_command(cmd: str) -> tuple[bool, str]:
         return success, output
     except subprocess.TimeoutExpired:
         return False, "Komenda przekroczyła limit czasu (120s)."
+    except FileNotFoundError:
+        return False, f"Nie znaleziono polecenia: {cmd.split()[0]}"
     except Exception as e:
         return False, f"Wyjątek: {e}"
 
 
 # ── Główna funkcja sesji LLM ────────────────────────────────────────────────
 def _llm_call(client, model: str, messages: list) -> Optional[str]:
-    """Call the LLM; return reply text, '' on rate-limit, None on fatal error."""
+    """Stream the LLM reply to stdout as it arrives.
+
+    Returns the full reply text, '' on rate-limit, None on fatal error.
+    """
+    parts: list[str] = []
     try:
-        response = client.chat.completions.create(
+        stream = client.chat.completions.create(
             model=model,
             messages=messages,
             max_tokens=2000,
             temperature=0.3,
+            stream=True,
         )
-        return response.choices[0].message.content
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            if not parts:
+                print("\r" + " " * 25 + "\r", end="")  # wyczyść "analizuje..."
+                print(f"\n{'─' * 60}")
+            sys.stdout.write(delta)
+            sys.stdout.flush()
+            parts.append(delta)
     except openai.AuthenticationError:
         print("\n❌ Błąd autoryzacji – sprawdź token API.")
         return None
@@ -126,18 +171,30 @@ def _llm_call(client, model: str, messages: list) -> Optional[str]:
         print("\n⚠️ Rate limit – poczekaj chwilę...")
         time.sleep(10)
         return ""
+    except openai.APIError as e:
+        print(f"\n❌ Błąd API: {e}")
+        if not parts:
+            return None
     except Exception as e:
         print(f"\n❌ Błąd API: {e}")
         return None
 
+    if not parts:
+        print("\r" + " " * 25 + "\r", end="")
+        print(f"\n{'─' * 60}")
+        parts.append("(brak odpowiedzi)")
+        sys.stdout.write(parts[0])
+    print()
+    return "".join(parts)
 
-def _handle_user_turn(session, messages: list, remaining: int, verbose: bool) -> str:
+
+def _handle_user_turn(
+    session, messages: list, remaining_str: str, verbose: bool
+) -> str:
     """Read user input, update messages. Returns 'quit', 'break', 'continue', or 'ok'."""
     try:
         user_input = session.prompt(
-            HTML(
-                f"\n<prompt>fixos</prompt> <timer>[{format_time(remaining)}]</timer> ❯ "
-            )
+            HTML(f"\n<prompt>fixos</prompt> <timer>[{remaining_str}]</timer> ❯ ")
         ).strip()
     except (EOFError, KeyboardInterrupt):
         print("\n\nSesja przerwana przez użytkownika.")
@@ -191,7 +248,12 @@ def run_llm_shell(
         verbose: Czy wyświetlać dodatkowe informacje debugowania
         base_url: Opcjonalny URL dla alternatywnych API (np. xAI, Ollama)
     """
-    anon_data, _ = anonymize(str(diagnostics_data))
+    # Zwarty JSON zamiast str(dict): mniej tokenów w każdym zapytaniu
+    anon_data = anonymize(
+        json.dumps(
+            diagnostics_data, default=str, ensure_ascii=False, separators=(",", ":")
+        )
+    )
 
     client_kwargs: dict = {"api_key": token}
     if base_url:
@@ -223,6 +285,7 @@ def run_llm_shell(
     print("═" * 60 + "\n")
 
     elapsed = 0
+    dropped = 0
     try:
         while True:
             elapsed = int(time.time() - start_time)
@@ -238,15 +301,14 @@ def run_llm_shell(
                 continue
             messages.append({"role": "assistant", "content": reply})
 
-            print("\r" + " " * 25 + "\r", end="")  # wyczyść "analizuje..."
-            print(f"\n{'─' * 60}")
-            print(reply)
             print(f"{'─' * 60}")
-            print(f"  ⏰ Pozostały czas: {format_time(remaining)}")
+            remaining_str = format_time(remaining)
+            print(f"  ⏰ Pozostały czas: {remaining_str}")
 
-            action = _handle_user_turn(session, messages, remaining, verbose)
+            action = _handle_user_turn(session, messages, remaining_str, verbose)
             if action in ("quit", "break"):
                 break
+            dropped += _trim_history(messages)
 
     except SessionTimeout:
         print(f"\n\n⏰ Sesja wygasła po {format_time(timeout)}. Połączenie zakończone.")
@@ -255,6 +317,6 @@ def run_llm_shell(
 
     print(f"\n{'═' * 60}")
     print(
-        f"  📊 Podsumowanie sesji: {len(messages) - 2} interakcji w {format_time(elapsed)}"
+        f"  📊 Podsumowanie sesji: {len(messages) + dropped - HISTORY_HEAD_KEEP} interakcji w {format_time(elapsed)}"
     )
     print(f"{'═' * 60}\n")
@@ -6,11 +6,17 @@ Waliduje komendy przed wykonaniem, obsługuje timeout i resource limits.
 from __future__ import annotations
 
 import asyncio
+import os
 import re
+import selectors
 import subprocess
+import time
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Optional
 
+from ..platform_utils import split_simple_command
+
 
 class DangerousCommandError(Exception):
     def __init__(self, command: str, reason: str = ""):
@@ -28,7 +34,7 @@ class CommandTimeoutError(Exception):
         super().__init__(f"Timeout ({timeout}s) dla komendy: {command!r}")
 
 
-@dataclass
+@dataclass(slots=True)
 class ExecutionResult:
     command: str
     returncode: int = 0
@@ -93,6 +99,7 @@ NEEDS_SUDO_PREFIXES = [
     "update-grub",
     "grub2-mkconfig",
 ]
+_SUDO_PREFIX_TUPLE = tuple(NEEDS_SUDO_PREFIXES)
 
 LONG_RUNNING_PATTERNS: list[tuple[str, int]] = [
     (r"^(sudo\s+)?(dnf|yum)\s+(update|upgrade|dist-upgrade)\b", 600),
@@ -102,6 +109,25 @@ LONG_RUNNING_PATTERNS: list[tuple[str, int]] = [
     (r"^(sudo\s+)?(cargo)\s+(install|build)\b", 600),
 ]
 
+# Menedżery pakietów biorą globalną blokadę (dnf/rpm, dpkg) – dwa naraz
+# kończą się błędem blokady, więc run_async uruchamia je po kolei
+PACKAGE_MANAGERS = frozenset(
+    {
+        "apt",
+        "apt-get",
+        "dpkg",
+        "dnf",
+        "dnf5",
+        "yum",
+        "rpm",
+        "rpm-ostree",
+        "zypper",
+        "pacman",
+        "flatpak",
+        "snap",
+    }
+)
+
 IDEMPOTENT_CHECK: dict[str, str] = {
     r"dnf install (.+)": "rpm -q {0} &>/dev/null",
     r"systemctl enable (.+)": "systemctl is-enabled {0} &>/dev/null",
@@ -109,6 +135,166 @@ IDEMPOTENT_CHECK: dict[str, str] = {
     r"mkdir -p (.+)": "test -d {0}",
 }
 
+# Wzorce kompilowane raz przy imporcie – walidacja biegnie dla każdej komendy.
+# Niebezpieczne wzorce są złączone w jedną alternatywę (g0|g1|...), więc
+# komenda jest skanowana raz; nazwa grupy wskazuje indeks powodu. DOTALL,
+# żeby ".*" obejmowało też komendy łamane na kilka linii (dd if=... \ + of=...).
+_DANGER_UNION = re.compile(
+    "|".join(
+        f"(?P<g{i}>{pattern})" for i, (pattern, _) in enumerate(DANGEROUS_PATTERNS)
+    ),
+    re.IGNORECASE | re.DOTALL,
+)
+_DANGER_REASONS: list[str] = [reason for _, reason in DANGEROUS_PATTERNS]
+# Każdy wzorzec wymaga jednego z tych literałów – komendy bez żadnego z nich
+# (dnf install, echo, systemctl ...) pomijają regex. casefold(), bo przy
+# IGNORECASE np. "ſ" pasuje do "s", a lower() by tego nie złożył.
+_DANGER_LITERALS = (
+    "rm",
+    "dd",
+    "mkfs",
+    ">",
+    ":()",
+    "chmod",
+    "chown",
+    "wget",
+    "curl",
+)
+
+_IDEMPOTENT_COMPILED: list[tuple[re.Pattern, str]] = [
+    (re.compile(pattern, re.IGNORECASE), check_tpl)
+    for pattern, check_tpl in IDEMPOTENT_CHECK.items()
+]
+
+
+# Te same komendy wracają przy każdej próbie naprawy (run_sync ponawia listę
+# fix_commands), więc walidacja jest memoizowana per treść komendy.
+@lru_cache(maxsize=2048)
+def _is_dangerous(command: str) -> tuple[bool, str]:
+    folded = command.casefold()
+    if not any(literal in folded for literal in _DANGER_LITERALS):
+        return False, ""
+    m = _DANGER_UNION.search(command)
+    if m:
+        return True, _DANGER_REASONS[int(m.lastgroup[1:])]
+    return False, ""
+
+
+@lru_cache(maxsize=2048)
+def _needs_sudo(cmd: str) -> bool:
+    """cmd musi być już po strip() – wołający robią to raz."""
+    if cmd.startswith("sudo"):
+        return False
+    # systemctl --user must NOT run under sudo (breaks DBUS session bus)
+    if cmd.startswith("systemctl") and "--user" in cmd:
+        return False
+    return cmd.startswith(_SUDO_PREFIX_TUPLE)
+
+
+@lru_cache(maxsize=2048)
+def _check_idempotent(command: str) -> Optional[str]:
+    cmd = command.strip()
+    for pattern, check_tpl in _IDEMPOTENT_COMPILED:
+        m = pattern.match(cmd)
+        if m:
+            try:
+                return check_tpl.format(*m.groups())
+            except IndexError:
+                pass
+    return None
+
+
+# Ile wyjścia komendy trzymamy w pamięci – to_context() i tak tnie do 2000/1000
+# znaków, a `dnf upgrade` potrafi wypisać megabajty. Resztę czytamy i odrzucamy.
+_STDOUT_CAP = 64 * 1024
+_STDERR_CAP = 16 * 1024
+_READ_CHUNK = 64 * 1024
+
+
+def _popen(command: str, **kwargs) -> subprocess.Popen:
+    argv = split_simple_command(command)
+    if argv is not None:
+        try:
+            return subprocess.Popen(argv, **kwargs)
+        except FileNotFoundError:
+            pass  # builtin powłoki (cd, export…) lub brak programu – oceni sh
+    return subprocess.Popen(command, shell=True, **kwargs)
+
+
+async def _create_subprocess(command: str, **kwargs) -> asyncio.subprocess.Process:
+    argv = split_simple_command(command)
+    if argv is not None:
+        try:
+            return await asyncio.create_subprocess_exec(*argv, **kwargs)
+        except FileNotFoundError:
+            pass
+    return await asyncio.create_subprocess_shell(command, **kwargs)
+
+
+def _run_check(script: str, timeout: int) -> subprocess.CompletedProcess:
+    """
+    Uruchamia sprawdzenie stanu (rpm -q, systemctl is-active…) przez /bin/sh.
+    stdin=DEVNULL + close_fds=False pozwalają CPythonowi użyć posix_spawn
+    (vfork+exec) zamiast fork – bez kopiowania mapy pamięci orkiestratora.
+    """
+    return subprocess.run(
+        script,
+        shell=True,
+        stdin=subprocess.DEVNULL,
+        capture_output=True,
+        close_fds=False,
+        timeout=timeout,
+    )
+
+
+def _probe(check_cmd: str) -> bool:
+    """Czy pojedyncze sprawdzenie stanu przeszło (błąd/timeout = nie)."""
+    try:
+        return _run_check(check_cmd, timeout=5).returncode == 0
+    except Exception:
+        return False
+
+
+def _drain_capped(proc: subprocess.Popen, timeout: int) -> tuple[bytes, bytes]:
+    """Czyta stdout/stderr procesu do końca, zachowując tylko początek obu."""
+    bufs = {proc.stdout: bytearray(), proc.stderr: bytearray()}
+    caps = {proc.stdout: _STDOUT_CAP, proc.stderr: _STDERR_CAP}
+    deadline = time.monotonic() + timeout
+    with selectors.DefaultSelector() as sel:
+        for stream in bufs:
+            sel.register(stream, selectors.EVENT_READ)
+        while sel.get_map():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                proc.kill()
+                proc.wait()
+                raise subprocess.TimeoutExpired(proc.args, timeout)
+            for key, _ in sel.select(remaining):
+                chunk = os.read(key.fd, _READ_CHUNK)
+                if not chunk:
+                    sel.unregister(key.fileobj)
+                    continue
+                buf = bufs[key.fileobj]
+                room = caps[key.fileobj] - len(buf)
+                if room > 0:
+                    buf += chunk[:room]
+    try:
+        proc.wait(timeout=max(deadline - time.monotonic(), 0))
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+        raise
+    return bytes(bufs[proc.stdout]), bytes(bufs[proc.stderr])
+
+
+async def _read_capped(stream: asyncio.StreamReader, cap: int) -> bytes:
+    buf = bytearray()
+    while chunk := await stream.read(_READ_CHUNK):
+        room = cap - len(buf)
+        if room > 0:
+            buf += chunk[:room]
+    return bytes(buf)
+
 
 class CommandExecutor:
     """
@@ -131,25 +317,24 @@ class CommandExecutor:
 
     def is_dangerous(self, command: str) -> tuple[bool, str]:
         """Sprawdza czy komenda jest potencjalnie destruktywna."""
-        for pattern, reason in DANGEROUS_PATTERNS:
-            if re.search(pattern, command, re.IGNORECASE):
-                return True, reason
-        return False, ""
+        return _is_dangerous(command)
 
     def needs_sudo(self, command: str) -> bool:
-        cmd = command.strip()
-        if cmd.startswith("sudo"):
-            return False
-        # systemctl --user must NOT run under sudo (breaks DBUS session bus)
-        if cmd.startswith("systemctl") and "--user" in cmd:
-            return False
-        return any(cmd.startswith(p) for p in NEEDS_SUDO_PREFIXES)
+        return _needs_sudo(command.strip())
 
     def add_sudo(self, command: str) -> str:
-        if self.needs_sudo(command):
-            return "sudo " + command.strip()
+        cmd = command.strip()
+        if _needs_sudo(cmd):
+            return "sudo " + cmd
         return command
 
+    def is_package_command(self, command: str) -> bool:
+        """Czy komenda uruchamia menedżer pakietów (także przez sudo)."""
+        tokens = command.split()
+        if tokens[:1] == ["sudo"]:
+            tokens = tokens[1:]
+        return bool(tokens) and tokens[0] in PACKAGE_MANAGERS
+
     def _make_noninteractive(self, command: str) -> str:
         """Dodaje flagi nieinteraktywne do komend menedżerów pakietów."""
         pkg_install = re.match(
@@ -165,14 +350,7 @@ class CommandExecutor:
 
     def check_idempotent(self, command: str) -> Optional[str]:
         """Zwraca komendę sprawdzającą stan (jeśli znana), None jeśli nie dotyczy."""
-        for pattern, check_tpl in IDEMPOTENT_CHECK.items():
-            m = re.match(pattern, command.strip(), re.IGNORECASE)
-            if m:
-                try:
-                    return check_tpl.format(*m.groups())
-                except IndexError:
-                    pass
-        return None
+        return _check_idempotent(command)
 
     def _resolve_timeout(self, command: str, explicit_timeout: Optional[int]) -> int:
         """Return timeout: explicit > long-running pattern > default."""
@@ -183,16 +361,8 @@ class CommandExecutor:
                 return extended
         return self.default_timeout
 
-    def execute_sync(
-        self,
-        command: str,
-        timeout: Optional[int] = None,
-        add_sudo: bool = True,
-        check_idempotent: bool = True,
-    ) -> ExecutionResult:
-        """Synchroniczne wykonanie komendy."""
-        timeout = self._resolve_timeout(command, timeout)
-
+    def _prepare(self, command: str, add_sudo: bool) -> str:
+        """Waliduje komendę i zwraca jej finalną postać (sudo, tryb -y)."""
         # Sprawdź niebezpieczne wzorce
         dangerous, reason = self.is_dangerous(command)
         if dangerous:
@@ -203,25 +373,70 @@ class CommandExecutor:
             command = self.add_sudo(command)
 
         # Wymuś tryb nieinteraktywny dla menedżerów pakietów
-        command = self._make_noninteractive(command)
+        return self._make_noninteractive(command)
+
+    @staticmethod
+    def _already_done(command: str) -> ExecutionResult:
+        return ExecutionResult(
+            command=command,
+            returncode=0,
+            stdout="(już wykonane – stan aktualny)",
+            executed=False,
+        )
+
+    def check_idempotent_many(
+        self, commands: list[str], add_sudo: bool = True
+    ) -> set[str]:
+        """
+        Sprawdza stan dla wielu komend jednym wywołaniem powłoki.
+        Zwraca zbiór komend (w postaci wejściowej), których efekt już występuje.
+        Komendy niebezpieczne są pomijane – ich sprawdzenia nie są uruchamiane.
+        """
+        probes: list[tuple[str, str]] = []
+        for cmd in commands:
+            try:
+                check_cmd = self.check_idempotent(self._prepare(cmd, add_sudo))
+            except DangerousCommandError:
+                continue
+            if check_cmd:
+                probes.append((cmd, check_cmd))
+        if not probes:
+            return set()
+
+        script = "\n".join(
+            f"{{ {check_cmd}; }} >/dev/null 2>&1 && echo 1 || echo 0"
+            for _, check_cmd in probes
+        )
+        try:
+            flags = _run_check(script, timeout=5 * len(probes)).stdout.split()
+        except Exception:
+            flags = []
+        if len(flags) != len(probes):
+            # Skrypt zbiorczy padł albo przekroczył czas – zamiast wyłączać
+            # ochronę dla całej listy sprawdzamy komendy po jednej
+            return {cmd for cmd, check_cmd in probes if _probe(check_cmd)}
+        return {cmd for (cmd, _), flag in zip(probes, flags) if flag == b"1"}
+
+    def satisfied_result(self, command: str, add_sudo: bool = True) -> ExecutionResult:
+        """Wynik dla komendy, którą check_idempotent_many uznał za już wykonaną."""
+        return self._already_done(self._prepare(command, add_sudo))
+
+    def execute_sync(
+        self,
+        command: str,
+        timeout: Optional[int] = None,
+        add_sudo: bool = True,
+        check_idempotent: bool = True,
+    ) -> ExecutionResult:
+        """Synchroniczne wykonanie komendy."""
+        timeout = self._resolve_timeout(command, timeout)
+        command = self._prepare(command, add_sudo)
 
         # Sprawdź idempotentność
         if check_idempotent:
             check_cmd = self.check_idempotent(command)
-            if check_cmd:
-                try:
-                    result = subprocess.run(
-                        check_cmd, shell=True, capture_output=True, timeout=5
-                    )
-                    if result.returncode == 0:
-                        return ExecutionResult(
-                            command=command,
-                            returncode=0,
-                            stdout="(już wykonane – stan aktualny)",
-                            executed=False,
-                        )
-                except Exception:
-                    pass
+            if check_cmd and _probe(check_cmd):
+                return self._already_done(command)
 
         if self.dry_run:
             return ExecutionResult(
@@ -231,18 +446,17 @@ class CommandExecutor:
             )
 
         try:
-            proc = subprocess.run(
+            with _popen(
                 command,
-                shell=True,
-                capture_output=True,
-                text=True,
-                timeout=timeout,
-            )
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            ) as proc:
+                stdout_b, stderr_b = _drain_capped(proc, timeout)
             return ExecutionResult(
                 command=command,
                 returncode=proc.returncode,
-                stdout=proc.stdout.strip(),
-                stderr=proc.stderr.strip(),
+                stdout=stdout_b.decode(errors="replace").strip(),
+                stderr=stderr_b.decode(errors="replace").strip(),
                 executed=True,
             )
         except subprocess.TimeoutExpired:
@@ -260,15 +474,14 @@ class CommandExecutor:
         timeout: Optional[int] = None,
         add_sudo: bool = True,
     ) -> ExecutionResult:
-        """Asynchroniczne wykonanie komendy."""
+        """
+        Asynchroniczne wykonanie komendy. Przygotowanie jak w execute_sync
+        (_prepare): walidacja, sudo i wymuszone -y dla menedżerów pakietów –
+        run_async korzysta z tej ścieżki zamiast execute_sync w wątku, więc
+        apt/dnf nie mogą tu czekać na pytanie o potwierdzenie.
+        """
         timeout = self._resolve_timeout(command, timeout)
-
-        dangerous, reason = self.is_dangerous(command)
-        if dangerous:
-            raise DangerousCommandError(command, reason)
-
-        if add_sudo:
-            command = self.add_sudo(command)
+        command = self._prepare(command, add_sudo)
 
         if self.dry_run:
             return ExecutionResult(
@@ -278,18 +491,23 @@ class CommandExecutor:
             )
 
         try:
-            proc = await asyncio.create_subprocess_shell(
+            proc = await _create_subprocess(
                 command,
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.PIPE,
             )
             try:
-                stdout_b, stderr_b = await asyncio.wait_for(
-                    proc.communicate(), timeout=timeout
+                stdout_b, stderr_b, _ = await asyncio.wait_for(
+                    asyncio.gather(
+                        _read_capped(proc.stdout, _STDOUT_CAP),
+                        _read_capped(proc.stderr, _STDERR_CAP),
+                        proc.wait(),
+                    ),
+                    timeout=timeout,
                 )
             except asyncio.TimeoutError:
                 proc.kill()
-                await proc.communicate()
+                await proc.wait()
                 raise CommandTimeoutError(command, timeout)
 
             return ExecutionResult(
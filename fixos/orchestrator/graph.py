@@ -14,8 +14,18 @@ from collections import deque
 ProblemStatus = Literal["pending", "in_progress", "resolved", "failed", "blocked"]
 ProblemSeverity = Literal["critical", "warning", "info"]
 
-
-@dataclass
+_SEVERITY_RANK = {"critical": 0, "warning": 1, "info": 2}
+_SEVERITY_ICON = {"critical": "🔴", "warning": "🟡", "info": "🟢"}
+_STATUS_ICON = {
+    "pending": "⏳",
+    "in_progress": "🔄",
+    "resolved": "✅",
+    "failed": "❌",
+    "blocked": "🚫",
+}
+
+
+@dataclass(slots=True)
 class Problem:
     id: str
     description: str
@@ -49,31 +59,61 @@ class ProblemGraph:
     Problemy bez nierozwiązanych zależności są actionable.
     """
 
+    __slots__ = (
+        "nodes",
+        "_execution_order",
+        "_deps",
+        "_roots",
+        "_unblocked",
+        "_dirty",
+    )
+
     def __init__(self):
         self.nodes: dict[str, Problem] = {}
-        self.execution_order: list[str] = []
+        self._execution_order: list[str] = []
+        self._deps: dict[str, tuple[str, ...]] = {}
+        self._roots: list[str] = []
+        # Problemy, których wszystkie zależności były już "resolved" – status
+        # końcowy, więc nie sprawdzamy ich ponownie; zerowane po add()
+        self._unblocked: set[str] = set()
+        self._dirty = False
+
+    @property
+    def execution_order(self) -> list[str]:
+        """Kolejność napraw – przeliczana leniwie po serii add()."""
+        if self._dirty:
+            self._recalculate_order()
+        return self._execution_order
 
     def add(self, problem: Problem) -> None:
         self.nodes[problem.id] = problem
-        self._recalculate_order()
+        self._dirty = True
 
     def get(self, problem_id: str) -> Optional[Problem]:
         return self.nodes.get(problem_id)
 
-    def next_actionable(self) -> Optional[Problem]:
-        """Zwraca pierwszy problem bez nierozwiązanych zależności."""
-        for pid in self.execution_order:
-            p = self.nodes[pid]
+    def _iter_actionable(self):
+        order = self.execution_order  # odświeża też self._deps
+        nodes = self.nodes
+        deps = self._deps
+        unblocked = self._unblocked
+        for pid in order:
+            p = nodes[pid]
             if not p.is_actionable():
                 continue
-            deps_resolved = all(
-                self.nodes[dep].status == "resolved"
-                for dep in p.caused_by
-                if dep in self.nodes
-            )
-            if deps_resolved:
-                return p
-        return None
+            if pid not in unblocked:
+                if not all(nodes[dep].status == "resolved" for dep in deps[pid]):
+                    continue
+                unblocked.add(pid)
+            yield p
+
+    def next_actionable(self) -> Optional[Problem]:
+        """Zwraca pierwszy problem bez nierozwiązanych zależności."""
+        return next(self._iter_actionable(), None)
+
+    def all_actionable(self) -> list[Problem]:
+        """Wszystkie problemy gotowe do naprawy – bieżąca warstwa DAG-u."""
+        return list(self._iter_actionable())
 
     def all_done(self) -> bool:
         return all(
@@ -95,32 +135,30 @@ class ProblemGraph:
 
     def render_tree(self) -> str:
         """Renderuje drzewo problemów jako tekst."""
+        if self._dirty:
+            self._recalculate_order()
         lines = []
-        roots = [p for p in self.nodes.values() if not p.caused_by]
         visited: set[str] = set()
-
-        def _render(pid: str, indent: int = 0):
-            if pid in visited or pid not in self.nodes:
-                return
-            visited.add(pid)
-            p = self.nodes[pid]
-            icon = {"critical": "🔴", "warning": "🟡", "info": "🟢"}.get(
-                p.severity, "⚪"
-            )
-            status_icon = {
-                "pending": "⏳",
-                "in_progress": "🔄",
-                "resolved": "✅",
-                "failed": "❌",
-                "blocked": "🚫",
-            }.get(p.status, "?")
-            prefix = "  " * indent + ("└─ " if indent > 0 else "")
-            lines.append(f"{prefix}{icon} [{p.id}] {p.description} {status_icon}")
-            for child_id in p.may_cause:
-                _render(child_id, indent + 1)
-
-        for root in roots:
-            _render(root.id)
+        sev_icon = _SEVERITY_ICON.get
+        status_icon = _STATUS_ICON.get
+
+        # Iteracyjny DFS (pre-order) – głębokie łańcuchy nie wyczerpią stosu
+        for root_id in self._roots:
+            stack = [(root_id, 0)]
+            while stack:
+                pid, indent = stack.pop()
+                if pid in visited or pid not in self.nodes:
+                    continue
+                visited.add(pid)
+                p = self.nodes[pid]
+                prefix = "  " * indent + ("└─ " if indent > 0 else "")
+                lines.append(
+                    f"{prefix}{sev_icon(p.severity, '⚪')} [{p.id}] {p.description} "
+                    f"{status_icon(p.status, '?')}"
+                )
+                stack.extend(
+                    (child_id, indent + 1) for child_id in reversed(p.may_cause)
+                )
 
         # Dodaj orphaned (mają caused_by ale rodzic nie istnieje)
         for p in self.nodes.values():
@@ -131,12 +169,16 @@ class ProblemGraph:
 
     def _recalculate_order(self) -> None:
         """Topological sort (Kahn's algorithm) – problemy bez zależności pierwsze."""
-        in_degree: dict[str, int] = {pid: 0 for pid in self.nodes}
+        in_degree: dict[str, int] = {}
+        deps: dict[str, tuple[str, ...]] = {}
+        roots: list[str] = []
 
-        for p in self.nodes.values():
-            for dep in p.caused_by:
-                if dep in self.nodes:
-                    in_degree[p.id] = in_degree.get(p.id, 0) + 1
+        for pid, p in self.nodes.items():
+            if not p.caused_by:
+                roots.append(pid)
+            # Zależności spoza grafu są ignorowane – liczone raz, nie przy next_actionable
+            deps[pid] = tuple(dep for dep in p.caused_by if dep in self.nodes)
+            in_degree[pid] = len(deps[pid])
 
         queue = deque(pid for pid, deg in in_degree.items() if deg == 0)
         order = []
@@ -152,14 +194,20 @@ class ProblemGraph:
                         queue.append(child_id)
 
         # Dołącz ewentualne cykle (nie powinny wystąpić, ale dla bezpieczeństwa)
-        remaining = [pid for pid in self.nodes if pid not in order]
-        self.execution_order = order + remaining
+        ordered = set(order)
+        execution_order = order + [pid for pid in self.nodes if pid not in ordered]
 
         # Sortuj po severity w ramach tej samej warstwy
-        severity_rank = {"critical": 0, "warning": 1, "info": 2}
-        self.execution_order.sort(
+        nodes = self.nodes
+        rank = _SEVERITY_RANK.get
+        execution_order.sort(
             key=lambda pid: (
-                self.nodes[pid].caused_by != [],  # root problems first
-                severity_rank.get(self.nodes[pid].severity, 3),
+                bool(nodes[pid].caused_by),  # root problems first
+                rank(nodes[pid].severity, 3),
             )
         )
+        self._execution_order = execution_order
+        self._deps = deps
+        self._roots = roots
+        self._unblocked = {pid for pid, pid_deps in deps.items() if not pid_deps}
+        self._dirty = False
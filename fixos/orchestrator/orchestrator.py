@@ -9,11 +9,12 @@ import asyncio
 import json
 import time
 import uuid
+from collections import deque
 from typing import Optional
 
 from ..config import FixOsConfig
 from ..providers.llm import LLMClient, LLMError
-from ..utils.anonymizer import anonymize
+from ..utils.anonymizer import anonymize, anonymize_cached, anonymize_obj
 from ..utils.terminal import (
     console,
     print_problem_header,
@@ -29,6 +30,15 @@ from .executor import (
 )
 from .graph import Problem, ProblemGraph
 
+try:
+    # Opcjonalny szybki parser (pip install fixos[fast]); jego JSONDecodeError
+    # dziedziczy po json.JSONDecodeError, więc obsługa błędów się nie zmienia
+    import orjson
+
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
 
 class _SkipAll(Exception):
     """Rzucany gdy user wpisuje 's' – pomija wszystkie komendy bieżącego problemu."""
@@ -102,6 +112,7 @@ class FixOrchestrator:
         config: FixOsConfig,
         executor: Optional[CommandExecutor] = None,
         auto_confirm_threshold: float = 0.90,
+        max_parallel: int = 4,
     ):
         self.config = config
         self.llm = LLMClient(config)
@@ -111,15 +122,20 @@ class FixOrchestrator:
             dry_run=False,
         )
         self.graph = ProblemGraph()
-        self.session_log: list[dict] = []
+        # Ring buffer – długie sesje nie rosną bez końca; licznik trzyma sumę
+        self.session_log: deque[dict] = deque(maxlen=config.session_log_max)
+        self._log_count = 0
         self.auto_confirm_threshold = auto_confirm_threshold
-        self._start_time = time.time()
+        self.max_parallel = max_parallel
+        self._start_time = time.monotonic()
+        # Znacznik czasu bieżącej iteracji pętli napraw – wspólny dla jej zdarzeń
+        self._iteration_ts: Optional[float] = None
 
     # ── Public API ─────────────────────────────────────────────────────────
 
     def load_from_diagnostics(self, diagnostics: dict) -> list[Problem]:
         """Parsuje dane diagnostyczne przez LLM i buduje graf problemów."""
-        anon_str, _ = anonymize(str(diagnostics))
+        anon_str, _ = anonymize_obj(diagnostics)
         os_info_raw = diagnostics.get("system", {}).get("os_release", "Linux")
         os_info, _ = anonymize(os_info_raw)
 
@@ -176,11 +192,16 @@ class FixOrchestrator:
     def _process_fix_commands(self, problem, confirm_fn, progress_fn) -> tuple:
         """Execute all fix commands for a problem.
 
-        Returns (last_result, skip_all) where skip_all signals the outer loop
-        should move to the next problem without rediagnosis.
+        Returns (last_result, skip_all, completed): skip_all signals the outer
+        loop should move to the next problem without rediagnosis; completed is
+        True only when every planned command ran (nothing skipped or blocked).
         """
         last_result = None
         skip_all = False
+        completed = False
+        ran = False
+        # Stan wszystkich komend sprawdzany jedną powłoką zamiast osobno
+        satisfied = self.executor.check_idempotent_many(problem.fix_commands)
         for cmd in problem.fix_commands:
             try:
                 if not confirm_fn(problem, cmd):
@@ -197,7 +218,13 @@ class FixOrchestrator:
                 break
 
             try:
-                result = self.executor.execute_sync(cmd)
+                if not ran and cmd in satisfied:
+                    result = self.executor.satisfied_result(cmd)
+                else:
+                    # Po wykonanej komendzie zbiorcze sprawdzenie jest nieaktualne
+                    # (np. rm przed mkdir) – dalej stan sprawdzany per komenda
+                    result = self.executor.execute_sync(cmd, check_idempotent=ran)
+                ran = ran or result.executed
                 last_result = result
                 self._log("executed", result.to_context())
                 progress_fn(problem, result)
@@ -214,14 +241,100 @@ class FixOrchestrator:
                     command=cmd, timed_out=True, executed=False
                 )
                 break
+        else:
+            completed = True
+
+        return last_result, skip_all, completed
+
+    async def _process_fix_commands_async(
+        self, problem, confirm_fn, progress_fn, pkg_lock
+    ) -> tuple:
+        """Async twin of _process_fix_commands using CommandExecutor.execute.
+
+        confirm_fn is awaited here (run_async wraps the user callback);
+        idempotency probes run in a worker thread. pkg_lock is shared by the
+        whole run so package-manager commands never run concurrently.
+        """
+        last_result = None
+        skip_all = False
+        completed = False
+        ran = False
+        satisfied = await asyncio.to_thread(
+            self.executor.check_idempotent_many, problem.fix_commands
+        )
+        for cmd in problem.fix_commands:
+            try:
+                if not await confirm_fn(problem, cmd):
+                    problem.status = "skipped"
+                    self._log("skipped", {"problem_id": problem.id, "command": cmd})
+                    break
+            except _SkipAll:
+                skip_all = True
+                problem.status = "skipped"
+                self._log("skipped_all", {"problem_id": problem.id})
+                break
+
+            try:
+                if ran:
+                    # Jak w _process_fix_commands: po wykonanej komendzie sprawdź
+                    # stan od nowa zamiast ufać wynikowi sprzed pętli
+                    satisfied = await asyncio.to_thread(
+                        self.executor.check_idempotent_many, [cmd]
+                    )
+                if cmd in satisfied:
+                    result = self.executor.satisfied_result(cmd)
+                elif self.executor.is_package_command(cmd):
+                    async with pkg_lock:
+                        result = await self.executor.execute(cmd)
+                else:
+                    result = await self.executor.execute(cmd)
+                ran = ran or result.executed
+                last_result = result
+                self._log("executed", result.to_context())
+                progress_fn(problem, result)
+                if not result.success and result.executed:
+                    break
+            except DangerousCommandError as e:
+                console.print(f"\n  [bold red]⛔ ZABLOKOWANO:[/bold red] {e}")
+                problem.status = "failed"
+                self._log("dangerous_blocked", {"command": cmd, "error": str(e)})
+                break
+            except CommandTimeoutError as e:
+                console.print(f"\n  [bold yellow]⏰ TIMEOUT:[/bold yellow] {e}")
+                last_result = ExecutionResult(
+                    command=cmd, timed_out=True, executed=False
+                )
+                break
+        else:
+            completed = True
 
-        return last_result, skip_all
+        return last_result, skip_all, completed
 
-    def _process_rediagnose(self, problem, last_result) -> None:
+    def _process_rediagnose(self, problem, last_result, completed) -> None:
         """Evaluate fix result via LLM and attach any newly discovered problems."""
+        self._attach_new_problems(
+            problem, self._rediagnose(problem, last_result, completed)
+        )
+
+    def _rediagnose(self, problem, last_result, completed) -> list[Problem]:
+        """Set the problem's verdict; return new problems without touching the graph."""
         if last_result is None:
-            return
-        new_problems = self._evaluate_and_rediagnose(problem, last_result)
+            return []
+        # Szybki werdykt tylko gdy przeszły wszystkie komendy – po zablokowanej
+        # albo pominiętej komendzie ostatni wynik nie mówi nic o całej naprawie
+        verdict = None
+        if completed and problem.status == "in_progress":
+            verdict = self._fast_verdict(last_result)
+        if verdict is not None:
+            problem.status = verdict
+            self._log(
+                "evaluate_skipped",
+                {"problem_id": problem.id, "verdict": verdict},
+            )
+            return []
+        return self._evaluate_and_rediagnose(problem, last_result)
+
+    def _attach_new_problems(self, problem, new_problems: list[Problem]) -> None:
         for np in new_problems:
             np.caused_by.append(problem.id)
             problem.may_cause.append(np.id)
@@ -252,6 +365,7 @@ class FixOrchestrator:
 
         while not self.graph.all_done() and iteration < max_iterations:
             iteration += 1
+            self._iteration_ts = time.monotonic()
             problem = self.graph.next_actionable()
             if problem is None:
                 break
@@ -259,22 +373,77 @@ class FixOrchestrator:
             problem.status = "in_progress"
             problem.attempts += 1
 
-            last_result, skip_all = self._process_fix_commands(
+            last_result, skip_all, completed = self._process_fix_commands(
                 problem, confirm_fn, progress_fn
             )
             if skip_all:
                 continue
 
-            self._process_rediagnose(problem, last_result)
+            self._process_rediagnose(problem, last_result, completed)
 
+        self._iteration_ts = None
         return self._session_summary()
 
     async def run_async(self, confirm_fn=None, progress_fn=None) -> dict:
-        """Asynchroniczna wersja run_sync."""
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(
-            None, lambda: self.run_sync(confirm_fn, progress_fn)
-        )
+        """
+        Asynchroniczna wersja run_sync.
+
+        Naprawia całą warstwę gotowych problemów naraz (graph.all_actionable),
+        maks. max_parallel jednocześnie. Komendy idą przez
+        CommandExecutor.execute, a ocena wyniku przez LLM (blokujące wywołanie
+        HTTP) w osobnym wątku – pętla zdarzeń nie stoi. Nowe problemy trafiają
+        do grafu w wątku pętli, a komendy menedżerów pakietów idą po kolei.
+        """
+        if confirm_fn is None:
+            confirm_fn = self._default_confirm
+        if progress_fn is None:
+            progress_fn = self._default_progress
+
+        # Pytania o potwierdzenie po kolei – równoległe są tylko same komendy
+        confirm_lock = asyncio.Lock()
+
+        async def _confirm(problem, cmd) -> bool:
+            async with confirm_lock:
+                return await asyncio.to_thread(confirm_fn, problem, cmd)
+
+        semaphore = asyncio.Semaphore(self.max_parallel)
+        pkg_lock = asyncio.Lock()
+
+        async def _fix(problem: Problem) -> None:
+            async with semaphore:
+                (
+                    last_result,
+                    skip_all,
+                    completed,
+                ) = await self._process_fix_commands_async(
+                    problem, _confirm, progress_fn, pkg_lock
+                )
+                if not skip_all:
+                    new_problems = await asyncio.to_thread(
+                        self._rediagnose, problem, last_result, completed
+                    )
+                    # Graf zmieniany tylko w wątku pętli – wątki jedynie oceniają
+                    self._attach_new_problems(problem, new_problems)
+
+        max_iterations = 50
+        iteration = 0
+
+        while not self.graph.all_done() and iteration < max_iterations:
+            layer = self.graph.all_actionable()[: max_iterations - iteration]
+            if not layer:
+                break
+            iteration += len(layer)
+            self._iteration_ts = time.monotonic()
+
+            # Oznacz całą warstwę przed startem, żeby żaden problem nie ruszył dwa razy
+            for problem in layer:
+                problem.status = "in_progress"
+                problem.attempts += 1
+
+            await asyncio.gather(*(_fix(p) for p in layer))
+
+        self._iteration_ts = None
+        return self._session_summary()
 
     # ── Private helpers ────────────────────────────────────────────────────
 
@@ -282,8 +451,8 @@ class FixOrchestrator:
         self, problem: Problem, result: ExecutionResult
     ) -> list[Problem]:
         """Wysyła wynik do LLM, ocenia sukces i wykrywa nowe problemy."""
-        anon_stdout, _ = anonymize(result.stdout)
-        anon_stderr, _ = anonymize(result.stderr)
+        anon_stdout = anonymize_cached(result.stdout)
+        anon_stderr = anonymize_cached(result.stderr)
 
         prompt = EVALUATE_PROMPT.format(
             problem=json.dumps(problem.to_summary(), ensure_ascii=False),
@@ -346,39 +515,61 @@ class FixOrchestrator:
                 problem.status = "pending"
             return []
 
+    @staticmethod
+    def _fast_verdict(result: ExecutionResult) -> Optional[str]:
+        """
+        Werdykt bez pytania LLM, gdy wynik jest jednoznaczny: komenda
+        faktycznie się wykonała i przeszła z kodem 0 bez stderr. Wynik
+        "już wykonane" pochodzi ze sprawdzenia stanu, nie z naprawy, więc
+        idzie do oceny przez LLM. None → potrzebna ocena przez LLM.
+        """
+        if not result.executed:
+            return None
+        if result.returncode != 0 or result.stderr or result.timed_out:
+            return None
+        return "resolved"
+
     def _parse_json(self, raw: str) -> dict:
         """Parsuje JSON z odpowiedzi LLM (usuwa markdown code fences)."""
         text = raw.strip()
         # Usuń ```json ... ``` jeśli obecne
         if text.startswith("```"):
-            lines = text.splitlines()
-            text = "\n".join(
-                line for line in lines if not line.strip().startswith("```")
-            )
+            # Odetnij całą linię otwierającą (```json, ```JSON, ```) i zamykające ```
+            nl = text.find("\n")
+            text = text[nl + 1 :] if nl != -1 else text[3:]
+            text = text.removesuffix("```").strip()
         try:
-            return json.loads(text)
+            return _json_loads(text)
         except json.JSONDecodeError:
-            # Spróbuj wyciągnąć JSON z tekstu
-            import re
-
-            m = re.search(r"\{.*\}", text, re.DOTALL)
-            if m:
-                return json.loads(m.group())
-            raise ValueError(f"Nie można sparsować JSON z odpowiedzi LLM: {raw[:200]}")
+            pass
+        # Spróbuj wyciągnąć JSON z tekstu – raw_decode od kolejnych "{",
+        # liniowo i bez backtrackingu regexa na uciętych odpowiedziach
+        decoder = json.JSONDecoder()
+        i = text.find("{")
+        while i != -1:
+            try:
+                return decoder.raw_decode(text, i)[0]
+            except json.JSONDecodeError:
+                i = text.find("{", i + 1)
+        raise ValueError(f"Nie można sparsować JSON z odpowiedzi LLM: {raw[:200]}")
 
     def _log(self, event: str, data: dict) -> None:
+        self._log_count += 1
+        ts = self._iteration_ts
+        if ts is None:
+            ts = time.monotonic()
         self.session_log.append(
             {
                 "event": event,
-                "timestamp": time.time() - self._start_time,
+                "timestamp": ts - self._start_time,
                 **data,
             }
         )
 
     def _session_summary(self) -> dict:
         summary = self.graph.summary()
-        summary["elapsed_seconds"] = int(time.time() - self._start_time)
-        summary["log_entries"] = len(self.session_log)
+        summary["elapsed_seconds"] = int(time.monotonic() - self._start_time)
+        summary["log_entries"] = self._log_count
         return summary
 
     @staticmethod
@@ -5,9 +5,18 @@ Handles differences between Linux, macOS, and Windows.
 
 from __future__ import annotations
 
+import asyncio
+import os
 import platform
+import re
+import selectors
+import shlex
+import shutil
+import signal
 import subprocess
 import sys
+import time
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 
@@ -18,8 +27,30 @@ IS_MAC = SYSTEM == "Darwin"
 IS_POSIX = IS_LINUX or IS_MAC
 
 
-def get_os_info() -> dict:
-    """Returns basic OS information."""
+def _linux_os_info() -> dict:
+    try:
+        return {"distro": Path("/etc/os-release").read_text(errors="replace")[:300]}
+    except Exception:
+        return {"distro": "unknown"}
+
+
+def _windows_os_info() -> dict:
+    return {
+        "edition": (
+            platform.win32_edition()
+            if hasattr(platform, "win32_edition")
+            else "unknown"
+        )
+    }
+
+
+# Per-OS helpers are picked once here instead of branching on every call
+_OS_INFO_EXTRA = {"Linux": _linux_os_info, "Windows": _windows_os_info}.get(SYSTEM)
+
+
+@lru_cache(maxsize=1)
+def _static_os_info() -> dict:
+    # Release, distro and edition don't change while the process runs
     info = {
         "system": SYSTEM,
         "release": platform.release(),
@@ -27,107 +58,127 @@ def get_os_info() -> dict:
         "machine": platform.machine(),
         "python": sys.version.split()[0],
     }
-    if IS_LINUX:
-        try:
-            info["distro"] = Path("/etc/os-release").read_text(errors="replace")[:300]
-        except Exception:
-            info["distro"] = "unknown"
-    if IS_WINDOWS:
-        info["edition"] = (
-            platform.win32_edition()
-            if hasattr(platform, "win32_edition")
-            else "unknown"
-        )
+    if _OS_INFO_EXTRA is not None:
+        info.update(_OS_INFO_EXTRA())
     return info
 
 
+def get_os_info() -> dict:
+    """Returns basic OS information."""
+    # Fresh copy – callers may add their own keys
+    return dict(_static_os_info())
+
+
+# needs_elevation() looks up the command's first token instead of testing
+# every prefix; the few multi-word / partial-name entries are checked apart.
+# Tool variants (dnf5, rpm-ostree, pacman-key...) are listed by full name.
+_SUDO_FIRST_TOKENS = frozenset(
+    {
+        "dnf",
+        "dnf5",
+        "apt",
+        "apt-get",
+        "apt-key",
+        "apt-mark",
+        "yum",
+        "yum-config-manager",
+        "pacman",
+        "pacman-key",
+        "zypper",
+        "rpm",
+        "rpm-ostree",
+        "rpmkeys",
+        "systemctl",
+        "firewall-cmd",
+        "setenforce",
+        "modprobe",
+        "rmmod",
+        "alsactl",
+        "update-grub",
+        "chown",
+        "mount",
+        "umount",
+        "useradd",
+        "usermod",
+    }
+)
+_SUDO_OTHER_PREFIXES = ("grub2-", "chmod 0", "snap install", "flatpak install")
+_ELEVATED_FIRST_TOKENS = frozenset(
+    {
+        "sc",
+        "net",
+        "netsh",
+        "reg",
+        "bcdedit",
+        "diskpart",
+        "sfc",
+        "dism",
+        "wmic",
+        "powercfg",
+        "icacls",
+    }
+)
+
+
 def needs_elevation(cmd: str) -> bool:
     """Returns True if command likely needs admin/sudo."""
-    cmd = cmd.strip()
+    tokens = cmd.split(None, 1)
+    if not tokens:
+        return False
+    first = tokens[0]
     if IS_WINDOWS:
-        elevated_prefixes = [
-            "sc ",
-            "net ",
-            "netsh ",
-            "reg ",
-            "bcdedit",
-            "diskpart",
-            "sfc ",
-            "dism ",
-            "wmic ",
-            "powercfg",
-            "icacls",
-        ]
-        return any(cmd.lower().startswith(p) for p in elevated_prefixes)
-    else:
-        sudo_prefixes = [
-            "dnf",
-            "apt",
-            "apt-get",
-            "yum",
-            "pacman",
-            "zypper",
-            "rpm",
-            "systemctl",
-            "firewall-cmd",
-            "setenforce",
-            "modprobe",
-            "rmmod",
-            "alsactl",
-            "grub2-",
-            "update-grub",
-            "chmod 0",
-            "chown",
-            "mount",
-            "umount",
-            "useradd",
-            "usermod",
-            "snap install",
-            "flatpak install",
-        ]
-        return any(cmd.startswith(p) for p in sudo_prefixes) and not cmd.startswith(
-            "sudo"
-        )
+        return first.lower().removesuffix(".exe") in _ELEVATED_FIRST_TOKENS
+    if first in _SUDO_FIRST_TOKENS:
+        return True
+    return cmd.lstrip().startswith(_SUDO_OTHER_PREFIXES)
 
 
-def elevate_cmd(cmd: str) -> str:
-    """Adds sudo (Linux/Mac) or wraps in PowerShell -Verb RunAs (Windows)."""
-    if IS_WINDOWS:
-        # On Windows, we can't auto-elevate inline; just return as-is with a note
-        return cmd
-    else:
-        if needs_elevation(cmd):
-            return "sudo " + cmd.strip()
-        return cmd
+def _elevate_posix(cmd: str) -> str:
+    """Adds sudo when the command needs it."""
+    if needs_elevation(cmd):
+        return "sudo " + cmd.strip()
+    return cmd
+
+
+def _elevate_windows(cmd: str) -> str:
+    """On Windows, we can't auto-elevate inline; just return as-is."""
+    return cmd
+
+
+# Adds sudo (Linux/Mac) or leaves the command as-is (Windows)
+elevate_cmd = _elevate_windows if IS_WINDOWS else _elevate_posix
+
+
+# Dangerous patterns are compiled once and joined into a single alternation
+# (g0|g1|...) so each command is scanned once; the group name indexes the reason.
+_DANGER_PATTERNS = [
+    (r"rm\s+-rf\s+/(?!\w)", "rm -rf / destroys root filesystem"),
+    (
+        r"rm\s+-rf\s+/(?:boot|etc|usr|lib|bin|sbin)\b",
+        "deletes critical system directory",
+    ),
+    (r"dd\s+if=.*of=/dev/(?:sd|nvme|vd|hd)[a-z](?!\d)", "overwrites disk with dd"),
+    (r"mkfs\.", "formats filesystem"),
+    (r":\(\)\{.*\};:", "fork bomb"),
+    (r">\s*/dev/(?:sd|nvme|vd)", "writes directly to block device"),
+    (r"format\s+[a-z]:", "Windows format command"),
+    (r"del\s+/[sf]\s+[a-z]:\\windows", "deletes Windows system files"),
+]
+_DANGER = re.compile(
+    "|".join(f"(?P<g{i}>{pat})" for i, (pat, _) in enumerate(_DANGER_PATTERNS)),
+    re.IGNORECASE,
+)
+_DANGER_REASONS = [reason for _, reason in _DANGER_PATTERNS]
 
 
 def is_dangerous(cmd: str) -> Optional[str]:
     """Returns reason string if command is dangerous, None if safe."""
-    import re
-
-    patterns = [
-        (r"rm\s+-rf\s+/(?!\w)", "rm -rf / destroys root filesystem"),
-        (
-            r"rm\s+-rf\s+/(?:boot|etc|usr|lib|bin|sbin)\b",
-            "deletes critical system directory",
-        ),
-        (r"dd\s+if=.*of=/dev/(?:sd|nvme|vd|hd)[a-z](?!\d)", "overwrites disk with dd"),
-        (r"mkfs\.", "formats filesystem"),
-        (r":\(\)\{.*\};:", "fork bomb"),
-        (r">\s*/dev/(?:sd|nvme|vd)", "writes directly to block device"),
-        (r"format\s+[a-z]:", "Windows format command"),
-        (r"del\s+/[sf]\s+[a-z]:\\windows", "deletes Windows system files"),
-    ]
-    for pat, reason in patterns:
-        if re.search(pat, cmd, re.IGNORECASE):
-            return reason
-    return None
+    m = _DANGER.search(cmd)
+    return _DANGER_REASONS[int(m.lastgroup[1:])] if m else None
 
 
 def is_interactive_blocker(cmd: str) -> Optional[str]:
     """Returns reason string if command is likely to hang in non-interactive session."""
-    import re
-
     patterns = [
         (r"\bnewgrp\b", "newgrp replaces the shell and waits for input"),
         (r"\bsu\s+-(\s+|$)", "su - starts a new login shell"),
@@ -146,6 +197,27 @@ def is_interactive_blocker(cmd: str) -> Optional[str]:
     return None
 
 
+# Characters that need /bin/sh -c (pipes, redirects, globs, "#" comments...).
+# Without a shell a "# comment" would reach the program as extra arguments.
+_SHELL_METACHARS = frozenset("#|&;<>`$()*?[]{}~\n")
+
+
+def split_simple_command(cmd: str) -> Optional[list[str]]:
+    """
+    Returns argv for a simple command that can run without /bin/sh -c,
+    or None when the command needs a shell.
+    """
+    if _SHELL_METACHARS.intersection(cmd):
+        return None
+    try:
+        argv = shlex.split(cmd)
+    except ValueError:
+        return None
+    if not argv or "=" in argv[0]:
+        return None  # empty command or VAR=x cmd assignment
+    return argv
+
+
 def run_command(
     cmd: str,
     timeout: int = 120,
@@ -157,8 +229,6 @@ def run_command(
     """
     try:
         if IS_WINDOWS and not shell:
-            import shlex
-
             args = shlex.split(cmd)
         else:
             args = cmd
@@ -184,22 +254,230 @@ def run_command(
         return False, "", f"[ERROR: {e}]", -3
 
 
+def _decode(data: bytes) -> str:
+    return data.decode("utf-8", errors="replace").strip()
+
+
+async def run_command_async(
+    cmd: str,
+    timeout: int = 120,
+) -> tuple[bool, str, str, int]:
+    """
+    Async counterpart of run_command() for probes that can overlap.
+    Returns (success, stdout, stderr, returncode).
+    """
+    try:
+        proc = await asyncio.create_subprocess_shell(
+            cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=IS_POSIX,
+        )
+    except Exception as e:
+        return False, "", f"[ERROR: {e}]", -3
+    try:
+        out, err = await asyncio.wait_for(proc.communicate(), timeout)
+    except asyncio.TimeoutError:
+        # Kill the whole group: orphaned children would hold the pipes open
+        if IS_POSIX:
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        else:
+            proc.kill()
+        await proc.wait()
+        return False, "", f"[TIMEOUT {timeout}s]", -2
+    return proc.returncode == 0, _decode(out), _decode(err), proc.returncode
+
+
+def run_commands_parallel(
+    cmds: list[str],
+    timeout: int = 120,
+    max_concurrency: int = 8,
+) -> list[tuple[bool, str, str, int]]:
+    """
+    Runs independent commands concurrently (at most max_concurrency at a
+    time) and returns their results in input order. Total wall time is
+    roughly the slowest command rather than the sum. Must not be called
+    from inside a running event loop — await run_command_async there.
+    """
+
+    async def _gather() -> list[tuple[bool, str, str, int]]:
+        gate = asyncio.Semaphore(max_concurrency)
+
+        async def _one(cmd: str) -> tuple[bool, str, str, int]:
+            async with gate:
+                return await run_command_async(cmd, timeout=timeout)
+
+        return await asyncio.gather(*(_one(cmd) for cmd in cmds))
+
+    if not cmds:
+        return []
+    return asyncio.run(_gather())
+
+
+class ShellSession:
+    """
+    Persistent POSIX shell for running many short probes in a row.
+
+    Each run() writes the command to one long-lived /bin/sh followed by
+    sentinel lines carrying the exit status, so a batch of diagnostics
+    pays for a single fork/exec of the shell instead of one per command.
+    Commands share the shell's state (cwd, variables); a command that
+    kills the shell (exit, syntax error) ends that call and the next one
+    starts a fresh shell. Falls back to run_command() on Windows.
+    """
+
+    def __init__(self, shell: str = "/bin/sh"):
+        self._shell = shell
+        self._proc: Optional[subprocess.Popen] = None
+        self._seq = 0
+
+    def __enter__(self) -> "ShellSession":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _ensure_started(self) -> bool:
+        if self._proc is not None and self._proc.poll() is None:
+            return True
+        self._proc = None
+        if not IS_POSIX:
+            return False
+        try:
+            self._proc = subprocess.Popen(
+                [self._shell],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                bufsize=0,
+            )
+        except OSError:
+            return False
+        return True
+
+    def run(self, cmd: str, timeout: int = 120) -> tuple[bool, str, str, int]:
+        """Runs cmd in the session. Same return shape as run_command()."""
+        if not self._ensure_started():
+            return run_command(cmd, timeout=timeout)
+
+        self._seq += 1
+        tag = f"__FIXOS_RC_{os.getpid()}_{self._seq}"
+        # stdin=/dev/null keeps the command from eating the rest of the script
+        script = (
+            f"{{ {cmd}\n}} </dev/null\n"
+            f"printf '\\n{tag}_%s__\\n' \"$?\"\n"
+            f"printf '\\n{tag}__\\n' >&2\n"
+        )
+        proc = self._proc
+        try:
+            proc.stdin.write(script.encode("utf-8"))
+            proc.stdin.flush()
+        except (BrokenPipeError, OSError):
+            self.close()
+            return run_command(cmd, timeout=timeout)
+
+        out_mark = f"\n{tag}_".encode()
+        err_mark = f"\n{tag}__\n".encode()
+        out, err = bytearray(), bytearray()
+        deadline = time.monotonic() + timeout
+        with selectors.DefaultSelector() as sel:
+            sel.register(proc.stdout, selectors.EVENT_READ, (out, out_mark))
+            sel.register(proc.stderr, selectors.EVENT_READ, (err, err_mark))
+            while sel.get_map():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.close(kill=True)
+                    return False, "", f"[TIMEOUT {timeout}s]", -2
+                for key, _ in sel.select(remaining):
+                    buf, mark = key.data
+                    chunk = os.read(key.fd, 65536)
+                    if not chunk:
+                        sel.unregister(key.fileobj)
+                        continue
+                    start = max(0, len(buf) - len(mark) - 16)
+                    buf += chunk
+                    idx = buf.find(mark, start)
+                    if idx != -1 and (mark is err_mark or b"__\n" in buf[idx + 1 :]):
+                        sel.unregister(key.fileobj)
+
+        out_idx = out.find(out_mark)
+        err_idx = err.find(err_mark)
+        if out_idx == -1:
+            # The shell died mid-command (exit, syntax error, signal)
+            rc = proc.wait()
+            self._proc = None
+            return (
+                False,
+                _decode(out),
+                _decode(err if err_idx == -1 else err[:err_idx]),
+                rc,
+            )
+        rc_field = out[out_idx + len(out_mark) : out.index(b"__\n", out_idx + 1)]
+        rc = int(rc_field) if rc_field.isdigit() else -3
+        return (
+            rc == 0,
+            _decode(out[:out_idx]),
+            _decode(err if err_idx == -1 else err[:err_idx]),
+            rc,
+        )
+
+    def run_many(
+        self, cmds: list[str], timeout: int = 120
+    ) -> list[tuple[bool, str, str, int]]:
+        """Runs cmds one after another in the session, preserving order."""
+        return [self.run(cmd, timeout=timeout) for cmd in cmds]
+
+    def close(self, kill: bool = False) -> None:
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            if kill:
+                proc.kill()
+            else:
+                proc.stdin.close()
+            proc.wait(timeout=1)
+        except (OSError, subprocess.TimeoutExpired):
+            proc.kill()
+            proc.wait()
+        finally:
+            proc.stdout.close()
+            proc.stderr.close()
+
+
+if IS_WINDOWS:
+    _PM_CANDIDATES = ("winget", "choco", "scoop")
+elif IS_MAC:
+    _PM_CANDIDATES = ("brew",)
+else:
+    _PM_CANDIDATES = ("dnf", "apt-get", "apt", "pacman", "zypper", "yum", "apk")
+
+
+@lru_cache(maxsize=None)
 def get_package_manager() -> Optional[str]:
     """Detects the system package manager."""
-    if IS_WINDOWS:
-        for pm in ["winget", "choco", "scoop"]:
-            if _cmd_exists(pm):
-                return pm
-        return None
-    elif IS_MAC:
-        if _cmd_exists("brew"):
-            return "brew"
-        return None
-    else:
-        for pm in ["dnf", "apt-get", "apt", "pacman", "zypper", "yum", "apk"]:
-            if _cmd_exists(pm):
-                return pm
-        return None
+    for pm in _PM_CANDIDATES:
+        if _cmd_exists(pm):
+            return pm
+    return None
+
+
+_INSTALL_TEMPLATES = {
+    "dnf": "dnf install -y {}",
+    "apt-get": "apt-get install -y {}",
+    "apt": "apt install -y {}",
+    "pacman": "pacman -S --noconfirm {}",
+    "zypper": "zypper install -y {}",
+    "yum": "yum install -y {}",
+    "apk": "apk add {}",
+    "brew": "brew install {}",
+    "winget": "winget install {}",
+    "choco": "choco install -y {}",
+    "scoop": "scoop install {}",
+}
 
 
 def install_package_cmd(package: str) -> str:
@@ -207,45 +485,35 @@ def install_package_cmd(package: str) -> str:
     pm = get_package_manager()
     if not pm:
         return f"# No package manager detected. Install {package} manually."
-    cmds = {
-        "dnf": f"dnf install -y {package}",
-        "apt-get": f"apt-get install -y {package}",
-        "apt": f"apt install -y {package}",
-        "pacman": f"pacman -S --noconfirm {package}",
-        "zypper": f"zypper install -y {package}",
-        "yum": f"yum install -y {package}",
-        "apk": f"apk add {package}",
-        "brew": f"brew install {package}",
-        "winget": f"winget install {package}",
-        "choco": f"choco install -y {package}",
-        "scoop": f"scoop install {package}",
-    }
-    return cmds.get(pm, f"# install {package}")
+    return _INSTALL_TEMPLATES.get(pm, "# install {}").format(package)
 
 
+@lru_cache(maxsize=None)
 def _cmd_exists(cmd: str) -> bool:
-    import shutil
-
+    # $PATH lookups do not change during a session – resolve each binary once
     return shutil.which(cmd) is not None
 
 
-def setup_signal_timeout(seconds: int, handler) -> bool:
-    """
-    Sets up a timeout signal. Returns True if supported (POSIX only).
-    Windows does not support SIGALRM.
-    """
-    if IS_POSIX:
-        import signal
+def _setup_alarm(seconds: int, handler) -> bool:
+    signal.signal(signal.SIGALRM, handler)
+    signal.alarm(seconds)
+    return True
 
-        signal.signal(signal.SIGALRM, handler)
-        signal.alarm(seconds)
-        return True
+
+def _setup_alarm_unsupported(seconds: int, handler) -> bool:
     return False
 
 
-def cancel_signal_timeout():
-    """Cancels the timeout signal (POSIX only)."""
-    if IS_POSIX:
-        import signal
+def _cancel_alarm() -> None:
+    signal.alarm(0)
+
+
+def _cancel_alarm_unsupported() -> None:
+    return None
+
 
-        signal.alarm(0)
+# Sets up a timeout signal. Returns True if supported (POSIX only) –
+# Windows does not support SIGALRM.
+setup_signal_timeout = _setup_alarm if IS_POSIX else _setup_alarm_unsupported
+# Cancels the timeout signal (POSIX only).
+cancel_signal_timeout = _cancel_alarm if IS_POSIX else _cancel_alarm_unsupported
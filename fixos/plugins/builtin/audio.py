@@ -3,7 +3,15 @@
 from __future__ import annotations
 
 from fixos.plugins.base import DiagnosticPlugin, DiagnosticResult, Finding, Severity
-from fixos.platform_utils import run_command
+from fixos.platform_utils import run_commands_parallel
+
+# Independent probes — run concurrently, results come back in this order
+_PROBES = (
+    "cat /proc/asound/cards",
+    "systemctl --user is-active pipewire",
+    "systemctl --user is-active wireplumber",
+    "ls /lib/firmware/intel/sof 2>/dev/null",
+)
 
 
 class Plugin(DiagnosticPlugin):
@@ -14,9 +22,10 @@ class Plugin(DiagnosticPlugin):
     def diagnose(self) -> DiagnosticResult:
         findings = []
         raw_data = {}
+        alsa_r, pw_r, wp_r, sof_r = run_commands_parallel(list(_PROBES), timeout=5)
 
         # ALSA cards
-        alsa = self._check_alsa()
+        alsa = self._check_alsa(alsa_r)
         raw_data["alsa"] = alsa
         if not alsa.get("cards"):
             findings.append(
@@ -30,7 +39,7 @@ class Plugin(DiagnosticPlugin):
             )
 
         # PipeWire status
-        pw = self._check_pipewire()
+        pw = self._check_pipewire(pw_r)
         raw_data["pipewire"] = pw
         if pw.get("status") == "failed":
             findings.append(
@@ -52,7 +61,7 @@ class Plugin(DiagnosticPlugin):
             )
 
         # WirePlumber
-        wp = self._check_wireplumber()
+        wp = self._check_wireplumber(wp_r)
         raw_data["wireplumber"] = wp
         if wp.get("status") == "failed":
             findings.append(
@@ -65,7 +74,7 @@ class Plugin(DiagnosticPlugin):
             )
 
         # SOF firmware
-        sof = self._check_sof()
+        sof = self._check_sof(sof_r)
         raw_data["sof"] = sof
         if sof.get("missing"):
             findings.append(
@@ -91,27 +100,21 @@ class Plugin(DiagnosticPlugin):
             raw_data=raw_data,
         )
 
-    def _check_alsa(self) -> dict:
-        ok, stdout, stderr, rc = run_command("cat /proc/asound/cards", timeout=5)
+    def _check_alsa(self, result: tuple) -> dict:
+        ok, stdout, stderr, rc = result
         cards = []
         if ok and stdout and "no soundcards" not in stdout.lower():
             cards = [line.strip() for line in stdout.splitlines() if line.strip()]
         return {"cards": cards, "raw": stdout}
 
-    def _check_pipewire(self) -> dict:
-        ok, stdout, stderr, rc = run_command(
-            "systemctl --user is-active pipewire", timeout=5
-        )
+    def _check_pipewire(self, result: tuple) -> dict:
+        ok, stdout, stderr, rc = result
         return {"status": stdout.strip() if stdout else "unknown"}
 
-    def _check_wireplumber(self) -> dict:
-        ok, stdout, stderr, rc = run_command(
-            "systemctl --user is-active wireplumber", timeout=5
-        )
+    def _check_wireplumber(self, result: tuple) -> dict:
+        ok, stdout, stderr, rc = result
         return {"status": stdout.strip() if stdout else "unknown"}
 
-    def _check_sof(self) -> dict:
-        ok, stdout, stderr, rc = run_command(
-            "ls /lib/firmware/intel/sof 2>/dev/null", timeout=5
-        )
+    def _check_sof(self, result: tuple) -> dict:
+        ok, stdout, stderr, rc = result
         return {"missing": not ok or not stdout.strip()}
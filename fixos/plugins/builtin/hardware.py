@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 from fixos.plugins.base import DiagnosticPlugin, DiagnosticResult, Finding, Severity
-from fixos.platform_utils import run_command
+from fixos.platform_utils import ShellSession
 
 
 class Plugin(DiagnosticPlugin):
@@ -12,11 +12,16 @@ class Plugin(DiagnosticPlugin):
     platforms = ["linux"]
 
     def diagnose(self) -> DiagnosticResult:
+        # One shell for all probes instead of a process per command
+        with ShellSession() as sh:
+            return self._diagnose(sh)
+
+    def _diagnose(self, sh: ShellSession) -> DiagnosticResult:
         findings = []
         raw_data = {}
 
         # GPU info
-        gpu = self._check_gpu()
+        gpu = self._check_gpu(sh)
         raw_data["gpu"] = gpu
         if gpu.get("error"):
             findings.append(
@@ -29,7 +34,7 @@ class Plugin(DiagnosticPlugin):
             )
 
         # Battery
-        battery = self._check_battery()
+        battery = self._check_battery(sh)
         raw_data["battery"] = battery
         if battery.get("capacity") is not None and battery["capacity"] < 30:
             findings.append(
@@ -50,7 +55,7 @@ class Plugin(DiagnosticPlugin):
             )
 
         # Touchpad
-        touchpad = self._check_touchpad()
+        touchpad = self._check_touchpad(sh)
         raw_data["touchpad"] = touchpad
         if touchpad.get("missing"):
             findings.append(
@@ -62,7 +67,7 @@ class Plugin(DiagnosticPlugin):
             )
 
         # Camera
-        camera = self._check_camera()
+        camera = self._check_camera(sh)
         raw_data["camera"] = camera
         if camera.get("missing"):
             findings.append(
@@ -74,7 +79,7 @@ class Plugin(DiagnosticPlugin):
             )
 
         # DMI info
-        dmi = self._check_dmi()
+        dmi = self._check_dmi(sh)
         raw_data["dmi"] = dmi
 
         status = Severity.OK
@@ -90,14 +95,14 @@ class Plugin(DiagnosticPlugin):
             raw_data=raw_data,
         )
 
-    def _check_gpu(self) -> dict:
-        ok, stdout, stderr, rc = run_command("lspci | grep -i vga", timeout=5)
+    def _check_gpu(self, sh: ShellSession) -> dict:
+        ok, stdout, stderr, rc = sh.run("lspci | grep -i vga", timeout=5)
         if ok and stdout:
             return {"devices": stdout.splitlines(), "error": None}
         return {"devices": [], "error": "lspci failed or no VGA device"}
 
-    def _check_battery(self) -> dict:
-        ok, stdout, stderr, rc = run_command(
+    def _check_battery(self, sh: ShellSession) -> dict:
+        ok, stdout, stderr, rc = sh.run(
             "cat /sys/class/power_supply/BAT0/capacity 2>/dev/null", timeout=5
         )
         capacity = None
@@ -105,10 +110,10 @@ class Plugin(DiagnosticPlugin):
             capacity = int(stdout.strip())
 
         health = None
-        ok2, full, _, _ = run_command(
+        ok2, full, _, _ = sh.run(
             "cat /sys/class/power_supply/BAT0/energy_full 2>/dev/null", timeout=5
         )
-        ok3, design, _, _ = run_command(
+        ok3, design, _, _ = sh.run(
             "cat /sys/class/power_supply/BAT0/energy_full_design 2>/dev/null", timeout=5
         )
         if ok2 and ok3 and full.strip().isdigit() and design.strip().isdigit():
@@ -118,25 +123,25 @@ class Plugin(DiagnosticPlugin):
 
         return {"capacity": capacity, "health": health}
 
-    def _check_touchpad(self) -> dict:
-        ok, stdout, stderr, rc = run_command(
+    def _check_touchpad(self, sh: ShellSession) -> dict:
+        ok, stdout, stderr, rc = sh.run(
             "grep -i touchpad /proc/bus/input/devices 2>/dev/null", timeout=5
         )
         return {"missing": not ok or not stdout.strip()}
 
-    def _check_camera(self) -> dict:
-        ok, stdout, stderr, rc = run_command("ls /dev/video* 2>/dev/null", timeout=5)
+    def _check_camera(self, sh: ShellSession) -> dict:
+        ok, stdout, stderr, rc = sh.run("ls /dev/video* 2>/dev/null", timeout=5)
         return {
             "missing": not ok or not stdout.strip(),
             "devices": stdout.splitlines() if ok else [],
         }
 
-    def _check_dmi(self) -> dict:
-        ok, stdout, stderr, rc = run_command(
+    def _check_dmi(self, sh: ShellSession) -> dict:
+        ok, stdout, stderr, rc = sh.run(
             "cat /sys/class/dmi/id/product_name 2>/dev/null", timeout=5
         )
         product = stdout.strip() if ok else "unknown"
-        ok2, vendor, _, _ = run_command(
+        ok2, vendor, _, _ = sh.run(
             "cat /sys/class/dmi/id/sys_vendor 2>/dev/null", timeout=5
         )
         return {"product": product, "vendor": vendor.strip() if ok2 else "unknown"}
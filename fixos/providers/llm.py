@@ -7,10 +7,18 @@ from __future__ import annotations
 
 import json
 import time
+from functools import lru_cache
 from typing import Iterator, Type
 
 try:
     import openai
+    from openai import (
+        APIConnectionError,
+        APITimeoutError,
+        AuthenticationError,
+        NotFoundError,
+        RateLimitError,
+    )
 
     _HAS_OPENAI = True
 except ImportError:
@@ -25,6 +33,22 @@ class LLMError(Exception):
     pass
 
 
+@lru_cache(maxsize=8)
+def _shared_client(factory, api_key: str, base_url: str):
+    """
+    Jeden klient (i pula połączeń httpx) na (klucz, base_url) – kolejne
+    LLMClient nie powtarzają handshake'u TLS. Klient OpenAI jest
+    bezpieczny wątkowo. Fabryka jest częścią klucza, żeby podmieniona
+    implementacja (np. w testach) nie dostała starego klienta.
+    """
+    return factory(
+        api_key=api_key,
+        base_url=base_url,
+        timeout=120.0,
+        max_retries=2,
+    )
+
+
 class LLMClient:
     """
     Wrapper nad openai.OpenAI kompatybilny z wieloma providerami.
@@ -36,60 +60,13 @@ class LLMClient:
             raise LLMError("Zainstaluj openai: pip install openai")
 
         self.config = config
-        self._client = openai.OpenAI(
-            api_key=config.api_key or "ollama",  # ollama nie wymaga klucza
-            base_url=config.base_url,
-            timeout=120.0,
-            max_retries=2,
+        self._client = _shared_client(
+            openai.OpenAI,
+            config.api_key or "ollama",  # ollama nie wymaga klucza
+            config.base_url,
         )
         self._total_tokens = 0
 
-    def _handle_api_error(self, e: Exception, attempt: int) -> bool:
-        """
-        Handle a known openai API error.
-        Returns True if the caller should retry, False never (raises on fatal errors).
-        Raises LLMError for fatal conditions.
-        """
-        _type = type(e).__name__
-        _mod = type(e).__module__
-        if not (
-            _mod.startswith("openai")
-            or _type
-            in (
-                "AuthenticationError",
-                "RateLimitError",
-                "NotFoundError",
-                "APIConnectionError",
-                "APITimeoutError",
-            )
-        ):
-            raise LLMError(f"Nieoczekiwany błąd API: {e}") from e
-
-        if _type == "AuthenticationError":
-            raise LLMError(f"Błąd autoryzacji – sprawdź klucz API: {e}") from e
-        if _type == "RateLimitError":
-            wait = 10 * (attempt + 1)
-            print(f"\n  ⚠️  Rate limit – czekam {wait}s...")
-            time.sleep(wait)
-            if attempt == 2:
-                raise LLMError("Rate limit – przekroczono liczbę prób")
-            return True
-        if _type == "NotFoundError":
-            raise LLMError(
-                f"Model '{self.config.model}' nie istnieje dla providera "
-                f"'{self.config.provider}': {e}"
-            ) from e
-        if _type in ("APIConnectionError", "APITimeoutError"):
-            if attempt == 2:
-                raise LLMError(
-                    f"Błąd połączenia z {self.config.base_url}: {e}"
-                    if _type == "APIConnectionError"
-                    else "Timeout połączenia z API"
-                )
-            time.sleep(5)
-            return True
-        raise LLMError(f"Nieoczekiwany błąd API: {e}") from e
-
     def chat(
         self,
         messages: list[dict],
@@ -114,8 +91,30 @@ class LLMClient:
                 if response.usage:
                     self._total_tokens += response.usage.total_tokens
                 return response.choices[0].message.content or ""
+            except AuthenticationError as e:
+                raise LLMError(f"Błąd autoryzacji – sprawdź klucz API: {e}") from e
+            except RateLimitError:
+                wait = 10 * (attempt + 1)
+                print(f"\n  ⚠️  Rate limit – czekam {wait}s...")
+                time.sleep(wait)
+                if attempt == 2:
+                    raise LLMError("Rate limit – przekroczono liczbę prób")
+            except NotFoundError as e:
+                raise LLMError(
+                    f"Model '{self.config.model}' nie istnieje dla providera "
+                    f"'{self.config.provider}': {e}"
+                ) from e
+            # APITimeoutError dziedziczy po APIConnectionError – musi być pierwszy
+            except APITimeoutError:
+                if attempt == 2:
+                    raise LLMError("Timeout połączenia z API")
+                time.sleep(5)
+            except APIConnectionError as e:
+                if attempt == 2:
+                    raise LLMError(f"Błąd połączenia z {self.config.base_url}: {e}")
+                time.sleep(5)
             except Exception as e:
-                self._handle_api_error(e, attempt)
+                raise LLMError(f"Nieoczekiwany błąd API: {e}") from e
 
         raise LLMError("Nie udało się uzyskać odpowiedzi po 3 próbach")
 
@@ -134,11 +133,20 @@ class LLMClient:
                 max_tokens=max_tokens,
                 temperature=temperature,
                 stream=True,
+                # Ostatni chunk (bez choices) niesie zużycie tokenów
+                stream_options={"include_usage": True},
             )
+            usage = None
             for chunk in stream:
-                delta = chunk.choices[0].delta
-                if delta and delta.content:
-                    yield delta.content
+                choices = chunk.choices
+                if choices:
+                    delta = choices[0].delta
+                    if delta and delta.content:
+                        yield delta.content
+                else:
+                    usage = chunk.usage
+            if usage:
+                self._total_tokens += usage.total_tokens
         except Exception as e:
             raise LLMError(f"Błąd streamingu: {e}") from e
 
@@ -3,10 +3,32 @@ Moduł zbierający dane diagnostyczne z systemu system.
 Używa psutil do metryk oraz subprocess do komend systemowych.
 """
 
+import heapq
 import subprocess
-import psutil
+import time
 import platform
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
+from operator import itemgetter
+from typing import Callable
+
+from .constants import CPU_SAMPLE_INTERVAL
+
+psutil = None  # importowany przy pierwszym użyciu przez _load_psutil()
+
+# Komendy są niezależne – uruchamiane równolegle (subprocess zwalnia GIL)
+_MAX_WORKERS = 8
+
+
+def _load_psutil():
+    """Importuje psutil przy pierwszym użyciu i zapamiętuje go w module."""
+    global psutil
+    if psutil is None:
+        import psutil as _psutil
+
+        psutil = _psutil
+    return psutil
 
 
 def run_cmd(cmd: str, timeout: int = 30) -> str:
@@ -25,21 +47,93 @@ def run_cmd(cmd: str, timeout: int = 30) -> str:
         return f"[BŁĄD: {e}]"
 
 
+def run_argv(
+    argv: list[str],
+    keep: slice | None = None,
+    fallback: str | list[str] | None = None,
+    timeout: int = 30,
+) -> str:
+    """
+    Uruchamia program bez powłoki (stderr pomijany jak ``2>/dev/null``).
+
+    keep     – wycinek linii zamiast ``| head -N`` / ``| tail -N``
+    fallback – tekst, gdy programu nie ma w systemie, albo argv uruchamiane
+               jak ``|| cmd`` przy niezerowym kodzie wyjścia
+    """
+    try:
+        result = subprocess.run(
+            argv,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            timeout=timeout,
+        )
+        output, failed = result.stdout.strip(), result.returncode != 0
+    except FileNotFoundError:
+        output, failed = "", True
+        if isinstance(fallback, str):
+            return fallback
+    except subprocess.TimeoutExpired:
+        return f"[TIMEOUT po {timeout}s]"
+    except Exception as e:
+        return f"[BŁĄD: {e}]"
+
+    if failed and isinstance(fallback, list):
+        alt = run_argv(fallback, timeout=timeout)
+        if alt != "(brak outputu)":
+            output = f"{output}\n{alt}" if output else alt
+    if keep is not None and output:
+        output = "\n".join(output.splitlines()[keep])
+    return output if output else "(brak outputu)"
+
+
+def _read_os_release(path: str = "/etc/os-release") -> str:
+    """Linie NAME=/VERSION=/ID= z os-release (bez cat | grep)."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            lines = [
+                line.rstrip("\n")
+                for line in f
+                if line.startswith(("NAME=", "VERSION=", "ID="))
+            ]
+    except OSError as e:
+        return f"[BŁĄD: {e}]"
+    return "\n".join(lines) if lines else "(brak outputu)"
+
+
+@lru_cache(maxsize=None)
+def _static_cpu_counts() -> tuple:
+    """(logiczne, fizyczne) – nie zmieniają się w trakcie działania procesu."""
+    psutil = _load_psutil()
+    return psutil.cpu_count(logical=True), psutil.cpu_count(logical=False)
+
+
+@lru_cache(maxsize=None)
+def _platform_str() -> str:
+    """platform.platform() – stały dla procesu."""
+    return platform.platform()
+
+
 def get_cpu_info() -> dict:
     """Metryki CPU."""
+    psutil = _load_psutil()
+    count_logical, count_physical = _static_cpu_counts()
+    freq = psutil.cpu_freq()
+    load_1m, load_5m, load_15m = psutil.getloadavg()
     return {
         "percent": psutil.cpu_percent(interval=1),
-        "count_logical": psutil.cpu_count(logical=True),
-        "count_physical": psutil.cpu_count(logical=False),
-        "freq_mhz": psutil.cpu_freq().current if psutil.cpu_freq() else "N/A",
-        "load_avg_1m": psutil.getloadavg()[0],
-        "load_avg_5m": psutil.getloadavg()[1],
-        "load_avg_15m": psutil.getloadavg()[2],
+        "count_logical": count_logical,
+        "count_physical": count_physical,
+        "freq_mhz": freq.current if freq else "N/A",
+        "load_avg_1m": load_1m,
+        "load_avg_5m": load_5m,
+        "load_avg_15m": load_15m,
     }
 
 
 def get_memory_info() -> dict:
     """Metryki RAM i SWAP."""
+    psutil = _load_psutil()
     vm = psutil.virtual_memory()
     sw = psutil.swap_memory()
     return {
@@ -55,6 +149,7 @@ def get_memory_info() -> dict:
 
 def get_disk_info() -> dict:
     """Metryki dysków dla wszystkich partycji."""
+    psutil = _load_psutil()
     disks = {}
     for partition in psutil.disk_partitions(all=False):
         try:
@@ -74,6 +169,7 @@ def get_disk_info() -> dict:
 
 def get_network_info() -> dict:
     """Statystyki sieciowe (bez wrażliwych danych - anonimizacja jest osobno)."""
+    psutil = _load_psutil()
     interfaces = {}
     net_if_stats = psutil.net_if_stats()
     net_io = psutil.net_io_counters(pernic=True)
@@ -90,51 +186,102 @@ def get_network_info() -> dict:
 
 def get_top_processes(n: int = 10) -> list:
     """Lista TOP N procesów według zużycia CPU."""
+    psutil = _load_psutil()
+    # cpu_percent() na świeżym uchwycie zwraca 0.0 – najpierw zaczepiamy
+    # pomiar dla wszystkich procesów, czekamy raz i dopiero wtedy czytamy.
+    procs = []
+    for proc in psutil.process_iter(["pid", "name", "memory_percent", "status"]):
+        try:
+            proc.cpu_percent(None)
+            procs.append(proc)
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+    time.sleep(CPU_SAMPLE_INTERVAL)
+
     processes = []
-    for proc in psutil.process_iter(
-        ["pid", "name", "cpu_percent", "memory_percent", "status"]
-    ):
+    for proc in procs:
         try:
-            processes.append(proc.info)
+            processes.append({**proc.info, "cpu_percent": proc.cpu_percent(None)})
         except (psutil.NoSuchProcess, psutil.AccessDenied):
             pass
-    processes.sort(key=lambda x: x.get("cpu_percent", 0), reverse=True)
-    return processes[:n]
+    return heapq.nlargest(n, processes, key=itemgetter("cpu_percent"))
+
+
+# nazwa → (argv, wycinek linii, fallback) dla run_argv(); os_release czytany
+# bezpośrednio z pliku. Zero powłok i potoków head/tail/grep.
+_FEDORA_CMDS: dict[str, tuple | Callable[[], str]] = {
+    "dnf_check_update": (["dnf", "check-update", "--quiet"], slice(30), None),
+    "dnf_history_recent": (["dnf", "history", "list", "--last=5"], None, None),
+    "journal_errors_recent": (
+        [
+            "journalctl",
+            "-p",
+            "err",
+            "-n",
+            "30",
+            "--no-pager",
+            "--since",
+            "24 hours ago",
+        ],
+        None,
+        None,
+    ),
+    "journal_warnings_recent": (
+        [
+            "journalctl",
+            "-p",
+            "warning",
+            "-n",
+            "20",
+            "--no-pager",
+            "--since",
+            "2 hours ago",
+        ],
+        None,
+        None,
+    ),
+    "systemctl_failed": (["systemctl", "--failed", "--no-legend"], None, None),
+    "selinux_status": (["getenforce"], None, "SELinux niedostępny"),
+    "selinux_denials": (
+        ["ausearch", "-m", "avc", "--start", "recent"],
+        slice(-10, None),
+        "auditd niedostępny",
+    ),
+    "rpm_verify": (["rpm", "-Va", "--nofiles", "--nodigest"], slice(20), None),
+    "kernel_version": (["uname", "-r"], None, None),
+    "os_release": _read_os_release,
+    "dmesg_errors": (
+        ["dmesg", "--level=err,crit,emerg", "--notime"],
+        slice(-20, None),
+        None,
+    ),
+    "disk_smart_summary": (
+        ["smartctl", "--scan"],
+        slice(5),
+        "smartmontools niedostępny",
+    ),
+    "firewall_status": (
+        ["firewall-cmd", "--state"],
+        None,
+        ["systemctl", "is-active", "firewalld"],
+    ),
+    "open_ports": (["ss", "-tlnp"], slice(20), None),
+    "cron_errors": (
+        ["journalctl", "-u", "crond", "-n", "10", "--no-pager"],
+        None,
+        None,
+    ),
+}
 
 
 def get_fedora_specific() -> dict:
     """Komendy specyficzne dla system: dnf, journalctl, systemctl."""
-    return {
-        "dnf_check_update": run_cmd("dnf check-update --quiet 2>/dev/null | head -30"),
-        "dnf_history_recent": run_cmd("dnf history list --last=5 2>/dev/null"),
-        "journal_errors_recent": run_cmd(
-            'journalctl -p err -n 30 --no-pager --since "24 hours ago" 2>/dev/null'
-        ),
-        "journal_warnings_recent": run_cmd(
-            'journalctl -p warning -n 20 --no-pager --since "2 hours ago" 2>/dev/null'
-        ),
-        "systemctl_failed": run_cmd("systemctl --failed --no-legend 2>/dev/null"),
-        "selinux_status": run_cmd(
-            'getenforce 2>/dev/null || echo "SELinux niedostępny"'
-        ),
-        "selinux_denials": run_cmd(
-            'ausearch -m avc --start recent 2>/dev/null | tail -10 || echo "auditd niedostępny"'
-        ),
-        "rpm_verify": run_cmd("rpm -Va --nofiles --nodigest 2>/dev/null | head -20"),
-        "kernel_version": run_cmd("uname -r"),
-        "os_release": run_cmd('cat /etc/os-release | grep -E "^(NAME|VERSION|ID)="'),
-        "dmesg_errors": run_cmd(
-            "dmesg --level=err,crit,emerg --notime 2>/dev/null | tail -20"
-        ),
-        "disk_smart_summary": run_cmd(
-            'smartctl --scan 2>/dev/null | head -5 || echo "smartmontools niedostępny"'
-        ),
-        "firewall_status": run_cmd(
-            "firewall-cmd --state 2>/dev/null || systemctl is-active firewalld 2>/dev/null"
-        ),
-        "open_ports": run_cmd("ss -tlnp 2>/dev/null | head -20"),
-        "cron_errors": run_cmd("journalctl -u crond -n 10 --no-pager 2>/dev/null"),
-    }
+    with ThreadPoolExecutor(max_workers=_MAX_WORKERS) as ex:
+        futures = {
+            name: ex.submit(spec) if callable(spec) else ex.submit(run_argv, *spec)
+            for name, spec in _FEDORA_CMDS.items()
+        }
+        return {name: f.result() for name, f in futures.items()}
 
 
 def get_full_diagnostics() -> dict:
@@ -142,27 +289,28 @@ def get_full_diagnostics() -> dict:
     Zbiera kompletne dane diagnostyczne systemu system.
     Zwraca słownik gotowy do anonimizacji i wysłania do LLM.
     """
-    print("  → CPU i obciążenie...", end="\r")
-    cpu = get_cpu_info()
-    print("  → Pamięć RAM i SWAP...", end="\r")
-    memory = get_memory_info()
-    print("  → Dyski i partycje...", end="\r")
-    disks = get_disk_info()
-    print("  → Sieć...            ", end="\r")
-    network = get_network_info()
-    print("  → Procesy...         ", end="\r")
-    processes = get_top_processes()
-    print("  → system (dnf/systemd/journal)...", end="\r")
-    fedora = get_fedora_specific()
-    print("  → Gotowe!             ")
+    from .utils.terminal import console
+
+    # Pomiar CPU (1 s) nakłada się na komendy dnf/journalctl
+    with (
+        console.status("  → CPU, pamięć, dyski, sieć, procesy, system..."),
+        ThreadPoolExecutor(max_workers=6) as ex,
+    ):
+        cpu = ex.submit(get_cpu_info)
+        memory = ex.submit(get_memory_info)
+        disks = ex.submit(get_disk_info)
+        network = ex.submit(get_network_info)
+        processes = ex.submit(get_top_processes)
+        fedora = ex.submit(get_fedora_specific)
+    print("  → Gotowe!")
 
     return {
         "timestamp": datetime.now().isoformat(),
-        "platform": platform.platform(),
-        "cpu": cpu,
-        "memory": memory,
-        "disks": disks,
-        "network": network,
-        "top_processes": processes,
-        "fedora": fedora,
+        "platform": _platform_str(),
+        "cpu": cpu.result(),
+        "memory": memory.result(),
+        "disks": disks.result(),
+        "network": network.result(),
+        "top_processes": processes.result(),
+        "fedora": fedora.result(),
     }
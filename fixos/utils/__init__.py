@@ -1,5 +1,7 @@
 from .anonymizer import (
     anonymize,
+    anonymize_cached,
+    anonymize_obj,
     deanonymize,
     display_anonymized_preview,
     AnonymizationReport,
@@ -8,6 +10,8 @@ from .web_search import search_all, format_results_for_llm
 
 __all__ = [
     "anonymize",
+    "anonymize_cached",
+    "anonymize_obj",
     "deanonymize",
     "display_anonymized_preview",
     "AnonymizationReport",
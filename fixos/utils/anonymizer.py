@@ -4,13 +4,29 @@ Anonimizacja wrażliwych danych systemowych z podglądem dla użytkownika.
 
 from __future__ import annotations
 
+import ast
+import json
 import re
+import reprlib
 import socket
 import getpass
 import os
 from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any
+
 from .terminal import _C
 
+try:
+    import re2  # google-re2: automat liniowy, bez backtrackingu (opcjonalnie)
+except ImportError:
+    re2 = None
+
+try:
+    import hyperscan  # wielowzorcowy skaner SIMD (opcjonalnie)
+except ImportError:
+    hyperscan = None
+
 
 @dataclass
 class AnonymizationReport:
@@ -32,7 +48,9 @@ class AnonymizationReport:
         return "\n".join(lines)
 
 
+@lru_cache(maxsize=1)
 def _get_sensitive() -> dict:
+    # Hostname/użytkownik/HOME nie zmieniają się w trakcie procesu – liczone raz
     result = {}
     try:
         result["hostname"] = socket.gethostname()
@@ -49,6 +67,53 @@ def _get_sensitive() -> dict:
     return result
 
 
+@lru_cache(maxsize=1)
+def _username_re() -> re.Pattern | None:
+    username = _get_sensitive().get("username")
+    return re.compile(rf"\b{re.escape(username)}\b") if username else None
+
+
+@lru_cache(maxsize=1)
+def _literal_union() -> tuple[re.Pattern | None, dict[str, tuple[str, str]]]:
+    """
+    Hostname i HOME jako jedna alternatywa – jeden przebieg zamiast dwóch.
+
+    Zwraca (wzorzec, {literał: (zamiennik, etykieta)}). Wzorzec jest None,
+    gdy wynik zależałby od kolejności (hostname zawarty w HOME albo
+    zaczynający się w jego końcówce) – wtedy anonymize() robi dwa przebiegi.
+    """
+    sensitive = _get_sensitive()
+    host, home = sensitive.get("hostname"), sensitive.get("home")
+    table = {}
+    if host:
+        table[host] = ("[HOSTNAME]", "Hostname")
+    if home:
+        table[home] = ("/home/[USER]", "Ścieżka domowa")
+    overlaps = bool(host and home) and (
+        host in home or any(home.endswith(host[:k]) for k in range(1, len(host)))
+    )
+    if overlaps or not table:
+        return None, table
+    # Hostname pierwszy w alternatywie – jak w kolejności dawnych przebiegów
+    return re.compile("|".join(map(re.escape, table))), table
+
+
+def _sub_count(text: str, old: str, new: str) -> tuple[str, int]:
+    """str.replace z liczbą zamian – jeden przebieg (split) zamiast count()+replace()."""
+    parts = text.split(old)
+    if len(parts) == 1:
+        return text, 0
+    return new.join(parts), len(parts) - 1
+
+
+def invalidate_sensitive_cache() -> None:
+    """Czyści zapamiętane hostname/username/HOME (np. w testach zmieniających env)."""
+    _get_sensitive.cache_clear()
+    _username_re.cache_clear()
+    _literal_union.cache_clear()
+    anonymize_cached.cache_clear()
+
+
 # (pattern, replacement, flags, report_label) — applied in order after literal replacements
 _REGEX_REPLACEMENTS: list[tuple[str, str, int, str]] = [
     (r"/home/(?!\[USER\])[^\s\"'\\]+", "/home/[USER]/...", 0, "Ścieżki /home"),
@@ -86,13 +151,147 @@ _REGEX_REPLACEMENTS: list[tuple[str, str, int, str]] = [
 ]
 
 
+_COMPILED_REPLACEMENTS: list[tuple[re.Pattern, str, str]] = [
+    (re.compile(pattern, flags), replacement, label)
+    for pattern, replacement, flags, label in _REGEX_REPLACEMENTS
+]
+
+
+def _scoped(pattern: str, flags: int) -> str:
+    """Zamienia flagi wzorca na lokalne (?i:...) – dla silników bez flag re."""
+    if pattern.startswith("(?i)"):
+        pattern, flags = pattern[4:], flags | re.IGNORECASE
+    return f"(?i:{pattern})" if flags & re.IGNORECASE else f"(?:{pattern})"
+
+
+# Tanie warunki konieczne dla reguł z _REGEX_REPLACEMENTS (ten sam indeks):
+# gdy żaden podciąg nie występuje w bieżącym tekście, reguła nie może niczego
+# trafić i jej przebieg jest pomijany. None = reguła zawsze aktywna.
+_RULE_GATES: tuple[tuple[str, ...] | None, ...] = (
+    ("/home/",),
+    (".",),
+    (":", "-"),
+    ("sk-", "xai-", "AIzaSy", "Bearer"),
+    ("=", ":"),
+    ("-",),
+    None,
+)
+
+
+# RE2 i Hyperscan nie obsługują lookaround: (?=, (?!, (?<=, (?<!
+_LOOKAROUND_GROUP = re.compile(r"\(\?<?[=!][^()]*\)")
+_LOOKAROUND_RULES = frozenset(
+    i
+    for i, (pattern, *_) in enumerate(_REGEX_REPLACEMENTS)
+    if _LOOKAROUND_GROUP.search(pattern)
+)
+# Znaki ASCII, które \s w re traktuje jako białe, a \s w RE2/Hyperscan nie
+_ASCII_SPACE_GAP = re.compile(r"[\v\x1c-\x1f]")
+
+
+def _same_semantics_as_re(data_str: str) -> bool:
+    """Czy \\b, \\d, \\s i IGNORECASE znaczą w RE2/Hyperscan to samo co w re."""
+    return data_str.isascii() and not _ASCII_SPACE_GAP.search(data_str)
+
+
+def _prefilter_pattern(pattern: str, flags: int) -> tuple[str, bool]:
+    """
+    Reguła w postaci dla Hyperscan: (wzorzec, bez rozróżniania wielkości liter).
+    Lookaround jest usuwany – wynik to nadzbiór reguły, co dla filtra wystarcza.
+    """
+    caseless = bool(flags & re.IGNORECASE) or pattern.startswith("(?i)")
+    if pattern.startswith("(?i)"):
+        pattern = pattern[4:]
+    return _LOOKAROUND_GROUP.sub("", pattern), caseless
+
+
+@lru_cache(maxsize=1)
+def _hs_database():
+    """Baza Hyperscan ze wszystkimi regułami (id = indeks) albo None."""
+    if hyperscan is None:
+        return None
+    expressions, flags = [], []
+    for pattern, _, re_flags, _ in _REGEX_REPLACEMENTS:
+        expression, caseless = _prefilter_pattern(pattern, re_flags)
+        expressions.append(expression.encode())
+        flags.append(
+            hyperscan.HS_FLAG_SINGLEMATCH
+            | (hyperscan.HS_FLAG_CASELESS if caseless else 0)
+        )
+    db = hyperscan.Database(mode=hyperscan.HS_MODE_BLOCK)
+    try:
+        db.compile(
+            expressions=expressions,
+            ids=list(range(len(expressions))),
+            elements=len(expressions),
+            flags=flags,
+        )
+    except hyperscan.error:
+        return None
+    return db
+
+
+def _hs_enabled(data_str: str) -> tuple[int, ...] | None:
+    """
+    Reguły, które mogą trafić w tekście – jeden przebieg Hyperscan zamiast
+    heurystyk z _RULE_GATES. None, gdy Hyperscan jest niedostępny.
+    """
+    db = _hs_database()
+    if db is None:
+        return None
+    hits: set[int] = set()
+    db.scan(data_str.encode(), match_event_handler=lambda rule, *_: hits.add(rule))
+    return tuple(sorted(hits))
+
+
+@lru_cache(maxsize=1)
+def _re2_rules() -> tuple | None:
+    """
+    Reguły skompilowane w RE2 (ten sam indeks) albo None bez google-re2.
+    Reguły z lookaround i te, których RE2 nie przyjmie, mają None – dla nich
+    zostaje re.
+    """
+    if re2 is None:
+        return None
+    compiled = []
+    for i, (pattern, _, flags, _) in enumerate(_REGEX_REPLACEMENTS):
+        rule = None
+        if i not in _LOOKAROUND_RULES:
+            try:
+                rule = re2.compile(_scoped(pattern, flags))
+            except re2.error:
+                pass
+        compiled.append(rule)
+    return tuple(compiled)
+
+
 def _apply_regex_replacements(data_str: str, report: AnonymizationReport) -> str:
     """Apply all regex-based anonymization patterns from _REGEX_REPLACEMENTS."""
-    for pattern, replacement, flags, label in _REGEX_REPLACEMENTS:
-        matches = len(re.findall(pattern, data_str, flags))
-        if matches:
-            data_str = re.sub(pattern, replacement, data_str, flags=flags)
-            report.add(label, matches)
+    # Reguły idą po kolei, każda po wyniku poprzedniej – wspólna alternatywa
+    # wybierałaby dopasowanie najbardziej z lewej i np. "token: Bearer ..."
+    # trafiłoby w regułę haseł przed regułą tokenów, zostawiając sekret.
+    plain = (re2 is not None or hyperscan is not None) and _same_semantics_as_re(
+        data_str
+    )
+    hits = _hs_enabled(data_str) if plain else None
+    engines = _re2_rules() if plain else None
+    # Skan Hyperscan opisuje tekst wejściowy; po pierwszej zamianie reguły
+    # sprawdzamy już bramkami na bieżącym tekście
+    changed = False
+    for i, (rule, replacement, label) in enumerate(_COMPILED_REPLACEMENTS):
+        if hits is not None and not changed:
+            if i not in hits:
+                continue
+        else:
+            gate = _RULE_GATES[i]
+            if gate is not None and not any(needle in data_str for needle in gate):
+                continue
+        if engines is not None and engines[i] is not None:
+            rule = engines[i]
+        data_str, count = rule.subn(replacement, data_str)
+        if count:
+            report.add(label, count)
+            changed = True
     return data_str
 
 
@@ -105,39 +304,73 @@ def anonymize(data_str: str) -> tuple[str, AnonymizationReport]:
     """
     if not isinstance(data_str, str):
         data_str = str(data_str)
+    if not data_str:
+        # Puste pola diagnostyczne są częste – bez przebiegów regex
+        return data_str, AnonymizationReport()
 
     report = AnonymizationReport(original_length=len(data_str))
-    sensitive = _get_sensitive()
 
-    # 1. Hostname (literal)
-    if sensitive.get("hostname"):
-        count = data_str.count(sensitive["hostname"])
-        if count:
-            data_str = data_str.replace(sensitive["hostname"], "[HOSTNAME]")
-            report.add("Hostname", count)
+    # 1–2. Hostname i katalog domowy (literały, PRZED zastąpieniem username)
+    literal_re, literals = _literal_union()
+    if literal_re is not None:
+        counts = dict.fromkeys(literals, 0)
 
-    # 2. Katalog domowy — pełna ścieżka (PRZED zastąpieniem username)
-    if sensitive.get("home"):
-        count = data_str.count(sensitive["home"])
-        if count:
-            data_str = data_str.replace(sensitive["home"], "/home/[USER]")
-            report.add("Ścieżka domowa", count)
+        def _literal(m: re.Match) -> str:
+            counts[m.group()] += 1
+            return literals[m.group()][0]
+
+        data_str = literal_re.sub(_literal, data_str)
+        for literal, count in counts.items():
+            if count:
+                report.add(literals[literal][1], count)
+    else:
+        for literal, (replacement, label) in literals.items():
+            data_str, count = _sub_count(data_str, literal, replacement)
+            if count:
+                report.add(label, count)
 
     # 3–10. Regex-based replacements (home paths, IPs, MACs, tokens, etc.)
     data_str = _apply_regex_replacements(data_str, report)
 
     # Username (konkretna nazwa) — po zastąpieniu ścieżek przez regex
-    if sensitive.get("username"):
-        pattern = rf"\b{re.escape(sensitive['username'])}\b"
-        matches = len(re.findall(pattern, data_str))
+    username_re = _username_re()
+    if username_re is not None:
+        data_str, matches = username_re.subn("[USER]", data_str)
         if matches:
-            data_str = re.sub(pattern, "[USER]", data_str)
             report.add("Username", matches)
 
     report.anonymized_length = len(data_str)
     return data_str, report
 
 
+# Separatory jak w repr() – wzorce z \S+ (hasła) kończą się na spacji po przecinku.
+# ensure_ascii=False: nie-ASCII hostname/username musi zostać rozpoznany, a nie
+# ukryty za \uXXXX. Bez indent encoder działa w C (_json).
+_DIAG_ENCODER = json.JSONEncoder(ensure_ascii=False, default=str)
+
+
+def _serialize(obj: Any) -> str:
+    """Dane diagnostyczne jako JSON; repr() tylko dla struktur spoza JSON."""
+    try:
+        return _DIAG_ENCODER.encode(obj)
+    except (TypeError, ValueError):
+        return str(obj)
+
+
+def anonymize_obj(obj: Any) -> tuple[str, AnonymizationReport]:
+    """anonymize() dla dict/list z diagnostyki – serializacja do JSON zamiast str()."""
+    return anonymize(_serialize(obj))
+
+
+@lru_cache(maxsize=256)
+def anonymize_cached(data_str: str) -> str:
+    """
+    Jak anonymize(), ale zwraca tylko tekst i pamięta ostatnie 256 wyników.
+    Dla pętli napraw, gdzie te same stdout/stderr wracają przy ponownych próbach.
+    """
+    return anonymize(data_str)[0]
+
+
 def deanonymize(text: str) -> str:
     """
     Reverses anonymization placeholders back to real values for execution.
@@ -200,7 +433,7 @@ def display_anonymized_preview(
     for line in shown:
         rendered = _colorize_md_line(line)
         # Strip ANSI for length check, truncate raw if needed
-        raw_len = len(re.sub(r"\033\[[^m]*m", "", rendered))
+        raw_len = len(_ANSI_RE.sub("", rendered))
         if raw_len > max_width:
             # Truncate the original line (before colorizing) then re-colorize
             rendered = _colorize_md_line(line[: max_width - 3] + "...")
@@ -218,6 +451,15 @@ def display_anonymized_preview(
     print(dash_line)
 
 
+# Wzorce podglądu kompilowane raz – wywoływane dla każdej wyświetlanej linii
+_ANSI_RE = re.compile(r"\033\[[^m]*m")
+_BOLD_RE = re.compile(r"\*\*([^*]+)\*\*")
+_INLINE_CODE_RE = re.compile(r"`([^`]+)`")
+# Zamienniki jako szablony (nie funkcje) – podstawienie robi _sre bez wywołań Pythona
+_BOLD_TEMPLATE = f"{_C.BOLD}{_C.WHITE}\\g<1>{_C.RESET}"
+_INLINE_CODE_TEMPLATE = f"{_C.CYAN}`\\g<1>`{_C.RESET}"
+
+
 def _colorize_md_line(line: str) -> str:
     """Apply ANSI colors to a single markdown-formatted diagnostic line."""
     stripped = line.lstrip()
@@ -234,16 +476,9 @@ def _colorize_md_line(line: str) -> str:
     # - **key**: `value`  or  - **key**: value
     if stripped.startswith("- **"):
         # bold key
-        line = re.sub(
-            r"\*\*([^*]+)\*\*",
-            lambda m: f"{_C.BOLD}{_C.WHITE}{m.group(1)}{_C.RESET}",
-            line,
-        )
+        line = _BOLD_RE.sub(_BOLD_TEMPLATE, line)
         # inline code value
-        line = re.sub(
-            r"`([^`]+)`", lambda m: f"{_C.CYAN}`{m.group(1)}`{_C.RESET}", line
-        )
-        return line
+        return _INLINE_CODE_RE.sub(_INLINE_CODE_TEMPLATE, line)
 
     # indented code content (inside ``` blocks rendered as plain lines)
     if (
@@ -259,19 +494,29 @@ def _colorize_md_line(line: str) -> str:
         return f"{_C.DIM}{line}{_C.RESET}"
 
     # inline code anywhere
-    line = re.sub(r"`([^`]+)`", lambda m: f"{_C.CYAN}`{m.group(1)}`{_C.RESET}", line)
-    return line
+    return _INLINE_CODE_RE.sub(_INLINE_CODE_TEMPLATE, line)
+
+
+# Powyżej tego rozmiaru nie budujemy AST – podgląd pokazuje surowy tekst
+_MARKDOWN_PARSE_MAX = 200_000
 
 
 def _format_diagnostics_markdown(data_str: str) -> str:
     """Formatuje dane diagnostyczne jako czytelny markdown."""
-    import ast
+    # Szybkie odrzucenie: tylko repr dicta ma sens dla literal_eval
+    if len(data_str) >= _MARKDOWN_PARSE_MAX or not data_str.lstrip().startswith("{"):
+        return f"```\n{data_str}\n```"
 
     # Próbuj sparsować jako dict
     try:
         # Usuń 'zanonimizowane' znaczniki jeśli są
         clean = data_str.replace("[HOSTNAME]", "HOSTNAME").replace("[USER]", "USER")
-        data = ast.literal_eval(clean)
+        try:
+            # Parser JSON działa w C; repr() z pojedynczymi cudzysłowami
+            # odpada na pierwszym kluczu i trafia do literal_eval
+            data = json.loads(clean)
+        except ValueError:
+            data = ast.literal_eval(clean)
         if isinstance(data, dict):
             return _dict_to_markdown(data)
     except (SyntaxError, ValueError):
@@ -299,10 +544,12 @@ def _render_dict_list_value(key: str, value: list, prefix: str) -> list:
 def _render_dict_long_string(key: str, value: str, prefix: str) -> list:
     """Render a long string (>200 chars) as a truncated code block."""
     lines = [f"{prefix}- **{key}**:", f"{prefix}  ```"]
-    for line in value.split("\n")[:15]:
+    parts = value.split("\n")
+    newlines = len(parts) - 1
+    for line in parts[:15]:
         lines.append(f"{prefix}  {line[:80]}")
-    if value.count("\n") > 15:
-        lines.append(f"{prefix}  ... ({value.count(chr(10)) - 15} więcej linii)")
+    if newlines > 15:
+        lines.append(f"{prefix}  ... ({newlines - 15} więcej linii)")
     lines.append(f"{prefix}  ```")
     return lines
 
@@ -310,37 +557,72 @@ def _render_dict_long_string(key: str, value: str, prefix: str) -> list:
 def _render_dict_multiline_string(key: str, value: str, prefix: str) -> list:
     """Render a multiline string as a code block."""
     lines = [f"{prefix}- **{key}**:", f"{prefix}  ```"]
-    for line in value.split("\n")[:10]:
+    parts = value.split("\n")
+    newlines = len(parts) - 1
+    for line in parts[:10]:
         lines.append(f"{prefix}  {line}")
-    if value.count("\n") > 10:
-        lines.append(f"{prefix}  ... ({value.count(chr(10)) - 10} więcej)")
+    if newlines > 10:
+        lines.append(f"{prefix}  ... ({newlines - 10} więcej)")
     lines.append(f"{prefix}  ```")
     return lines
 
 
+# Wcięcia dla typowej głębokości zagnieżdżenia – bez budowania "  " * n za każdym razem
+_INDENTS = tuple("  " * i for i in range(9))
+
+
+# repr z limitami – krotka/zbiór z tysiącami elementów nie jest budowany
+# w całości tylko po to, by obciąć go do 60 znaków
+_PREVIEW_REPR = reprlib.Repr()
+_PREVIEW_REPR.maxtuple = _PREVIEW_REPR.maxset = _PREVIEW_REPR.maxfrozenset = 5
+_PREVIEW_REPR.maxother = 60
+
+
+def _preview_scalar(value) -> str:
+    """Tekst wartości liścia, z ograniczeniem alokacji dla dużych danych."""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (bytes, bytearray)):
+        # Bez tnięcia repr() całego bloba tworzy kopię większą niż on sam
+        return str(value[:60])
+    return _PREVIEW_REPR.repr(value)
+
+
 def _dict_to_markdown(data: dict, indent: int = 0) -> str:
-    """Rekurencyjnie konwertuje dict na markdown."""
-    lines = []
-    prefix = "  " * indent
+    """Konwertuje zagnieżdżony dict na markdown (iteracyjnie, jeden join na końcu)."""
+    out: list = []
+    # Stos iteratorów po poziomach zamiast rekurencji – kolejność kluczy
+    # zachowana, a głębokość nie jest ograniczona stosem wywołań Pythona
+    stack = [(iter(data.items()), indent)]
+    while stack:
+        items, level = stack[-1]
+        item = next(items, None)
+        if item is None:
+            stack.pop()
+            continue
+        key, value = item
+        prefix = _INDENTS[level] if level < len(_INDENTS) else "  " * level
 
-    for key, value in data.items():
         if isinstance(value, dict):
             section_title = _format_key_title(key)
-            lines.append(f"\n{prefix}### {section_title}")
-            lines.append(_dict_to_markdown(value, indent + 1))
+            out.append(f"\n{prefix}### {section_title}")
+            if value:
+                stack.append((iter(value.items()), level + 1))
+            else:
+                out.append("")
         elif isinstance(value, list):
-            lines.extend(_render_dict_list_value(key, value, prefix))
+            out.extend(_render_dict_list_value(key, value, prefix))
         elif isinstance(value, str) and len(value) > 200:
-            lines.extend(_render_dict_long_string(key, value, prefix))
+            out.extend(_render_dict_long_string(key, value, prefix))
         elif isinstance(value, str) and "\n" in value:
-            lines.extend(_render_dict_multiline_string(key, value, prefix))
+            out.extend(_render_dict_multiline_string(key, value, prefix))
         else:
-            val_str = str(value)
+            val_str = _preview_scalar(value)
             if len(val_str) > 60:
                 val_str = val_str[:57] + "..."
-            lines.append(f"{prefix}- **{key}**: `{val_str}`")
+            out.append(f"{prefix}- **{key}**: `{val_str}`")
 
-    return "\n".join(lines)
+    return "\n".join(out)
 
 
 def _format_key_title(key: str) -> str:
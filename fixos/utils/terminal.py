@@ -15,17 +15,20 @@ Provides:
 
 from __future__ import annotations
 
+import io
 import re
-from typing import Optional
+from itertools import dropwhile, islice
+from typing import TYPE_CHECKING, Optional
 
-from rich.console import Console
-from rich.markdown import Markdown
-from rich.panel import Panel
-from rich.rule import Rule
-from rich.syntax import Syntax
+from rich.console import Console, Group, RenderableType
 from rich.text import Text
 from rich.theme import Theme
 
+# Markdown/Syntax (markdown-it, pygments), Panel i Rule importowane dopiero
+# przy pierwszym renderowaniu – `fixos --help` ich nie potrzebuje.
+if TYPE_CHECKING:
+    from rich.rule import Rule
+
 
 # ── Shared console ─────────────────────────────────────────────────────────
 
@@ -65,37 +68,54 @@ def colorize(line: str) -> str:
 # ── Markdown renderer ──────────────────────────────────────────────────────
 
 
+# Keyed by the leading code point: every marker is a single one
+# ("⚠️" is "⚠" followed by a variation selector).
+_SEVERITY_STYLES: dict[str, str] = {
+    "🔴": "bold red",
+    "🟡": "bold yellow",
+    "🟢": "bold green",
+    "✅": "green",
+    "❌": "red",
+    "⚠": "yellow",
+}
+
+# One match per reply line decides its kind (m.lastgroup); the branches
+# start with distinct characters, so their order does not matter.
+_LINE_CLASSIFIER = re.compile(
+    r"\s*(?:"
+    r"(?P<fence>```)"
+    r"|(?P<divider>[━═─]{3,})"
+    rf"|(?P<severity>[{''.join(_SEVERITY_STYLES)}])"
+    r"|(?P<action>\[[\dASDQ?!]\])"
+    r")"
+)
+_DIVIDER_STRIP_RE = re.compile(r"^[━═─\s]+|[━═─\s]+$")
+
+
+def _classify_line(line: str) -> Optional[str]:
+    """Return the kind of a reply line (fence/divider/severity/action) or None."""
+    m = _LINE_CLASSIFIER.match(line)
+    return m.lastgroup if m else None
+
+
 def _is_divider_line(stripped: str) -> bool:
     """Return True if the stripped line is a section divider (━━━ / === / ---)."""
-    return bool(re.match(r"^[━═─]{3,}", stripped))
-
+    return _classify_line(stripped) == "divider"
 
-def _handle_divider_line(stripped: str) -> None:
-    """Print a rich Rule for a section divider line."""
-    inner = re.sub(r"^[━═─\s]+|[━═─\s]+$", "", stripped)
-    if inner:
-        console.print(Rule(f"[bold cyan]{inner}[/bold cyan]", style="cyan"))
-    else:
-        console.print(Rule(style="dim cyan"))
 
+def _divider_rule(line: str) -> Rule:
+    """Build a rich Rule for a section divider line."""
+    from rich.rule import Rule
 
-_SEVERITY_STYLES: list[tuple[str, str]] = [
-    ("🔴", "bold red"),
-    ("🟡", "bold yellow"),
-    ("🟢", "bold green"),
-    ("✅", "green"),
-    ("❌", "red"),
-    ("⚠️", "yellow"),
-    ("⚠", "yellow"),
-]
+    inner = _DIVIDER_STRIP_RE.sub("", line)
+    if inner:
+        return Rule(f"[bold cyan]{inner}[/bold cyan]", style="cyan")
+    return Rule(style="dim cyan")
 
 
 def _get_severity_style(stripped: str) -> Optional[str]:
     """Return rich style string if line starts with a severity emoji, else None."""
-    for prefix, style in _SEVERITY_STYLES:
-        if stripped.startswith(prefix):
-            return style
-    return None
+    return _SEVERITY_STYLES.get(stripped[:1])
 
 
 def render_md(text: str) -> None:
@@ -111,27 +131,53 @@ def render_md(text: str) -> None:
     - [N] / [A] / [S] / [Q] action items in yellow
     - - / * bullet lists via rich Markdown
     """
+    from rich.markdown import Markdown
+    from rich.panel import Panel
+    from rich.syntax import Syntax
+
     in_code_block = False
     code_lang = ""
     code_lines: list[str] = []
     md_buffer: list[str] = []
+    # Renderables collected for a single console.print(Group(...)) at the end;
+    # consecutive styled lines of the same style share one Text.
+    pending: list[RenderableType] = []
+    styled: Optional[Text] = None
+
+    def _emit(renderable: RenderableType) -> None:
+        nonlocal styled
+        styled = None
+        pending.append(renderable)
+
+    def _emit_styled(line: str, style: str) -> None:
+        nonlocal styled
+        if styled is not None and styled.style == style:
+            styled.append("\n" + line)
+            return
+        styled = Text(line, style=style)
+        pending.append(styled)
 
     def _flush_md() -> None:
         if md_buffer:
             block = "\n".join(md_buffer)
             md_buffer.clear()
             if block.strip():
-                console.print(Markdown(block))
+                _emit(Markdown(block))
 
-    for raw_line in text.splitlines():
-        line = raw_line
+    # Lazy line iteration – no list of every line for long replies
+    for raw_line in io.StringIO(text):
+        line = raw_line.rstrip("\r\n")
+        # Wszystko, czego potrzebują gałęzie, daje dopasowanie (pozycja końca
+        # znacznika, emoji) – bez kopii line.strip() per linia.
+        m = _LINE_CLASSIFIER.match(line)
+        kind = m.lastgroup if m else None
 
         # ── Code block fence ──────────────────────────────────────
-        if line.strip().startswith("```"):
+        if kind == "fence":
             if not in_code_block:
                 _flush_md()
                 in_code_block = True
-                code_lang = line.strip()[3:].strip() or "text"
+                code_lang = line[m.end() :].strip() or "text"
                 code_lines = []
             else:
                 in_code_block = False
@@ -143,7 +189,7 @@ def render_md(text: str) -> None:
                     line_numbers=False,
                     word_wrap=True,
                 )
-                console.print(
+                _emit(
                     Panel(
                         syntax, title=f"[dim]{code_lang}[/dim]", border_style="dim cyan"
                     )
@@ -155,31 +201,30 @@ def render_md(text: str) -> None:
             code_lines.append(line)
             continue
 
-        stripped = line.strip()
-
         # ── Section dividers (━━━ TEXT ━━━ / === / ---) ────────────
-        if _is_divider_line(stripped):
+        if kind == "divider":
             _flush_md()
-            _handle_divider_line(stripped)
+            _emit(_divider_rule(line))
             continue
 
         # ── Severity lines ─────────────────────────────────────────
-        sev_style = _get_severity_style(stripped)
-        if sev_style is not None:
+        if kind == "severity":
             _flush_md()
-            console.print(Text(line, style=sev_style))
+            _emit_styled(line, _SEVERITY_STYLES[m.group("severity")])
             continue
 
         # ── Action items [N] / [A] / [S] / [Q] ────────────────────
-        if re.match(r"^\s*\[([\dASDQ?!])\]", line):
+        if kind == "action":
             _flush_md()
-            console.print(Text(line, style="bold yellow"))
+            _emit_styled(line, "bold yellow")
             continue
 
         # ── Everything else → accumulate as Markdown ───────────────
         md_buffer.append(line)
 
     _flush_md()
+    if pending:
+        console.print(Group(*pending))
 
 
 # ── Command preview box ────────────────────────────────────────────────────
@@ -187,13 +232,14 @@ def render_md(text: str) -> None:
 
 def print_cmd_block(cmd: str, comment: str = "", dry_run: bool = False) -> None:
     """Print a framed command preview panel."""
+    from rich.panel import Panel
+    from rich.syntax import Syntax
+
     label = "DRY-RUN" if dry_run else "🔧 KOMENDA DO WYKONANIA"
     border = "dim" if dry_run else "cyan"
     syntax = Syntax(cmd, "bash", theme="monokai", word_wrap=True)
     content = syntax
     if comment:
-        from rich.console import Group
-
         note = Text(f"📝 Co robi: {comment}", style="dim")
         content = Group(syntax, note)
     console.print()
@@ -209,13 +255,42 @@ def print_cmd_block(cmd: str, comment: str = "", dry_run: bool = False) -> None:
 # ── Result boxes ───────────────────────────────────────────────────────────
 
 
+def _head_lines(text: str, max_lines: int) -> tuple[list[str], int]:
+    """
+    First max_lines lines of text.strip() and the count of the rest,
+    without copying or splitting the whole (possibly multi-MB) buffer.
+    """
+    # StringIO splits on \n only; splitlines() on each piece also breaks lone
+    # \r (dnf/curl progress bars) and the other str.splitlines() separators
+    lines = (line for raw in io.StringIO(text) for line in raw.splitlines())
+    lines = dropwhile(lambda line: not line.strip(), lines)
+    shown = list(islice(lines, max_lines))
+    # Trailing blank lines do not count – text.strip() would drop them
+    remaining = blank_run = 0
+    for line in lines:
+        if line.strip():
+            remaining += blank_run + 1
+            blank_run = 0
+        else:
+            blank_run += 1
+    if shown:
+        shown[0] = shown[0].lstrip()
+        if not remaining:
+            while not shown[-1].strip():
+                shown.pop()
+            shown[-1] = shown[-1].rstrip()
+    return shown, remaining
+
+
 def _print_output_box(text: str, *, title: str, border: str, max_lines: int) -> None:
     """Shared helper for stdout/stderr panels."""
-    lines = text.strip().splitlines()
-    shown = lines[:max_lines]
-    body = "\\n".join(shown)
-    if len(lines) > max_lines:
-        body += f"\\n[dim]... ({len(lines) - max_lines} więcej linii)[/dim]"
+    from rich.panel import Panel
+    from rich.syntax import Syntax
+
+    shown, remaining = _head_lines(text, max_lines)
+    body = "\n".join(shown)
+    if remaining:
+        body += f"\n[dim]... ({remaining} więcej linii)[/dim]"
     syntax = Syntax(body, "bash", theme="monokai", word_wrap=True)
     console.print(Panel(syntax, title=f"[dim]{title}[/dim]", border_style=border))
 
@@ -250,6 +325,9 @@ STATUS_ICON = {
     "blocked": "🚫",
     "skipped": "⏭️ ",
 }
+# severity → (kolor, ikona): jedno wyszukanie zamiast dwóch na węzeł
+_SEVERITY = {sev: (SEVERITY_COLOR[sev], SEVERITY_ICON[sev]) for sev in SEVERITY_COLOR}
+_DEFAULT_SEV = ("white", "⚪")
 
 
 def print_problem_header(
@@ -261,8 +339,9 @@ def print_problem_header(
     max_attempts: int = 3,
 ) -> None:
     """Print a colored problem header panel."""
-    color = SEVERITY_COLOR.get(severity, "white")
-    icon = SEVERITY_ICON.get(severity, "⚪")
+    from rich.panel import Panel
+
+    color, icon = _SEVERITY.get(severity, _DEFAULT_SEV)
 
     title_parts = [f"[bold {color}]{icon} [{problem_id}][/bold {color}]"]
     if status:
@@ -288,37 +367,30 @@ def render_tree_colored(nodes: dict, execution_order: list[str]) -> str:
     lines: list[str] = []
     visited: set[str] = set()
 
-    def _render(pid: str, indent: int = 0) -> None:
-        if pid in visited or pid not in nodes:
-            return
-        visited.add(pid)
-        p = nodes[pid]
-        color = SEVERITY_COLOR.get(p.severity, "white")
-        sev_icon = SEVERITY_ICON.get(p.severity, "⚪")
+    def _node_line(p, prefix: str) -> str:
+        color, sev_icon = _SEVERITY.get(p.severity, _DEFAULT_SEV)
         stat_icon = STATUS_ICON.get(p.status, "?")
-        prefix = "  " * indent + ("└─ " if indent > 0 else "  ")
         desc = p.description[:70] + ("…" if len(p.description) > 70 else "")
-        lines.append(
+        return (
             f"{prefix}[bold {color}]{sev_icon} [{p.id}][/bold {color}] "
             f"[{color}]{desc}[/{color}]  [dim]{stat_icon}[/dim]"
         )
-        for child_id in p.may_cause:
-            _render(child_id, indent + 1)
 
-    roots = [p for p in nodes.values() if not p.caused_by]
-    for root in roots:
-        _render(root.id)
+    # Iteracyjny DFS (pre-order) – głębokie łańcuchy nie wyczerpią stosu
+    stack = [(p.id, 0) for p in reversed(list(nodes.values())) if not p.caused_by]
+    while stack:
+        pid, indent = stack.pop()
+        if pid in visited or pid not in nodes:
+            continue
+        visited.add(pid)
+        p = nodes[pid]
+        prefix = "  " * indent + ("└─ " if indent > 0 else "  ")
+        lines.append(_node_line(p, prefix))
+        stack.extend((child_id, indent + 1) for child_id in reversed(p.may_cause))
 
     for p in nodes.values():
         if p.id not in visited:
-            color = SEVERITY_COLOR.get(p.severity, "white")
-            sev_icon = SEVERITY_ICON.get(p.severity, "⚪")
-            stat_icon = STATUS_ICON.get(p.status, "?")
-            desc = p.description[:70] + ("…" if len(p.description) > 70 else "")
-            lines.append(
-                f"  [dim]◦[/dim] [bold {color}]{sev_icon} [{p.id}][/bold {color}] "
-                f"[{color}]{desc}[/{color}]  [dim]{stat_icon}[/dim]"
-            )
+            lines.append(_node_line(p, "  [dim]◦[/dim] "))
 
     return "\n".join(lines) if lines else "  [dim](brak problemów)[/dim]"
 
@@ -326,17 +398,23 @@ def render_tree_colored(nodes: dict, execution_order: list[str]) -> str:
 # ── Helpers ────────────────────────────────────────────────────────────────
 
 
+_WORD_RE = re.compile(r"\S+")
+
+
 def _wrap(text: str, width: int) -> list[str]:
     """Simple word-wrap."""
-    words = text.split()
     lines: list[str] = []
-    current = ""
-    for word in words:
-        if current and len(current) + 1 + len(word) > width:
-            lines.append(current)
-            current = word
+    current: list[str] = []
+    current_len = 0
+    for m in _WORD_RE.finditer(text):
+        word = m.group()
+        if current and current_len + 1 + len(word) > width:
+            lines.append(" ".join(current))
+            current = [word]
+            current_len = len(word)
         else:
-            current = (current + " " + word).lstrip()
+            current.append(word)
+            current_len += len(word) + (len(current) > 1)
     if current:
-        lines.append(current)
+        lines.append(" ".join(current))
     return lines or [""]
@@ -6,12 +6,31 @@ Przeszukuje: Linux Bugzilla, Linux forums, Reddit, GitHub Issues,
 
 from __future__ import annotations
 
+import functools
+import hashlib
+import heapq
+import http.client
 import json
+import os
+import threading
+import time
 import urllib.parse
 import urllib.request
 import urllib.error
-from dataclasses import dataclass
-from typing import Optional
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from ..constants import WEB_SEARCH_CACHE_TTL, WEB_SEARCH_TARGET_RESULTS
+
+try:
+    # Opcjonalny szybki parser (pip install fixos[fast]) – przyjmuje bytes
+    import orjson
+
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
 
 
 @dataclass
@@ -22,19 +41,169 @@ class SearchResult:
     source: str
 
 
-def _http_get(url: str, timeout: int = 8) -> Optional[str]:
-    """Prosty GET bez zależności zewnętrznych."""
-    try:
-        req = urllib.request.Request(
-            url,
-            headers={"User-Agent": "fixos/1.0 (cross-platform diagnostics tool)"},
+_USER_AGENT = "fixos/1.0 (cross-platform diagnostics tool)"
+
+# Pula połączeń keep-alive per (schemat, host): kolejne zapytania do tego
+# samego serwera nie powtarzają TCP + TLS handshake. Współdzielona między
+# wątkami search_all – połączenie wypożycza tylko jeden wątek naraz.
+_POOL: dict[tuple[str, str], list[http.client.HTTPConnection]] = {}
+_POOL_LOCK = threading.Lock()
+_POOL_MAX_IDLE = 8
+
+
+def _acquire(scheme: str, host: str, timeout: int) -> http.client.HTTPConnection:
+    with _POOL_LOCK:
+        idle = _POOL.get((scheme, host))
+        conn = idle.pop() if idle else None
+    if conn is None:
+        cls = (
+            http.client.HTTPSConnection
+            if scheme == "https"
+            else http.client.HTTPConnection
         )
-        with urllib.request.urlopen(req, timeout=timeout) as resp:
-            return resp.read().decode("utf-8", errors="replace")
+        conn = cls(host, timeout=timeout)
+    else:
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+    return conn
+
+
+def _release(scheme: str, host: str, conn: http.client.HTTPConnection) -> None:
+    with _POOL_LOCK:
+        idle = _POOL.setdefault((scheme, host), [])
+        if len(idle) < _POOL_MAX_IDLE:
+            idle.append(conn)
+            return
+    conn.close()
+
+
+def _proxied(scheme: str, host: str) -> bool:
+    """Czy żądanie ma iść przez proxy z HTTP(S)_PROXY (z uwzględnieniem NO_PROXY)."""
+    if scheme not in urllib.request.getproxies():
+        return False
+    return not urllib.request.proxy_bypass(host)
+
+
+def _urlopen_get(url: str, timeout: int, headers: dict) -> Optional[bytes]:
+    """GET przez urllib – dla przekierowań i proxy, których pula nie obsługuje."""
+    try:
+        req = urllib.request.Request(url, headers=headers)
+        # Świeży opener czyta proxy ze środowiska tak jak _proxied; globalny
+        # z urlopen zapamiętuje je przy pierwszym użyciu
+        opener = urllib.request.build_opener()
+        with opener.open(req, timeout=timeout) as resp:
+            return resp.read()
     except Exception:
         return None
 
 
+def _http_get_bytes(
+    url: str, timeout: int = 8, headers: Optional[dict] = None
+) -> Optional[bytes]:
+    """Prosty GET bez zależności zewnętrznych, z ponownym użyciem połączeń."""
+    hdrs = {"User-Agent": _USER_AGENT, **(headers or {})}
+    try:
+        parts = urllib.parse.urlsplit(url)
+        scheme, host = parts.scheme, parts.netloc
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+    except Exception:
+        return None
+    if _proxied(scheme, host):
+        # Pula łączy się bezpośrednio – przez proxy idzie ProxyHandler urllib
+        return _urlopen_get(url, timeout, hdrs)
+
+    for _ in range(2):
+        conn = _acquire(scheme, host, timeout)
+        reused = conn.sock is not None
+        try:
+            conn.request("GET", path, headers=hdrs)
+            resp = conn.getresponse()
+            body = resp.read()
+        except Exception:
+            conn.close()
+            if reused:
+                # Serwer zamknął bezczynne połączenie – jedna próba na nowym
+                continue
+            return None
+
+        if resp.will_close:
+            conn.close()
+        else:
+            _release(scheme, host, conn)
+        if 300 <= resp.status < 400:
+            return _urlopen_get(url, timeout, hdrs)
+        if resp.status >= 400:
+            return None
+        return body
+    return None
+
+
+def _http_get(
+    url: str, timeout: int = 8, headers: Optional[dict] = None
+) -> Optional[str]:
+    """GET zwracający tekst (UTF-8)."""
+    body = _http_get_bytes(url, timeout, headers)
+    return None if body is None else body.decode("utf-8", errors="replace")
+
+
+def _http_get_json(url: str, timeout: int = 8, headers: Optional[dict] = None) -> Any:
+    """GET + parsowanie JSON prosto z bytes (bez pośredniego str); None przy błędzie."""
+    body = _http_get_bytes(url, timeout, headers)
+    if not body:
+        return None
+    try:
+        return _json_loads(body)
+    except ValueError:
+        return None
+
+
+_CACHE_DIR = Path.home() / ".fixos" / "cache" / "web_search"
+
+
+def _disk_cache(ttl: int = WEB_SEARCH_CACHE_TTL) -> Callable:
+    """
+    Zapamiętuje niepuste wyniki funkcji search_* na dysku (JSON) na `ttl` sekund.
+
+    Klucz to skrót (nazwa funkcji, argumenty); świeżość liczona z mtime pliku.
+    Puste listy nie są zapisywane – zwykle oznaczają brak sieci, a nie brak
+    wyników. FIXOS_NO_CACHE=1 wyłącza cache.
+    """
+
+    def decorator(fn: Callable[..., list[SearchResult]]):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs) -> list[SearchResult]:
+            if os.environ.get("FIXOS_NO_CACHE") == "1":
+                return fn(*args, **kwargs)
+            key_src = json.dumps([fn.__name__, args, kwargs], sort_keys=True)
+            key = hashlib.sha256(key_src.encode("utf-8")).hexdigest()
+            path = _CACHE_DIR / f"{key}.json"
+            try:
+                if time.time() - path.stat().st_mtime < ttl:
+                    cached = json.loads(path.read_text(encoding="utf-8"))
+                    return [SearchResult(**r) for r in cached]
+            except (OSError, ValueError, TypeError):
+                pass
+
+            results = fn(*args, **kwargs)
+            if results:
+                try:
+                    _CACHE_DIR.mkdir(parents=True, exist_ok=True)
+                    tmp = path.with_name(f"{key}.{os.getpid()}.tmp")
+                    tmp.write_text(
+                        json.dumps([asdict(r) for r in results]), encoding="utf-8"
+                    )
+                    os.replace(tmp, path)
+                except OSError:
+                    pass
+            return results
+
+        return wrapper
+
+    return decorator
+
+
+@_disk_cache()
 def search_fedora_bugzilla(query: str, max_results: int = 3) -> list[SearchResult]:
     """Szuka w Linux Bugzilla przez REST API."""
     results = []
@@ -45,10 +214,10 @@ def search_fedora_bugzilla(query: str, max_results: int = 3) -> list[SearchResul
             f"?summary={q}&product=system&status=VERIFIED,CLOSED"
             f"&limit={max_results}&include_fields=id,summary,status,resolution,url"
         )
-        data = _http_get(url)
+        data = _http_get_json(url)
         if not data:
             return []
-        bugs = json.loads(data).get("bugs", [])
+        bugs = data.get("bugs", [])
         for bug in bugs[:max_results]:
             results.append(
                 SearchResult(
@@ -63,16 +232,17 @@ def search_fedora_bugzilla(query: str, max_results: int = 3) -> list[SearchResul
     return results
 
 
+@_disk_cache()
 def search_ask_fedora(query: str, max_results: int = 3) -> list[SearchResult]:
     """Szuka w Linux forums przez Discourse API."""
     results = []
     try:
         q = urllib.parse.quote(query)
         url = f"https://Linux forums/search.json?q={q}&order=latest&page=1"
-        data = _http_get(url)
+        data = _http_get_json(url)
         if not data:
             return []
-        topics = json.loads(data).get("topics", [])
+        topics = data.get("topics", [])
         for t in topics[:max_results]:
             results.append(
                 SearchResult(
@@ -87,6 +257,7 @@ def search_ask_fedora(query: str, max_results: int = 3) -> list[SearchResult]:
     return results
 
 
+@_disk_cache()
 def search_arch_wiki(query: str, max_results: int = 2) -> list[SearchResult]:
     """Arch Wiki – doskonałe źródło dla problemów Linux (nie tylko Arch)."""
     results = []
@@ -96,10 +267,9 @@ def search_arch_wiki(query: str, max_results: int = 2) -> list[SearchResult]:
             f"https://wiki.archlinux.org/api.php"
             f"?action=opensearch&search={q}&limit={max_results}&format=json"
         )
-        data = _http_get(url)
-        if not data:
+        parsed = _http_get_json(url)
+        if not parsed:
             return []
-        parsed = json.loads(data)
         titles = parsed[1] if len(parsed) > 1 else []
         descriptions = parsed[2] if len(parsed) > 2 else []
         urls = parsed[3] if len(parsed) > 3 else []
@@ -117,35 +287,46 @@ def search_arch_wiki(query: str, max_results: int = 2) -> list[SearchResult]:
     return results
 
 
+_GITHUB_REPOS = (
+    "thesofproject/linux",
+    "PipeWire/pipewire",
+    "alsa-project/alsa-lib",
+)
+
+
+def _gh_search(query: str, repo: str, max_results: int) -> list[dict]:
+    """Issues z jednego repozytorium (surowe obiekty z GitHub Search API)."""
+    q = urllib.parse.quote(f"{query} repo:{repo}")
+    url = (
+        f"https://api.github.com/search/issues"
+        f"?q={q}+is:issue&sort=reactions&order=desc&per_page={max_results}"
+    )
+    data = _http_get_json(url, headers={"Accept": "application/vnd.github.v3+json"})
+    return data.get("items", []) if isinstance(data, dict) else []
+
+
+def _thumbs_up(item: dict) -> int:
+    return item.get("reactions", {}).get("+1", 0)
+
+
+@_disk_cache()
 def search_github_issues(query: str, max_results: int = 3) -> list[SearchResult]:
     """GitHub Issues – linuxhardware, ALSA, PipeWire, PulseAudio repos."""
     results = []
-    repos = [
-        "thesofproject/linux",
-        "PipeWire/pipewire",
-        "alsa-project/alsa-lib",
-    ]
     try:
-        q = urllib.parse.quote(f"{query} " + " ".join(f"repo:{r}" for r in repos))
-        url = (
-            f"https://api.github.com/search/issues"
-            f"?q={q}+is:issue&sort=reactions&order=desc&per_page={max_results}"
-        )
-        req = urllib.request.Request(
-            url,
-            headers={
-                "Accept": "application/vnd.github.v3+json",
-                "User-Agent": "fixos/1.0",
-            },
-        )
-        with urllib.request.urlopen(req, timeout=8) as resp:
-            data = json.loads(resp.read().decode())
-        for item in data.get("items", [])[:max_results]:
+        # Osobne zapytanie per repo (trafia w indeks issues repozytorium)
+        # wysłane równolegle; wspólny ranking po 👍 robimy lokalnie.
+        with ThreadPoolExecutor(max_workers=len(_GITHUB_REPOS)) as ex:
+            batches = ex.map(
+                lambda repo: _gh_search(query, repo, max_results), _GITHUB_REPOS
+            )
+            items = [item for batch in batches for item in batch]
+        for item in heapq.nlargest(max_results, items, key=_thumbs_up):
             results.append(
                 SearchResult(
                     title=item["title"],
                     url=item["html_url"],
-                    snippet=f"Stan: {item['state']} | 👍 {item.get('reactions', {}).get('+1', 0)}",
+                    snippet=f"Stan: {item['state']} | 👍 {_thumbs_up(item)}",
                     source="GitHub Issues",
                 )
             )
@@ -154,6 +335,7 @@ def search_github_issues(query: str, max_results: int = 3) -> list[SearchResult]
     return results
 
 
+@_disk_cache()
 def search_serpapi(
     query: str, api_key: str, max_results: int = 5
 ) -> list[SearchResult]:
@@ -166,10 +348,9 @@ def search_serpapi(
         url = (
             f"https://serpapi.com/search.json?q={q}&num={max_results}&api_key={api_key}"
         )
-        data = _http_get(url)
-        if not data:
+        parsed = _http_get_json(url)
+        if not parsed:
             return []
-        parsed = json.loads(data)
         for r in parsed.get("organic_results", [])[:max_results]:
             results.append(
                 SearchResult(
@@ -184,16 +365,16 @@ def search_serpapi(
     return results
 
 
+@_disk_cache()
 def search_ddg(query: str, max_results: int = 5) -> list[SearchResult]:
     """DuckDuckGo Instant Answer API (bez klucza, ograniczone)."""
     results = []
     try:
         q = urllib.parse.quote(f"fedora linux {query}")
         url = f"https://api.duckduckgo.com/?q={q}&format=json&no_html=1&skip_disambig=1"
-        data = _http_get(url)
-        if not data:
+        parsed = _http_get_json(url)
+        if not parsed:
             return []
-        parsed = json.loads(data)
         # Abstract
         if parsed.get("AbstractText") and parsed.get("AbstractURL"):
             results.append(
@@ -224,10 +405,14 @@ def search_all(
     query: str,
     serpapi_key: Optional[str] = None,
     max_per_source: int = 3,
+    target: Optional[int] = WEB_SEARCH_TARGET_RESULTS,
 ) -> list[SearchResult]:
     """
     Przeszukuje wszystkie dostępne źródła wiedzy.
     Używane jako fallback gdy LLM nie zna rozwiązania.
+
+    Gdy zbierze się `target` wyników, nie czeka na wolniejsze źródła
+    (None = zawsze czekaj na wszystkie).
     """
     all_results: list[SearchResult] = []
 
@@ -250,17 +435,36 @@ def search_all(
     else:
         sources.append(("DuckDuckGo", lambda: search_ddg(query, max_per_source)))
 
-    for name, fn in sources:
-        try:
-            results = fn()
-            if results:
-                print(f"  ✅ {name}: {len(results)} wyników")
-                all_results.extend(results)
-            else:
-                print(f"  ○  {name}: brak wyników")
-        except Exception as e:
-            print(f"  ❌ {name}: błąd ({e})")
+    # Źródła są niezależne (czyste I/O) – odpytujemy je równolegle, więc czas
+    # to najwolniejsze źródło, a nie suma timeoutów. Kolejność wyników jak w `sources`.
+    by_source: list[list[SearchResult]] = [[] for _ in sources]
+    found = 0
+    ex = ThreadPoolExecutor(max_workers=len(sources))
+    try:
+        futures = {ex.submit(fn): (i, name) for i, (name, fn) in enumerate(sources)}
+        pending = set(futures)
+        while pending and (target is None or found < target):
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                i, name = futures[future]
+                try:
+                    results = future.result()
+                    if results:
+                        print(f"  ✅ {name}: {len(results)} wyników")
+                        by_source[i] = results
+                        found += len(results)
+                    else:
+                        print(f"  ○  {name}: brak wyników")
+                except Exception as e:
+                    print(f"  ❌ {name}: błąd ({e})")
+        for future in pending:
+            print(f"  ⏭  {futures[future][1]}: pominięto (wystarczy wyników)")
+    finally:
+        # Niedokończone źródła kończą w tle (ich wyniki trafią do cache)
+        ex.shutdown(wait=False, cancel_futures=True)
 
+    for results in by_source:
+        all_results.extend(results)
     return all_results
 
 
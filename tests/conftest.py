@@ -5,29 +5,146 @@ Fixtures: mock LLM, mock diagnostics, simulated broken environments.
 
 from __future__ import annotations
 
+import copy
+import functools
+import getpass
+import json
 import os
-from typing import Any
-from unittest.mock import MagicMock, patch
+import socket
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, NamedTuple
 
 import pytest
 
-from fixos.config import FixOsConfig
+from fixos.config import ENV_SEARCH_PATHS, PROVIDER_DEFAULTS, FixOsConfig
+from fixos.utils.anonymizer import _serialize, anonymize
 
 
 # ── Helpers ───────────────────────────────────────────────
 
 
+# Prawdziwe wartości maszyny – raz na proces zamiast wywołań w każdym teście
+HOSTNAME = socket.gethostname()
+USERNAME = getpass.getuser()
+
+
 def _env(key: str, default: str = "") -> str:
     return os.environ.get(key, default)
 
 
+def _env_file_values() -> dict[str, str]:
+    """KEY=VALUE z pierwszego istniejącego pliku .env – bez zmiany os.environ."""
+    for path in ENV_SEARCH_PATHS:
+        if path.exists():
+            values = {}
+            for line in path.read_text(encoding="utf-8").splitlines():
+                line = line.strip()
+                if line and not line.startswith("#") and "=" in line:
+                    k, v = line.split("=", 1)
+                    values[k.strip()] = v.strip().strip('"').strip("'")
+            return values
+    return {}
+
+
 def _has_real_token() -> bool:
-    """Sprawdza czy .env zawiera prawdziwy token API."""
-    cfg = FixOsConfig.load()
-    key = cfg.api_key or ""
+    """
+    Sprawdza czy env / .env zawiera prawdziwy token API.
+    Ta sama kolejność kluczy co FixOsConfig.load(), ale bez budowania konfiguracji.
+    """
+    file_values = _env_file_values()
+
+    def lookup(name: str) -> str:
+        return _env(name) or file_values.get(name, "")
+
+    provider = lookup("LLM_PROVIDER").lower() or "gemini"
+    pdef = PROVIDER_DEFAULTS.get(provider, PROVIDER_DEFAULTS["gemini"])
+    names = (pdef.get("key_env"), "API_KEY", "OPENAI_API_KEY")
+    key = next((v for name in names if name and (v := lookup(name))), "")
     return len(key) > 10 and "TWOJ" not in key and "KLUCZ" not in key
 
 
+# Warunek dla testów z prawdziwym API liczony raz, przy zbieraniu testów
+requires_real_api = pytest.mark.skipif(
+    not _has_real_token(), reason="Wymaga prawdziwego klucza API w .env"
+)
+
+
+# ── Fake odpowiedzi OpenAI ─────────────────────────────────
+# NamedTuple zamiast łańcuchów MagicMock – bez leniwego tworzenia dzieci
+# przy każdym dostępie do atrybutu i bez fałszywych hasattr().
+
+
+class FakeMessage(NamedTuple):
+    content: str
+
+
+class FakeChoice(NamedTuple):
+    message: FakeMessage
+
+
+class FakeUsage(NamedTuple):
+    total_tokens: int
+
+
+class FakeResponse(NamedTuple):
+    choices: tuple[FakeChoice, ...]
+    usage: FakeUsage
+
+
+class FakeDelta(NamedTuple):
+    content: str | None
+
+
+class FakeStreamChoice(NamedTuple):
+    delta: FakeDelta
+
+
+class FakeChunk(NamedTuple):
+    choices: tuple[FakeStreamChoice, ...]
+    usage: FakeUsage | None
+
+
+def fake_response(content: str, total_tokens: int = 0) -> FakeResponse:
+    """Odpowiedź chat.completions.create z jedną wiadomością."""
+    return FakeResponse((FakeChoice(FakeMessage(content)),), FakeUsage(total_tokens))
+
+
+def fake_chunk(content: str | None = None, usage: int | None = None) -> FakeChunk:
+    """Chunk strumienia: delta z treścią albo (bez choices) końcowe zużycie."""
+    if usage is None:
+        return FakeChunk((FakeStreamChoice(FakeDelta(content)),), None)
+    return FakeChunk((), FakeUsage(usage))
+
+
+class FakeOpenAIClient:
+    """
+    Klient OpenAI rejestrujący wywołania chat.completions.create.
+    Zwraca ``handler(**kwargs)`` jeśli ustawiony, w przeciwnym razie ``response``.
+    """
+
+    def __init__(self, response: FakeResponse | None = None):
+        self.response = response
+        self.handler: Callable[..., FakeResponse] | None = None
+        self.calls: list[dict] = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs) -> FakeResponse:
+        self.calls.append(kwargs)
+        if self.handler is not None:
+            return self.handler(**kwargs)
+        return self.response
+
+    @property
+    def sent_contents(self) -> list[str]:
+        """Treści wszystkich wiadomości wysłanych do LLM, w kolejności wywołań."""
+        return [
+            msg.get("content", "")
+            for call in self.calls
+            for msg in call.get("messages", [])
+        ]
+
+
 # ══════════════════════════════════════════════════════════
 #  FIXTURES
 # ══════════════════════════════════════════════════════════
@@ -44,9 +161,9 @@ def test_config() -> FixOsConfig:
     return FixOsConfig.load()
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def mock_config() -> FixOsConfig:
-    """Konfiguracja z fake tokenem do testów bez API."""
+    """Konfiguracja z fake tokenem do testów bez API (wspólna dla sesji)."""
     cfg = FixOsConfig(
         provider="gemini",
         api_key="AIzaSy_FAKE_TOKEN_FOR_TESTING_ONLY_1234567",
@@ -61,11 +178,31 @@ def mock_config() -> FixOsConfig:
 
 
 @pytest.fixture
-def mock_llm_client(mock_config):
-    """Mock LLMClient zwracający predefiniowane odpowiedzi."""
-    with patch("fixos.providers.llm.openai") as mock_openai:
-        mock_response = MagicMock()
-        mock_response.choices[0].message.content = """
+def fake_openai(monkeypatch) -> FakeOpenAIClient:
+    """Podmienia openai.OpenAI na fabrykę zwracającą jednego FakeOpenAIClient."""
+    client = FakeOpenAIClient()
+    monkeypatch.setattr("fixos.providers.llm.openai.OpenAI", lambda **_: client)
+    return client
+
+
+@pytest.fixture
+def llm_capture(fake_openai) -> FakeOpenAIClient:
+    """
+    fake_openai z neutralną odpowiedzią ("q") – do testów sprawdzających,
+    co trafiło do LLM (``llm_capture.sent_contents``).
+    """
+    fake_openai.response = fake_response("q", total_tokens=10)
+    return fake_openai
+
+
+@pytest.fixture
+def mock_llm_client(mock_config, fake_openai) -> FakeOpenAIClient:
+    """Fake klient OpenAI zwracający predefiniowaną odpowiedź."""
+    fake_openai.response = fake_response(_CANNED_DIAGNOSIS, total_tokens=350)
+    return fake_openai
+
+
+_CANNED_DIAGNOSIS = """
 ━━━ DIAGNOZA ━━━
 🔴 Problem 1: Brak kart dźwiękowych ALSA – brak sterownika SOF
    → Fix: `sudo dnf install sof-firmware`
@@ -74,155 +211,111 @@ def mock_llm_client(mock_config):
 🟢 Problem 3: Cache miniaturek pusty
    → Fix: `nautilus -q && rm -rf ~/.cache/thumbnails/*`
 """
-        mock_response.usage.total_tokens = 350
-        mock_openai.OpenAI.return_value.chat.completions.create.return_value = (
-            mock_response
-        )
-        yield mock_openai
 
 
-@pytest.fixture
+# Statyczne dane diagnostyczne leżą w tests/fixtures/*.json i są parsowane
+# raz na proces. Scenariusze audio/thumbnails/full są współdzielone przez całą
+# sesję jako _FrozenDict – test, który chce coś zmienić, robi kopię (dict()
+# albo copy.deepcopy()); pozostałe dostają głęboką kopię jak dotąd.
+
+FIXDIR = Path(__file__).parent / "fixtures"
+
+
+@functools.lru_cache(maxsize=None)
+def _load_json(name: str) -> dict[str, Any]:
+    return json.loads((FIXDIR / name).read_text(encoding="utf-8"))
+
+
+class _FrozenDict(dict):
+    """
+    dict tylko do odczytu. W odróżnieniu od MappingProxyType str() i json.dumps
+    dają to samo co dla zwykłego dict – testy serializują te dane do LLM.
+    """
+
+    def _readonly(self, *_args, **_kwargs):
+        raise TypeError("dane diagnostyczne z fixture sesyjnego są tylko do odczytu")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        # copy.deepcopy() daje zwykłe, modyfikowalne dict
+        return dict, (dict(self),)
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return _FrozenDict({k: _freeze(v) for k, v in value.items()})
+    return value
+
+
+@pytest.fixture(scope="session")
 def broken_audio_diagnostics() -> dict[str, Any]:
     """Dane diagnostyczne symulujące uszkodzony dźwięk (Lenovo Yoga)."""
-    return {
-        "system": {
-            "kernel": "6.8.9-300.fc40.x86_64",
-            "os_release": "NAME=Fedora\nVERSION=40\nID=fedora",
-            "systemctl_failed": "  bluetooth.service  loaded failed failed Bluetooth service",
-            "dnf_updates_pending": "3",
-        },
-        "audio": {
-            "alsa_cards": "--- no soundcards ---",
-            "alsa_devices": "aplay: device_list:274: no soundcards found...",
-            "alsa_capture": "arecord: device_list:274: no soundcards found...",
-            "sof_firmware": "[ERR]: ls: cannot access '/lib/firmware/intel/sof*': No such file or directory",
-            "sof_modules": "",
-            "pipewire_status": "● pipewire.service - PipeWire Multimedia Service\n   Active: failed (Result: exit-code)",
-            "wireplumber_status": "● wireplumber.service\n   Active: failed (Result: exit-code)",
-            "audio_packages": "pipewire-1.0.4-1.fc40.x86_64\npipewire-pulseaudio-1.0.4-1.fc40.x86_64",
-            "sof_firmware_pkg": "package sof-firmware is not installed",
-            "kernel_audio_dmesg": (
-                "[ 5.123] snd_hda_intel: no codecs found!\n"
-                "[ 5.456] sof-audio-pci-intel-tgl: probe failed with error -19"
-            ),
-            "lenovo_ideapad": "ideapad_laptop 28672 0",
-        },
-        "thumbnails": {
-            "thumbnailers_installed": "",
-            "thumbnail_cache_count": "0",
-            "ffmpegthumbnailer": "ffmpegthumbnailer nie zainstalowany",
-            "totem_thumb": "totem-video-thumbnailer nie znaleziony",
-            "thumbnailer_packages": "",
-            "desktop_env": "GNOME",
-        },
-        "hardware": {
-            "dmi_product": "Yoga 7 14ARB7",
-            "dmi_vendor": "LENOVO",
-            "bios_version": "J2CN45WW",
-            "cpu_model": "AMD Ryzen 5 7530U",
-            "gpu_info": "00:02.0 Display controller: AMD/ATI",
-        },
-    }
+    return _freeze(_load_json("broken_audio.json"))
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def broken_thumbnails_diagnostics() -> dict[str, Any]:
     """Dane diagnostyczne symulujące brak podglądów plików."""
-    return {
-        "system": {
-            "kernel": "6.8.9-300.fc40.x86_64",
-            "os_release": "NAME=Fedora\nVERSION=40\nID=fedora",
-            "systemctl_failed": "",
-        },
-        "audio": {
-            "alsa_cards": " 0 [PCH]: HDA-Intel - HDA Intel PCH",
-            "pipewire_status": "Active: active (running)",
-        },
-        "thumbnails": {
-            "desktop_env": "GNOME",
-            "nautilus_version": "Nautilus 46.2",
-            "thumbnailers_installed": "(brak outputu)",
-            "gdk_pixbuf_loaders": "0",
-            "thumbnailer_configs": "total 0",
-            "thumbnail_cache_size": "4.0K\t/root/.cache/thumbnails/",
-            "thumbnail_cache_count": "0",
-            "thumbnail_fail_files": "47",  # Dużo failed thumbnails = problem
-            "ffmpegthumbnailer": "ffmpegthumbnailer nie zainstalowany",
-            "totem_thumb": "totem-video-thumbnailer nie znaleziony",
-            "thumbnailer_packages": "",
-            "gsettings_thumbnails": "'local-only'\nuint64 512",
-            "gst_bad_good": "",
-        },
-        "hardware": {
-            "dmi_product": "Yoga 7 14ARB7",
-            "dmi_vendor": "LENOVO",
-        },
-    }
+    return _freeze(_load_json("broken_thumbnails.json"))
 
 
-@pytest.fixture
-def full_broken_diagnostics(
-    broken_audio_diagnostics, broken_thumbnails_diagnostics
-) -> dict:
+@pytest.fixture(scope="session")
+def full_broken_diagnostics() -> dict[str, Any]:
     """Dane diagnostyczne z wieloma jednoczesne problemami."""
-    combined = dict(broken_audio_diagnostics)
-    combined["thumbnails"] = broken_thumbnails_diagnostics["thumbnails"]
+    combined = copy.deepcopy(_load_json("broken_audio.json"))
+    combined["thumbnails"] = copy.deepcopy(
+        _load_json("broken_thumbnails.json")["thumbnails"]
+    )
     combined["system"]["dnf_updates_pending"] = "15"
     combined["system"]["dmesg_errors"] = (
         "[drm:intel_dp_start_link_train] ERROR failed to start link training\n"
         "usb 2-2: device not accepting address 3, error -71"
     )
-    return combined
+    return _freeze(combined)
+
+
+# Serializacja (jak w produkcji) i anonimizacja tych samych danych – raz na sesję
+
+
+@pytest.fixture(scope="session")
+def broken_audio_diagnostics_str(broken_audio_diagnostics) -> str:
+    return _serialize(broken_audio_diagnostics)
+
+
+@pytest.fixture(scope="session")
+def broken_audio_diagnostics_anon(broken_audio_diagnostics_str) -> str:
+    return anonymize(broken_audio_diagnostics_str)[0]
+
+
+@pytest.fixture(scope="session")
+def broken_thumbnails_diagnostics_str(broken_thumbnails_diagnostics) -> str:
+    return _serialize(broken_thumbnails_diagnostics)
+
+
+@pytest.fixture(scope="session")
+def broken_thumbnails_diagnostics_anon(broken_thumbnails_diagnostics_str) -> str:
+    return anonymize(broken_thumbnails_diagnostics_str)[0]
+
+
+@pytest.fixture(scope="session")
+def full_broken_diagnostics_str(full_broken_diagnostics) -> str:
+    return _serialize(full_broken_diagnostics)
+
+
+@pytest.fixture(scope="session")
+def full_broken_diagnostics_anon(full_broken_diagnostics_str) -> str:
+    return anonymize(full_broken_diagnostics_str)[0]
 
 
 @pytest.fixture
 def broken_network_diagnostics() -> dict[str, Any]:
     """Dane diagnostyczne symulujące uszkodzoną sieć."""
-    return {
-        "system": {
-            "kernel": "6.8.9-300.fc40.x86_64",
-            "os_release": "NAME=Fedora\nVERSION=40\nID=fedora",
-            "systemctl_failed": (
-                "  NetworkManager.service  loaded failed failed Network Manager\n"
-                "  systemd-resolved.service  loaded failed failed Network Name Resolution"
-            ),
-            "journal_errors_24h": (
-                "NetworkManager[1234]: <error> device (wlan0): Couldn't initialize supplicant\n"
-                "systemd-resolved[5678]: Failed to start DNS stub listener\n"
-                "kernel: rfkill: input handler disabled"
-            ),
-            "firewall": "not running",
-        },
-        "network": {
-            "nm_status": "[ERR]: Failed to connect to system bus: No such file or directory",
-            "ip_addr": "[ERR]: Cannot open network namespace: No such file or directory",
-            "dns_resolve": "[ERR]: Temporary failure in name resolution",
-            "rfkill_list": "0: phy0: Wireless LAN\n\tSoft blocked: yes\n\tHard blocked: no",
-            "ping_gateway": "[ERR]: connect: Network is unreachable",
-            "wifi_scan": "[ERR]: Error: No Wi-Fi device found",
-            "nm_connections": "(brak outputu)",
-        },
-        "hardware": {
-            "dmi_product": "Yoga 7 14ARB7",
-            "dmi_vendor": "LENOVO",
-            "wifi_device": "Intel Wi-Fi 6 AX200",
-        },
-    }
+    return copy.deepcopy(_load_json("broken_network.json"))
 
 
 @pytest.fixture
 def broken_dns_diagnostics() -> dict[str, Any]:
     """Dane diagnostyczne z problemem tylko DNS."""
-    return {
-        "system": {
-            "kernel": "6.8.9-300.fc40.x86_64",
-            "os_release": "NAME=Ubuntu\nVERSION=22.04\nID=ubuntu",
-            "systemctl_failed": "  systemd-resolved.service  loaded failed failed",
-        },
-        "network": {
-            "nm_status": "NetworkManager is running",
-            "dns_resolve": "[ERR]: Temporary failure in name resolution",
-            "resolv_conf": "# Generated by resolvconf\nnameserver 127.0.0.53",
-            "systemd_resolved": "● systemd-resolved.service\n   Active: failed (Result: exit-code)",
-        },
-    }
+    return copy.deepcopy(_load_json("broken_dns.json"))
@@ -5,7 +5,6 @@ Używa mock LLM lub prawdziwego API (jeśli dostępny token w .env).
 
 from __future__ import annotations
 
-import os
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -14,21 +13,20 @@ import pytest
 pytest.importorskip("psutil")
 
 from fixos.utils.anonymizer import anonymize
+from tests.conftest import HOSTNAME, USERNAME, fake_response, requires_real_api
 
 
 class TestAudioAnonymization:
     """Testy anonimizacji danych audio."""
 
-    def test_anonymize_hostname(self, broken_audio_diagnostics):
+    def test_anonymize_hostname(self, broken_audio_diagnostics_str):
         """Hostname nie powinien być w zanonimizowanych danych."""
-        import socket
 
-        hostname = socket.gethostname()
-        data_str = str(broken_audio_diagnostics)
-        data_str += f" hostname={hostname}"
+        data_str = broken_audio_diagnostics_str
+        data_str += f" hostname={HOSTNAME}"
 
         anon, report = anonymize(data_str)
-        assert hostname not in anon
+        assert HOSTNAME not in anon
         assert "[HOSTNAME]" in anon
         assert report.replacements.get("Hostname", 0) > 0
 
@@ -119,44 +117,37 @@ class TestAudioDiagnosticsMockLLM:
     def test_llm_receives_anonymized_data(self, broken_audio_diagnostics, mock_config):
         """LLM powinien otrzymywać zanonimizowane dane, nie surowe."""
         from fixos.utils.anonymizer import anonymize
-        import socket
 
         # Dodaj wrażliwe dane do diagnostics
         data = dict(broken_audio_diagnostics)
-        data["_test_hostname"] = socket.gethostname()
+        data["_test_hostname"] = HOSTNAME
 
         anon_str, report = anonymize(str(data))
 
         # Hostname nie powinien być w danych wysyłanych do LLM
-        hostname = socket.gethostname()
-        assert hostname not in anon_str
+        assert HOSTNAME not in anon_str
 
-    def test_anonymization_report_not_empty(self, broken_audio_diagnostics):
+    def test_anonymization_report_not_empty(self, broken_audio_diagnostics_str):
         """Raport anonimizacji powinien zawierać co najmniej jedną kategorię."""
-        import socket
-        import getpass
 
-        data = str(broken_audio_diagnostics)
-        data += f" host={socket.gethostname()} user={getpass.getuser()}"
+        data = broken_audio_diagnostics_str
+        data += f" host={HOSTNAME} user={USERNAME}"
 
         _, report = anonymize(data)
         assert len(report.replacements) > 0
 
-    @patch("fixos.providers.llm.openai")
     def test_llm_called_with_sof_context(
-        self, mock_openai, broken_audio_diagnostics, mock_config
+        self, fake_openai, broken_audio_diagnostics_anon, mock_config
     ):
         """LLM powinien być wywołany z danymi zawierającymi info o SOF."""
         from fixos.providers.llm import LLMClient
 
         # Setup mock
-        mock_resp = MagicMock()
-        mock_resp.choices[0].message.content = "Zalecam: sudo dnf install sof-firmware"
-        mock_resp.usage.total_tokens = 100
-        mock_openai.OpenAI.return_value.chat.completions.create.return_value = mock_resp
+        content = "Zalecam: sudo dnf install sof-firmware"
+        fake_openai.response = fake_response(content, total_tokens=100)
 
         client = LLMClient(mock_config)
-        anon_str, _ = anonymize(str(broken_audio_diagnostics))
+        anon_str = broken_audio_diagnostics_anon
         messages = [
             {"role": "system", "content": "Jesteś diagnostą Fedora."},
             {"role": "user", "content": f"Dane:\n{anon_str}"},
@@ -164,59 +155,48 @@ class TestAudioDiagnosticsMockLLM:
         reply = client.chat(messages)
 
         # Sprawdź że API zostało wywołane
-        assert mock_openai.OpenAI.return_value.chat.completions.create.called
+        assert fake_openai.calls
         # Sprawdź że odpowiedź zawiera sugestię
         assert "sof-firmware" in reply.lower()
 
-    @patch("fixos.providers.llm.openai")
-    def test_llm_rate_limit_retry(self, mock_openai, mock_config):
+    def test_llm_rate_limit_retry(self, fake_openai, mock_config):
         """LLM powinien retry przy rate limit."""
         import openai as real_openai
         from fixos.providers.llm import LLMClient
 
-        mock_create = mock_openai.OpenAI.return_value.chat.completions.create
-        mock_openai.RateLimitError = real_openai.RateLimitError
-
         # Pierwsze dwa wywołania: rate limit, trzecie: sukces
-        mock_success = MagicMock()
-        mock_success.choices[0].message.content = "Sukces po retry"
-        mock_success.usage.total_tokens = 50
-
-        call_count = [0]
+        mock_success = fake_response("Sukces po retry", total_tokens=50)
 
-        def side_effect(*args, **kwargs):
-            call_count[0] += 1
-            if call_count[0] < 3:
+        def side_effect(**kwargs):
+            # fake_openai.calls zawiera już bieżące wywołanie
+            if len(fake_openai.calls) < 3:
                 raise real_openai.RateLimitError(
                     "rate limit", response=MagicMock(status_code=429), body={}
                 )
             return mock_success
 
-        mock_create.side_effect = side_effect
+        fake_openai.handler = side_effect
 
-        with patch("time.sleep"):  # Nie czekaj w testach
+        # Nie czekaj w testach
+        with patch("fixos.providers.llm.time.sleep") as sleep:
             client = LLMClient(mock_config)
             reply = client.chat([{"role": "user", "content": "test"}])
 
         assert reply == "Sukces po retry"
-        assert call_count[0] == 3
+        assert len(fake_openai.calls) == 3
+        assert [c.args for c in sleep.call_args_list] == [(10,), (20,)]
 
 
+@requires_real_api
 class TestAudioDiagnosticsReal:
     """Testy z prawdziwym API – uruchamiane tylko gdy token dostępny."""
 
-    @pytest.mark.skipif(
-        not os.environ.get("GEMINI_API_KEY")
-        or "TWOJ" in os.environ.get("GEMINI_API_KEY", ""),
-        reason="Wymaga prawdziwego GEMINI_API_KEY w .env",
-    )
-    def test_real_llm_analyzes_audio(self, broken_audio_diagnostics, test_config):
+    def test_real_llm_analyzes_audio(self, broken_audio_diagnostics_anon, test_config):
         """Prawdziwy LLM powinien wykryć problemy SOF w danych audio."""
         from fixos.providers.llm import LLMClient
-        from fixos.utils.anonymizer import anonymize
 
         client = LLMClient(test_config)
-        anon_str, _ = anonymize(str(broken_audio_diagnostics))
+        anon_str = broken_audio_diagnostics_anon
 
         messages = [
             {
@@ -214,6 +214,28 @@ class TestLiveExecution:
         assert result.success is False
         assert len(result.stderr) > 0
 
+    def test_shell_builtin_falls_back_to_shell(self, ex_live):
+        result = ex_live.execute_sync("cd /tmp", add_sudo=False, check_idempotent=False)
+        assert result.success is True
+
+    def test_large_stdout_capped(self, ex_live):
+        result = ex_live.execute_sync(
+            "head -c 500000 /dev/zero | tr '\\0' a",
+            add_sudo=False,
+            check_idempotent=False,
+        )
+        assert result.success is True
+        assert result.stdout == "a" * (64 * 1024)
+
+    def test_async_large_stdout_capped(self, ex_live):
+        import asyncio
+
+        result = asyncio.run(
+            ex_live.execute("head -c 500000 /dev/zero | tr '\\0' a", add_sudo=False)
+        )
+        assert result.success is True
+        assert len(result.stdout) == 64 * 1024
+
 
 class TestIdempotencyCheck:
     """Testy sprawdzania idempotentności przed wykonaniem."""
@@ -240,3 +262,18 @@ class TestIdempotencyCheck:
             )
             assert result.executed is True
             assert os.path.isdir(new_dir)
+
+    def test_check_idempotent_many_single_batch(self, ex_live):
+        import tempfile
+        import os
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            existing = f"mkdir -p {tmpdir}"
+            missing = f"mkdir -p {os.path.join(tmpdir, 'missing')}"
+            satisfied = ex_live.check_idempotent_many(
+                [existing, missing, "echo hello", "rm -rf /"]
+            )
+            assert satisfied == {existing}
+            result = ex_live.satisfied_result(existing)
+            assert result.executed is False
+            assert "już wykonane" in result.stdout
@@ -5,12 +5,10 @@ Symuluje: NetworkManager failed, DNS broken, rfkill blocked, firewall issues.
 
 from __future__ import annotations
 
-import os
-from unittest.mock import MagicMock, patch
-
 import pytest
 
 from fixos.utils.anonymizer import anonymize
+from tests.conftest import HOSTNAME, fake_response, requires_real_api
 
 
 @pytest.fixture
@@ -116,12 +114,10 @@ class TestNetworkAnonymization:
         assert "XX:XX:XX:XX:XX:XX" in anon
 
     def test_hostname_in_network_data_masked(self):
-        import socket
 
-        hostname = socket.gethostname()
-        data = f"host {hostname} connected to network"
+        data = f"host {HOSTNAME} connected to network"
         anon, report = anonymize(data)
-        assert hostname not in anon
+        assert HOSTNAME not in anon
         assert "[HOSTNAME]" in anon
 
     def test_private_ip_range_masked(self):
@@ -137,15 +133,13 @@ class TestNetworkAnonymization:
 class TestNetworkMockLLM:
     """Testy z mock LLM dla scenariusza broken-network."""
 
-    @patch("fixos.providers.llm.openai")
     def test_llm_suggests_rfkill_unblock(
-        self, mock_openai, broken_network_diagnostics, mock_config
+        self, fake_openai, broken_network_diagnostics, mock_config
     ):
         """LLM powinien sugerować odblokowanie rfkill."""
         from fixos.providers.llm import LLMClient
 
-        mock_resp = MagicMock()
-        mock_resp.choices[0].message.content = (
+        content = (
             "━━━ DIAGNOZA ━━━\n"
             "🔴 Problem 1: WiFi zablokowany przez rfkill\n"
             "   **Komenda:** `rfkill unblock wifi`\n"
@@ -157,8 +151,7 @@ class TestNetworkMockLLM:
             "   **Komenda:** `sudo systemctl restart systemd-resolved`\n"
             "   **Co robi:** Restartuje resolver DNS\n"
         )
-        mock_resp.usage.total_tokens = 200
-        mock_openai.OpenAI.return_value.chat.completions.create.return_value = mock_resp
+        fake_openai.response = fake_response(content, total_tokens=200)
 
         client = LLMClient(mock_config)
         anon_str, _ = anonymize(str(broken_network_diagnostics))
@@ -167,23 +160,20 @@ class TestNetworkMockLLM:
         assert "rfkill" in reply.lower()
         assert "NetworkManager" in reply or "networkmanager" in reply.lower()
 
-    @patch("fixos.providers.llm.openai")
     def test_llm_suggests_dns_fix(
-        self, mock_openai, broken_dns_diagnostics, mock_config
+        self, fake_openai, broken_dns_diagnostics, mock_config
     ):
         """LLM powinien sugerować naprawę DNS."""
         from fixos.providers.llm import LLMClient
 
-        mock_resp = MagicMock()
-        mock_resp.choices[0].message.content = (
+        content = (
             "🔴 Problem: systemd-resolved failed\n"
             "   **Komenda:** `sudo systemctl restart systemd-resolved`\n"
             "   **Co robi:** Restartuje resolver DNS\n"
             "   **Komenda:** `sudo ln -sf /run/systemd/resolve/stub-resolv.conf /etc/resolv.conf`\n"
             "   **Co robi:** Naprawia symlink resolv.conf\n"
         )
-        mock_resp.usage.total_tokens = 150
-        mock_openai.OpenAI.return_value.chat.completions.create.return_value = mock_resp
+        fake_openai.response = fake_response(content, total_tokens=150)
 
         client = LLMClient(mock_config)
         anon_str, _ = anonymize(str(broken_dns_diagnostics))
@@ -191,21 +181,18 @@ class TestNetworkMockLLM:
 
         assert "systemd-resolved" in reply or "dns" in reply.lower()
 
-    @patch("fixos.providers.llm.openai")
     def test_llm_network_commands_no_sudo_for_rfkill(
-        self, mock_openai, broken_network_diagnostics, mock_config
+        self, fake_openai, broken_network_diagnostics, mock_config
     ):
         """rfkill unblock nie wymaga sudo."""
         from fixos.providers.llm import LLMClient
         from fixos.orchestrator.executor import CommandExecutor
 
-        mock_resp = MagicMock()
-        mock_resp.choices[0].message.content = (
+        content = (
             "**Komenda:** `rfkill unblock wifi`\n"
             "**Komenda:** `sudo systemctl restart NetworkManager`\n"
         )
-        mock_resp.usage.total_tokens = 80
-        mock_openai.OpenAI.return_value.chat.completions.create.return_value = mock_resp
+        fake_openai.response = fake_response(content, total_tokens=80)
 
         client = LLMClient(mock_config)
         reply = client.chat([{"role": "user", "content": "fix network"}])
@@ -251,14 +238,10 @@ class TestNetworkExecutorIntegration:
         assert ex.needs_sudo("firewall-cmd --add-service=http") is True
 
 
+@requires_real_api
 class TestNetworkRealLLM:
     """Testy z prawdziwym API – tylko gdy token dostępny."""
 
-    @pytest.mark.skipif(
-        not os.environ.get("GEMINI_API_KEY")
-        or "TWOJ" in os.environ.get("GEMINI_API_KEY", ""),
-        reason="Wymaga GEMINI_API_KEY w .env",
-    )
     def test_real_llm_analyzes_network(self, broken_network_diagnostics, test_config):
         """Prawdziwy LLM powinien wykryć problemy sieciowe."""
         from fixos.providers.llm import LLMClient
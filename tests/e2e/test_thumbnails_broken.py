@@ -4,12 +4,10 @@ Testy e2e – scenariusz uszkodzonych podglądów plików (thumbnails).
 
 from __future__ import annotations
 
-import os
-from unittest.mock import MagicMock, patch
-
 import pytest
 
 from fixos.utils.anonymizer import anonymize
+from tests.conftest import HOSTNAME, USERNAME, fake_response, requires_real_api
 
 
 class TestThumbnailsDetection:
@@ -49,16 +47,14 @@ class TestThumbnailsDetection:
 class TestThumbnailsAnonymization:
     """Testy anonimizacji danych thumbnails."""
 
-    def test_home_path_in_cache_anonymized(self, broken_thumbnails_diagnostics):
+    def test_home_path_in_cache_anonymized(self, broken_thumbnails_diagnostics_str):
         """Ścieżka ~/.cache powinna być zanonimizowana."""
-        import getpass
 
-        username = getpass.getuser()
-        data = str(broken_thumbnails_diagnostics)
-        data += f" /home/{username}/.cache/thumbnails"
+        data = broken_thumbnails_diagnostics_str
+        data += f" /home/{USERNAME}/.cache/thumbnails"
 
         anon, report = anonymize(data)
-        assert username not in anon or "[USER]" in anon
+        assert USERNAME not in anon or "[USER]" in anon
 
     def test_xdg_cache_path_anonymized(self):
         """Ścieżka XDG_CACHE_HOME powinna być zanonimizowana."""
@@ -70,25 +66,22 @@ class TestThumbnailsAnonymization:
 class TestThumbnailsMockLLM:
     """Testy z mock LLM dla scenariusza thumbnails."""
 
-    @patch("fixos.providers.llm.openai")
     def test_llm_suggests_ffmpegthumbnailer(
-        self, mock_openai, broken_thumbnails_diagnostics, mock_config
+        self, fake_openai, broken_thumbnails_diagnostics_anon, mock_config
     ):
         """LLM powinien sugerować instalację ffmpegthumbnailer."""
         from fixos.providers.llm import LLMClient
 
-        mock_resp = MagicMock()
-        mock_resp.choices[0].message.content = (
+        content = (
             "🟡 Problem: Brak thumbnailerów\n"
             "→ Fix: `sudo dnf install ffmpegthumbnailer`\n"
             "→ Fix: `sudo dnf install totem-nautilus`\n"
             "→ Fix: `nautilus -q && rm -rf ~/.cache/thumbnails/*`"
         )
-        mock_resp.usage.total_tokens = 80
-        mock_openai.OpenAI.return_value.chat.completions.create.return_value = mock_resp
+        fake_openai.response = fake_response(content, total_tokens=80)
 
         client = LLMClient(mock_config)
-        anon_str, _ = anonymize(str(broken_thumbnails_diagnostics))
+        anon_str = broken_thumbnails_diagnostics_anon
         messages = [
             {"role": "system", "content": "Diagnozuj Fedora Linux."},
             {"role": "user", "content": anon_str},
@@ -98,23 +91,20 @@ class TestThumbnailsMockLLM:
         assert "ffmpegthumbnailer" in reply.lower()
         assert "dnf install" in reply.lower()
 
-    @patch("fixos.providers.llm.openai")
     def test_llm_suggests_cache_clear(
-        self, mock_openai, broken_thumbnails_diagnostics, mock_config
+        self, fake_openai, broken_thumbnails_diagnostics_anon, mock_config
     ):
         """LLM powinien sugerować wyczyszczenie cache thumbnails."""
         from fixos.providers.llm import LLMClient
 
-        mock_resp = MagicMock()
-        mock_resp.choices[0].message.content = (
+        content = (
             "Wyczyść cache: rm -rf ~/.cache/thumbnails/fail/*\n"
             "Zainstaluj: dnf install ffmpegthumbnailer gstreamer1-plugins-good"
         )
-        mock_resp.usage.total_tokens = 60
-        mock_openai.OpenAI.return_value.chat.completions.create.return_value = mock_resp
+        fake_openai.response = fake_response(content, total_tokens=60)
 
         client = LLMClient(mock_config)
-        anon_str, _ = anonymize(str(broken_thumbnails_diagnostics))
+        anon_str = broken_thumbnails_diagnostics_anon
         reply = client.chat([{"role": "user", "content": anon_str}])
 
         assert "thumbnail" in reply.lower() or "cache" in reply.lower()
@@ -173,28 +163,24 @@ class TestFullBrokenScenario:
         assert "hardware" in full_broken_diagnostics
         assert "system" in full_broken_diagnostics
 
-    def test_combined_issues_anonymized(self, full_broken_diagnostics):
+    def test_combined_issues_anonymized(self, full_broken_diagnostics_str):
         """Dane z wielu modułów powinny być anonimizowane razem."""
-        import socket
-        import getpass
 
-        data = str(full_broken_diagnostics)
-        data += f" {socket.gethostname()} {getpass.getuser()} 192.168.100.200"
+        data = full_broken_diagnostics_str
+        data += f" {HOSTNAME} {USERNAME} 192.168.100.200"
 
         anon, report = anonymize(data)
-        assert socket.gethostname() not in anon
+        assert HOSTNAME not in anon
         assert "192.168.100.200" not in anon
         assert len(report.replacements) >= 2
 
-    @patch("fixos.providers.llm.openai")
     def test_full_scenario_llm_comprehensive(
-        self, mock_openai, full_broken_diagnostics, mock_config
+        self, fake_openai, full_broken_diagnostics_anon, mock_config
     ):
         """LLM powinien wykryć wiele problemów naraz."""
         from fixos.providers.llm import LLMClient
 
-        mock_resp = MagicMock()
-        mock_resp.choices[0].message.content = """
+        content = """
 ━━━ DIAGNOZA ━━━
 🔴 Problem 1: Brak dźwięku – sof-firmware nie zainstalowany
    → Fix: `sudo dnf install sof-firmware`
@@ -207,11 +193,10 @@ class TestFullBrokenScenario:
 🟢 Problem 5: Pusty cache miniaturek
    → Fix: `rm -rf ~/.cache/thumbnails/*`
 """
-        mock_resp.usage.total_tokens = 400
-        mock_openai.OpenAI.return_value.chat.completions.create.return_value = mock_resp
+        fake_openai.response = fake_response(content, total_tokens=400)
 
         client = LLMClient(mock_config)
-        anon_str, _ = anonymize(str(full_broken_diagnostics))
+        anon_str = full_broken_diagnostics_anon
         messages = [
             {"role": "system", "content": "Diagnostyk Fedora."},
             {"role": "user", "content": anon_str},
@@ -223,18 +208,13 @@ class TestFullBrokenScenario:
         assert "ffmpegthumbnailer" in reply.lower() or "thumbnail" in reply.lower()
         assert "dnf" in reply.lower()
 
-    @pytest.mark.skipif(
-        not os.environ.get("GEMINI_API_KEY")
-        or "TWOJ" in os.environ.get("GEMINI_API_KEY", ""),
-        reason="Wymaga GEMINI_API_KEY w .env",
-    )
-    def test_real_llm_full_scenario(self, full_broken_diagnostics, test_config):
+    @requires_real_api
+    def test_real_llm_full_scenario(self, full_broken_diagnostics_anon, test_config):
         """Prawdziwy LLM analizuje pełny scenariusz uszkodzeń."""
         from fixos.providers.llm import LLMClient
-        from fixos.utils.anonymizer import anonymize
 
         client = LLMClient(test_config)
-        anon_str, _ = anonymize(str(full_broken_diagnostics))
+        anon_str = full_broken_diagnostics_anon
 
         messages = [
             {
@@ -5,11 +5,8 @@ Pokrywa: pyenv paths, kolejność zastąpień, pełne ścieżki /home.
 
 from __future__ import annotations
 
-import getpass
-import socket
-
-
 from fixos.utils.anonymizer import anonymize, AnonymizationReport
+from tests.conftest import HOSTNAME, USERNAME
 
 
 class TestHomePaths:
@@ -17,10 +14,9 @@ class TestHomePaths:
 
     def test_pyenv_full_path_anonymized(self):
         """Pełna ścieżka /home/user/.pyenv/versions/... musi być zamaskowana."""
-        username = getpass.getuser()
-        data = f"/home/{username}/.pyenv/versions/3.12.0/bin/python3.12"
+        data = f"/home/{USERNAME}/.pyenv/versions/3.12.0/bin/python3.12"
         anon, report = anonymize(data)
-        assert username not in anon
+        assert USERNAME not in anon
         assert "/home/[USER]" in anon
 
     def test_deep_nested_home_path(self):
@@ -79,10 +75,9 @@ class TestHomePaths:
 
     def test_username_replaced_after_paths(self):
         """Username jako słowo powinien być zastąpiony nawet po zastąpieniu ścieżek."""
-        username = getpass.getuser()
-        data = f"user {username} logged in from /home/{username}/.ssh/id_rsa"
+        data = f"user {USERNAME} logged in from /home/{USERNAME}/.ssh/id_rsa"
         anon, report = anonymize(data)
-        assert username not in anon
+        assert USERNAME not in anon
 
 
 class TestAnonymizerOrder:
@@ -90,25 +85,21 @@ class TestAnonymizerOrder:
 
     def test_hostname_replaced_before_username(self):
         """Hostname zastępowany przed username (hostname może zawierać username)."""
-        hostname = socket.gethostname()
-        data = f"connected to {hostname}"
+        data = f"connected to {HOSTNAME}"
         anon, report = anonymize(data)
-        assert hostname not in anon
+        assert HOSTNAME not in anon
         assert "[HOSTNAME]" in anon
 
     def test_home_path_replaced_before_username_word(self):
         """Ścieżka /home/user zastąpiona zanim username jako słowo."""
-        username = getpass.getuser()
-        data = f"/home/{username}/file.txt and user {username} is active"
+        data = f"/home/{USERNAME}/file.txt and user {USERNAME} is active"
         anon, _ = anonymize(data)
-        assert username not in anon
+        assert USERNAME not in anon
 
     def test_report_categories_present(self):
         """Raport powinien zawierać kategorie dla każdego zastąpienia."""
-        username = getpass.getuser()
-        hostname = socket.gethostname()
         data = (
-            f"host={hostname} user={username} "
+            f"host={HOSTNAME} user={USERNAME} "
             f"ip=192.168.1.1 mac=aa:bb:cc:dd:ee:ff "
             f"uuid=a1b2c3d4-e5f6-7890-abcd-ef1234567890"
         )
@@ -135,6 +126,17 @@ class TestAnonymizerEdgeCases:
         assert anon == ""
         assert len(report.replacements) == 0
 
+    def test_empty_string_skips_regex_pipeline(self):
+        from unittest.mock import patch
+
+        from fixos.utils import anonymizer
+
+        with patch.object(anonymizer, "_apply_regex_replacements") as regex:
+            anon, report = anonymize("")
+        regex.assert_not_called()
+        assert (anon, report.original_length, report.anonymized_length) == ("", 0, 0)
+        assert anonymize(None)[0] == "None"
+
     def test_none_converted_to_string(self):
         anon, _ = anonymize(None)
         assert isinstance(anon, str)
@@ -196,3 +198,253 @@ class TestAnonymizerEdgeCases:
         anon, report = anonymize(data)
         assert "supersecret123" not in anon
         assert report.replacements.get("Hasła/sekrety", 0) > 0
+
+    def test_anonymize_cached_matches_anonymize(self):
+        from fixos.utils.anonymizer import anonymize_cached
+
+        data = "ping 192.168.1.1 failed"
+        assert anonymize_cached(data) == anonymize(data)[0]
+        assert anonymize_cached(data) is anonymize_cached(data)
+
+    def test_token_inside_secret_counted_in_both_categories(self):
+        """Token wewnątrz sekretu liczony osobno – reguły działają po kolei."""
+        data = "api_key=sk-or-v1-abc123def456ghi789 host 10.1.2.3"
+        anon, report = anonymize(data)
+        assert "api_key=[REDACTED]" in anon
+        assert "10.1.XXX.XXX" in anon
+        assert report.replacements["Tokeny API"] == 1
+        assert report.replacements["Hasła/sekrety"] == 1
+        assert report.replacements["Adresy IPv4"] == 1
+
+    def test_sensitive_cache_invalidation(self):
+        from unittest.mock import patch
+
+        from fixos.utils.anonymizer import invalidate_sensitive_cache
+
+        invalidate_sensitive_cache()
+        try:
+            with patch("getpass.getuser", return_value="zenon"):
+                invalidate_sensitive_cache()
+                anon, _ = anonymize("owner zenon")
+            assert anon == "owner [USER]"
+        finally:
+            invalidate_sensitive_cache()
+
+    def test_hostname_and_home_single_pass_counts(self):
+        from unittest.mock import patch
+
+        from fixos.utils.anonymizer import _literal_union, invalidate_sensitive_cache
+
+        sensitive = {"hostname": "box7", "home": "/srv/u", "username": None}
+        try:
+            with patch("fixos.utils.anonymizer._get_sensitive", return_value=sensitive):
+                invalidate_sensitive_cache()
+                assert _literal_union()[0] is not None
+                anon, report = anonymize("box7: /srv/u/a /srv/u box7box7")
+            assert (
+                anon == "[HOSTNAME]: /home/[USER]/a /home/[USER] [HOSTNAME][HOSTNAME]"
+            )
+            assert report.replacements["Hostname"] == 3
+            assert report.replacements["Ścieżka domowa"] == 2
+        finally:
+            invalidate_sensitive_cache()
+
+    def test_hostname_inside_home_keeps_sequential_order(self):
+        from unittest.mock import patch
+
+        from fixos.utils.anonymizer import _literal_union, invalidate_sensitive_cache
+
+        sensitive = {"hostname": "fedora", "home": "/srv/fedora", "username": None}
+        try:
+            with patch("fixos.utils.anonymizer._get_sensitive", return_value=sensitive):
+                invalidate_sensitive_cache()
+                assert _literal_union()[0] is None
+                anon, report = anonymize("/srv/fedora on fedora")
+            assert anon == "/srv/[HOSTNAME] on [HOSTNAME]"
+            assert "Ścieżka domowa" not in report.replacements
+        finally:
+            invalidate_sensitive_cache()
+
+    def test_rules_gated_by_substring(self):
+        from unittest.mock import patch
+
+        from fixos.utils import anonymizer
+
+        ran = []
+
+        class _Spy:
+            def __init__(self, idx, rule):
+                self.idx, self.rule = idx, rule
+
+            def subn(self, replacement, text):
+                ran.append(self.idx)
+                return self.rule.subn(replacement, text)
+
+        spied = [
+            (_Spy(i, rule), replacement, label)
+            for i, (rule, replacement, label) in enumerate(
+                anonymizer._COMPILED_REPLACEMENTS
+            )
+        ]
+        with (
+            patch.object(anonymizer, "_COMPILED_REPLACEMENTS", spied),
+            patch.object(anonymizer, "re2", None),
+            patch.object(anonymizer, "hyperscan", None),
+        ):
+            anonymize("plain words only")
+            assert ran == [6]
+            ran.clear()
+            anonymize("ip 10.1.2.3")
+            assert ran == [1, 6]
+
+    def test_bearer_after_secret_key_fully_redacted(self):
+        anon, report = anonymize("token: Bearer abcdefghijklmnopqrstuvwx")
+        assert anon == "token=[REDACTED]"
+        assert report.replacements == {"Tokeny API": 1, "Hasła/sekrety": 1}
+
+    def test_overlapping_serial_and_secret_rules(self):
+        """Reguła wcześniejsza w liście wygrywa, nawet gdy późniejsza trafia z lewej."""
+        anon, report = anonymize("S/N: SECRET=hunter2")
+        assert "hunter2" not in anon
+        assert anon == "Serial: [SERIAL-REDACTED]=[REDACTED]"
+        assert report.replacements == {"Hasła/sekrety": 1, "Numery seryjne": 1}
+
+    def test_re2_engine_used_for_plain_ascii_only(self):
+        import re
+        from unittest.mock import patch
+
+        from fixos.utils import anonymizer
+
+        data = "ip 10.1.2.3 mac aa:bb:cc:dd:ee:ff"
+        expected = anonymize(data)[0]
+        anonymizer._re2_rules.cache_clear()
+        try:
+            # Stdlib re w roli modułu re2 – sprawdzamy tylko wybór silnika
+            with (
+                patch.object(anonymizer, "re2", re),
+                patch.object(
+                    anonymizer, "_re2_rules", wraps=anonymizer._re2_rules
+                ) as re2_rules,
+            ):
+                assert anonymize(data)[0] == expected
+                anonymize("zażółć 10.1.2.3")
+                anonymize("ip\v10.1.2.3")
+                assert re2_rules.call_count == 1
+                rules = anonymizer._re2_rules()
+                assert rules[0] is None  # /home/(?!...) – lookahead
+                assert rules[1] is not None
+        finally:
+            anonymizer._re2_rules.cache_clear()
+
+    def test_prefilter_patterns_are_supersets(self):
+        import re
+
+        from fixos.utils.anonymizer import _REGEX_REPLACEMENTS, _prefilter_pattern
+
+        for pattern, _, flags, _ in _REGEX_REPLACEMENTS:
+            expression, caseless = _prefilter_pattern(pattern, flags)
+            assert not re.search(r"\(\?<?[=!]", expression)
+            prefilter = re.compile(expression, re.IGNORECASE if caseless else 0)
+            for sample in ("/home/jan/x", "/home/[USER]/x", "ab12345678901234567890"):
+                if re.search(pattern, sample, flags):
+                    assert prefilter.search(sample), (pattern, sample)
+
+    def test_anonymize_obj_serializes_to_json(self):
+        import json
+        from pathlib import Path
+
+        from fixos.utils.anonymizer import _serialize, anonymize_obj
+
+        data = {"ip": "10.1.2.3", "home": Path("/home/żaneta/x"), "ok": True}
+        raw = _serialize(data)
+        assert "/home/żaneta/x" in raw  # bez ucieczek \uXXXX
+        anon, report = anonymize_obj(data)
+        assert json.loads(anon)["home"] == "/home/[USER]/..."
+        assert report.replacements["Adresy IPv4"] == 1
+        # Klucze spoza JSON – repr() jak dawniej
+        assert _serialize({(1, 2): "x"}) == str({(1, 2): "x"})
+
+    def test_report_tallies_follow_rule_order(self):
+        _, report = anonymize("mac aa:bb:cc:dd:ee:ff ip 10.1.2.3 ip 10.4.5.6")
+        assert report.replacements == {"Adresy IPv4": 2, "Adresy MAC": 1}
+        assert list(report.replacements) == ["Adresy IPv4", "Adresy MAC"]
+
+    def test_sub_count(self):
+        from fixos.utils.anonymizer import _sub_count
+
+        assert _sub_count("a-b-c", "-", "+") == ("a+b+c", 2)
+        assert _sub_count("abc", "x", "y") == ("abc", 0)
+
+
+class TestDictToMarkdown:
+    def test_nested_sections_indented(self):
+        from fixos.utils.anonymizer import _dict_to_markdown
+
+        md = _dict_to_markdown(
+            {"system": {"kernel": "6.1", "disks": {"sda": 1}}, "empty": {}}
+        )
+        assert md.split("\n") == [
+            "",
+            "### 🖥️ System",
+            "  - **kernel**: `6.1`",
+            "",
+            "  ### 💾 Dyski",
+            "    - **sda**: `1`",
+            "",
+            "### Empty",
+            "",
+        ]
+
+    def test_format_non_dict_skips_parser(self):
+        from unittest.mock import patch
+
+        from fixos.utils.anonymizer import _format_diagnostics_markdown
+
+        with patch("ast.literal_eval") as literal_eval:
+            out = _format_diagnostics_markdown("Jan 1 kernel: oops")
+        assert out == "```\nJan 1 kernel: oops\n```"
+        literal_eval.assert_not_called()
+
+    def test_format_dict_repr(self):
+        from fixos.utils.anonymizer import _format_diagnostics_markdown
+
+        assert _format_diagnostics_markdown("  {'uptime': 5}") == "- **uptime**: `5`"
+
+    def test_format_json_skips_literal_eval(self):
+        from unittest.mock import patch
+
+        from fixos.utils.anonymizer import _format_diagnostics_markdown
+
+        with patch("ast.literal_eval") as literal_eval:
+            out = _format_diagnostics_markdown('{"uptime": 5, "host": "[HOSTNAME]"}')
+        assert out == "- **uptime**: `5`\n- **host**: `HOSTNAME`"
+        literal_eval.assert_not_called()
+
+    def test_deep_nesting_no_recursion_limit(self):
+        import sys
+
+        from fixos.utils.anonymizer import _dict_to_markdown
+
+        data = node = {}
+        for _ in range(sys.getrecursionlimit() + 100):
+            node["n"] = {}
+            node = node["n"]
+        node["leaf"] = 1
+
+        assert _dict_to_markdown(data).endswith("- **leaf**: `1`")
+
+    def test_large_leaf_values_bounded(self):
+        from fixos.utils.anonymizer import _dict_to_markdown
+
+        md = _dict_to_markdown({"blob": b"x" * 100_000, "ids": tuple(range(1000))})
+        blob, ids = md.split("\n")
+
+        assert blob == "- **blob**: `b'" + "x" * 55 + "...`"
+        assert ids == "- **ids**: `(0, 1, 2, 3, 4, ...)`"
+
+    def test_colorize_key_value_line(self):
+        from fixos.utils.anonymizer import _colorize_md_line
+
+        # _C to no-opy – zostaje sam tekst bez znaczników **
+        assert _colorize_md_line("- **kernel**: `6.1`") == "- kernel: `6.1`"
+        assert _colorize_md_line("see `dmesg` output") == "see `dmesg` output"
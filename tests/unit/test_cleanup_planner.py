@@ -0,0 +1,169 @@
+"""Testy jednostkowe dla CleanupPlanner."""
+
+from __future__ import annotations
+
+from fixos.interactive.cleanup_planner import CleanupPlanner
+
+SUGGESTIONS = [
+    {
+        "type": "cache_cleanup",
+        "priority": "high",
+        "path": "/home/user/.cache/npm",
+        "size_gb": 2.5,
+        "command": "npm cache clean --force",
+        "safe": True,
+    },
+    {
+        "type": "cache_cleanup",
+        "priority": "low",
+        "path": "/home/user/.cache/pip",
+        "size_gb": 0.4,
+        "safe": True,
+    },
+    {
+        "type": "log_cleanup",
+        "priority": "medium",
+        "path": "/var/log",
+        "size_gb": 0.8,
+        "safe": True,
+    },
+    {
+        "type": "large_file",
+        "priority": "critical",
+        "path": "/home/user/disk.img",
+        "size_gb": 12.0,
+        "safe": False,
+    },
+    {
+        "type": "docker_cleanup",
+        "priority": "bogus",
+        "path": "/var/lib/docker",
+        "size_gb": "1.5",
+        "safe": True,
+    },
+]
+
+
+class TestCleanupPlan:
+    def test_summary_totals(self):
+        plan = CleanupPlanner().create_cleanup_plan(SUGGESTIONS)
+        summary = plan["summary"]
+
+        assert summary["total_actions"] == 5
+        assert summary["total_size_gb"] == 17.2
+        assert summary["safe_size_gb"] == 5.2
+        assert summary["high_priority_size_gb"] == 14.5
+        assert summary["categories_count"] == 4
+
+    def test_category_totals_and_order(self):
+        plan = CleanupPlanner().create_cleanup_plan(SUGGESTIONS)
+        cache = plan["categories"]["cache"]
+
+        assert cache["actions_count"] == 2
+        assert cache["total_size_gb"] == 2.9
+        assert [a["path"] for a in cache["actions"]] == [
+            "/home/user/.cache/npm",
+            "/home/user/.cache/pip",
+        ]
+        assert plan["categories"]["docker"]["actions"][0]["priority"] == "low"
+
+    def test_prioritized_actions_order(self):
+        plan = CleanupPlanner().create_cleanup_plan(SUGGESTIONS)
+
+        assert [a["path"] for a in plan["prioritized_actions"]] == [
+            "/home/user/disk.img",
+            "/home/user/.cache/npm",
+            "/var/log",
+            "/var/lib/docker",
+            "/home/user/.cache/pip",
+        ]
+
+    def test_unsafe_ties_ordered_by_size(self):
+        plan = CleanupPlanner().create_cleanup_plan(
+            [
+                {"type": "large_file", "path": "/a", "size_gb": 10.0},
+                {"type": "large_file", "path": "/b", "size_gb": 50.0},
+            ]
+        )
+
+        assert [a["path"] for a in plan["prioritized_actions"]] == ["/b", "/a"]
+
+    def test_recommendations(self):
+        plan = CleanupPlanner().create_cleanup_plan(SUGGESTIONS)
+        types = [r["type"] for r in plan["recommendations"]]
+
+        assert types == [
+            "safe_cleanup",
+            "cache_cleanup",
+            "log_cleanup",
+            "manual_review",
+        ]
+
+    def test_action_dict_shared_between_views(self):
+        plan = CleanupPlanner().create_cleanup_plan(SUGGESTIONS)
+        npm = plan["categories"]["cache"]["actions"][0]
+
+        assert npm is plan["prioritized_actions"][1]
+        assert npm["type"] == "cache_cleanup" and npm["dependencies"] == []
+
+    def test_empty_suggestions(self):
+        plan = CleanupPlanner().create_cleanup_plan([])
+
+        assert plan["summary"]["total_actions"] == 0
+        assert plan["prioritized_actions"] == []
+        assert plan["recommendations"] == []
+
+
+class TestGrouping:
+    def test_group_by_category_returns_sorted_dict(self):
+        grouped = CleanupPlanner().group_by_category(SUGGESTIONS)
+
+        assert isinstance(grouped, dict)
+        assert [a.path for a in grouped["cache"]] == [
+            "/home/user/.cache/npm",
+            "/home/user/.cache/pip",
+        ]
+
+    def test_group_by_category_with_stats(self):
+        grouped, stats = CleanupPlanner().group_by_category_with_stats(SUGGESTIONS)
+
+        assert sorted(grouped) == ["cache", "docker", "large_files", "logs"]
+        assert stats["per_category_total"]["cache"] == 2.9
+        assert stats["per_category_safe"]["large_files"] == 0.0
+
+    def test_prioritize_actions_full_list(self):
+        planner = CleanupPlanner()
+        prioritized = planner.prioritize_actions(planner.group_by_category(SUGGESTIONS))
+
+        assert len(prioritized) == 5
+        assert prioritized[0].path == "/home/user/disk.img"
+
+
+class TestCategoryForAction:
+    def _category(self, type_: str, path: str) -> str:
+        planner = CleanupPlanner()
+        return planner._get_category_for_action(
+            planner._dict_to_action({"type": type_, "path": path})
+        )
+
+    def test_type_only_categories(self):
+        assert self._category("cache_cleanup", "/var/lib/docker") == "cache"
+        assert self._category("docker_cleanup", "~/x") == "docker"
+
+    def test_path_heuristics(self):
+        assert self._category("package_cleanup", "/var/lib/docker") == "docker"
+        assert self._category("package_cleanup", "~/.m2") == "package_manager"
+        assert self._category("user_cleanup", "/var/cache") == "package_manager"
+        assert self._category("user_cleanup", "/opt/old") == "system"
+        assert self._category("system_cleanup", "~/Downloads") == "user"
+
+
+class TestDictToAction:
+    def test_unknown_enum_values_fall_back(self):
+        action = CleanupPlanner()._dict_to_action(
+            {"type": "nope", "priority": "urgent", "size_gb": "abc"}
+        )
+
+        assert action.type.value == "large_file"
+        assert action.priority.value == "low"
+        assert action.size_gb == 0.0
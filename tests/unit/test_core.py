@@ -7,6 +7,16 @@ from __future__ import annotations
 import os
 from unittest.mock import patch
 
+import pytest
+
+
+@pytest.fixture(scope="session")
+def gemini_config():
+    """Domyślna konfiguracja gemini – dla testów, które nie zmieniają env."""
+    from fixos.config import FixOsConfig
+
+    return FixOsConfig.load(provider="gemini")
+
 
 class TestConfig:
     def test_default_provider_is_gemini(self):
@@ -16,11 +26,8 @@ class TestConfig:
             cfg = FixOsConfig.load()
         assert cfg.provider == "gemini"
 
-    def test_model_default_gemini(self):
-        from fixos.config import FixOsConfig
-
-        cfg = FixOsConfig.load(provider="gemini")
-        assert "gemini" in cfg.model.lower()
+    def test_model_default_gemini(self, gemini_config):
+        assert "gemini" in gemini_config.model.lower()
 
     def test_invalid_provider_fallback(self):
         from fixos.config import FixOsConfig
@@ -29,6 +36,19 @@ class TestConfig:
             cfg = FixOsConfig.load()
         assert cfg.provider == "gemini"
 
+    def test_load_cached_per_env_snapshot(self):
+        from fixos.config import FixOsConfig, _load_cached
+
+        with patch.dict(os.environ, {"AGENT_MODE": "hitl"}, clear=False):
+            first = FixOsConfig.load()
+            first.agent_mode = "autonomous"
+            hits = _load_cached.cache_info().hits
+            second = FixOsConfig.load()
+            assert _load_cached.cache_info().hits == hits + 1
+            assert second is not first and second.agent_mode == "hitl"
+            os.environ["AGENT_MODE"] = "autonomous"
+            assert FixOsConfig.load().agent_mode == "autonomous"
+
     def test_validate_missing_key(self):
         from fixos.config import FixOsConfig
 
@@ -137,11 +157,213 @@ class TestWebSearch:
 
     def test_http_get_timeout(self):
         """_http_get powinien obsłużyć timeout gracefully."""
+        import socket
+
         from fixos.utils.web_search import _http_get
 
-        result = _http_get("http://240.0.0.1/nonexistent", timeout=1)
+        # Gniazdo słucha, ale nikt nie odpowiada – prawdziwy timeout odczytu,
+        # bez czekania na nieosiągalny adres
+        with socket.create_server(("127.0.0.1", 0)) as server:
+            port = server.getsockname()[1]
+            result = _http_get(f"http://127.0.0.1:{port}/nonexistent", timeout=0.05)
         assert result is None
 
+    def test_http_get_reuses_connection(self):
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        from fixos.utils.web_search import _http_get
+
+        peers = []
+
+        class _Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                peers.append(self.client_address)
+                if self.path == "/moved":
+                    self.send_response(302)
+                    self.send_header("Location", "/ok")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body = b"ok" if self.path.startswith("/ok") else b""
+                self.send_response(200 if body else 404)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_port}"
+        try:
+            assert _http_get(f"{base}/ok") == "ok"
+            assert _http_get(f"{base}/ok?q=1") == "ok"
+            assert _http_get(f"{base}/missing") is None
+            assert _http_get(f"{base}/moved") == "ok"
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert peers[0] == peers[1] == peers[2]
+
+    def test_http_get_honours_proxy_env(self, monkeypatch):
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        from fixos.utils import web_search
+
+        requested = []
+
+        class _Proxy(BaseHTTPRequestHandler):
+            def do_GET(self):
+                requested.append(self.path)
+                self.send_response(200)
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"ok")
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _Proxy)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        monkeypatch.setenv("http_proxy", f"http://127.0.0.1:{server.server_port}")
+        monkeypatch.setenv("no_proxy", "127.0.0.1")
+        direct = f"http://127.0.0.1:{server.server_port}/direct"
+        try:
+            assert web_search._http_get("http://example.invalid/x") == "ok"
+            assert web_search._http_get(direct) == "ok"
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        # Przez proxy idzie pełny URL, z pominięciem (NO_PROXY) – sama ścieżka
+        assert requested == ["http://example.invalid/x", "/direct"]
+
+    def test_search_results_cached_on_disk(self, tmp_path, monkeypatch):
+        import os
+
+        from fixos.utils import web_search
+
+        monkeypatch.setattr(web_search, "_CACHE_DIR", tmp_path)
+        monkeypatch.delenv("FIXOS_NO_CACHE", raising=False)
+        payload = ["q", ["PipeWire"], ["desc"], ["https://wiki/pw"]]
+
+        with patch.object(web_search, "_http_get_json", return_value=payload) as get:
+            first = web_search.search_arch_wiki("no sound")
+            second = web_search.search_arch_wiki("no sound")
+            assert get.call_count == 1
+            assert second == first and second[0].url == "https://wiki/pw"
+
+            (cached,) = tmp_path.glob("*.json")
+            os.utime(cached, (0, 0))
+            web_search.search_arch_wiki("no sound")
+            assert get.call_count == 2
+
+            monkeypatch.setenv("FIXOS_NO_CACHE", "1")
+            web_search.search_arch_wiki("no sound")
+            assert get.call_count == 3
+
+    def test_empty_search_results_not_cached(self, tmp_path, monkeypatch):
+        from fixos.utils import web_search
+
+        monkeypatch.setattr(web_search, "_CACHE_DIR", tmp_path)
+        monkeypatch.delenv("FIXOS_NO_CACHE", raising=False)
+        with patch.object(web_search, "_http_get_json", return_value=None):
+            assert web_search.search_arch_wiki("offline") == []
+        assert list(tmp_path.iterdir()) == []
+
+    def test_search_all_parallel_keeps_source_order(self):
+        import time
+
+        from fixos.utils import web_search
+        from fixos.utils.web_search import SearchResult
+
+        def _slow(name, delay):
+            def _search(query, *args):
+                time.sleep(delay)
+                return [SearchResult(title=name, url="", snippet="", source=name)]
+
+            return _search
+
+        with (
+            patch.object(web_search, "search_fedora_bugzilla", _slow("bz", 0.3)),
+            patch.object(web_search, "search_ask_fedora", _slow("ask", 0.3)),
+            patch.object(web_search, "search_arch_wiki", _slow("arch", 0.0)),
+            patch.object(web_search, "search_github_issues", _slow("gh", 0.3)),
+            patch.object(web_search, "search_ddg", lambda q, n: []),
+        ):
+            start = time.monotonic()
+            results = web_search.search_all("no sound")
+            elapsed = time.monotonic() - start
+
+        assert [r.title for r in results] == ["bz", "ask", "arch", "gh"]
+        assert elapsed < 0.8
+
+    def test_search_all_stops_once_target_reached(self):
+        import time
+
+        from fixos.utils import web_search
+        from fixos.utils.web_search import SearchResult
+
+        def _search(name, delay):
+            def _fn(query, *args):
+                time.sleep(delay)
+                return [SearchResult(title=name, url="", snippet="", source=name)] * 2
+
+            return _fn
+
+        with (
+            patch.object(web_search, "search_fedora_bugzilla", _search("bz", 0.5)),
+            patch.object(web_search, "search_ask_fedora", _search("ask", 0.5)),
+            patch.object(web_search, "search_arch_wiki", _search("arch", 0.0)),
+            patch.object(web_search, "search_github_issues", _search("gh", 0.5)),
+            patch.object(web_search, "search_ddg", _search("ddg", 0.0)),
+        ):
+            start = time.monotonic()
+            results = web_search.search_all("no sound", target=4)
+            elapsed = time.monotonic() - start
+
+        assert [r.title for r in results] == ["arch", "arch", "ddg", "ddg"]
+        assert elapsed < 0.4
+
+    def test_github_issues_queried_per_repo_and_ranked(self, monkeypatch):
+        from fixos.utils import web_search
+
+        monkeypatch.setenv("FIXOS_NO_CACHE", "1")
+        votes = {"thesofproject": 1, "PipeWire": 9, "alsa-project": 5}
+
+        def fake_get(url, headers=None):
+            owner = next(o for o in votes if f"repo%3A{o}" in url)
+            item = {
+                "title": owner,
+                "html_url": f"https://github.com/{owner}",
+                "state": "open",
+                "reactions": {"+1": votes[owner]},
+            }
+            return {"items": [item]}
+
+        with patch.object(web_search, "_http_get_json", side_effect=fake_get) as get:
+            results = web_search.search_github_issues("no sound", 2)
+
+        assert get.call_count == 3
+        assert [r.title for r in results] == ["PipeWire", "alsa-project"]
+        assert results[0].snippet == "Stan: open | 👍 9"
+
+    def test_http_get_json_parses_bytes(self):
+        from fixos.utils import web_search
+
+        with patch.object(
+            web_search, "_http_get_bytes", return_value=b'{"a": "\xc5\x82"}'
+        ):
+            assert web_search._http_get_json("http://x") == {"a": "ł"}
+        with patch.object(web_search, "_http_get_bytes", return_value=b"<html>"):
+            assert web_search._http_get_json("http://x") is None
+
 
 class TestSortFixesByPriority:
     def test_cleanup_before_upgrade(self):
@@ -359,6 +581,58 @@ class TestAllModulesRegistered:
                 f"Module {key} has empty description"
             )
 
+    def test_full_diagnostics_reports_progress_via_status(self):
+        from fixos.diagnostics import system_checks
+        from fixos.utils import terminal
+
+        modules = {"system": ("CPU", lambda: {"ok": 1}), "audio": ("Audio", None)}
+        with (
+            patch.dict(system_checks.DIAGNOSTIC_MODULES, modules, clear=True),
+            patch.object(terminal.console, "status") as status,
+            patch("builtins.print"),
+        ):
+            result = system_checks.get_full_diagnostics()
+
+        updates = [c.args[0] for c in status.return_value.update.call_args_list]
+        assert updates == ["  → CPU...", "  → Audio..."]
+        assert result["system"] == {"ok": 1} and "error" in result["audio"]
+
+
+class TestProbeTimeouts:
+    def test_sysfs_read_is_short(self):
+        from fixos.diagnostics.checks._shared import _timeout_for
+        from fixos.constants import PROBE_TIMEOUT_SYSFS
+
+        assert _timeout_for("cat /sys/class/dmi/id/product_name") == PROBE_TIMEOUT_SYSFS
+
+    def test_package_query_is_long(self):
+        from fixos.diagnostics.checks._shared import _timeout_for
+        from fixos.constants import PROBE_TIMEOUT_PACKAGES
+
+        assert _timeout_for("rpm -qa | grep pipewire") == PROBE_TIMEOUT_PACKAGES
+
+    def test_prefix_matches_whole_word(self):
+        from fixos.diagnostics.checks._shared import _timeout_for
+        from fixos.constants import DIAGNOSTIC_CMD_TIMEOUT, PROBE_TIMEOUT_PACKAGES
+
+        assert _timeout_for("dnfdragora --version") == DIAGNOSTIC_CMD_TIMEOUT
+        assert _timeout_for("dnf") == PROBE_TIMEOUT_PACKAGES
+
+    def test_unlisted_probes_keep_full_timeout(self):
+        from fixos.diagnostics.checks._shared import _timeout_for
+        from fixos.constants import DIAGNOSTIC_CMD_TIMEOUT
+
+        for cmd in (
+            "systemd-analyze blame",
+            "firewall-cmd --state",
+            "lspci -k",
+            "pactl info",
+            "btrfs filesystem usage /",
+            "nautilus --version",
+            "du -sh ~/.cache",
+        ):
+            assert _timeout_for(cmd) == DIAGNOSTIC_CMD_TIMEOUT, cmd
+
 
 class TestInteractiveBlocker:
     def test_newgrp_blocked(self):
@@ -383,3 +657,596 @@ class TestInteractiveBlocker:
         from fixos.platform_utils import is_interactive_blocker
 
         assert is_interactive_blocker("dnf upgrade -y") is None
+
+
+class TestNeedsElevation:
+    def test_first_token_lookup(self):
+        from fixos.platform_utils import needs_elevation
+
+        assert needs_elevation("dnf install -y vim")
+        assert needs_elevation("  systemctl restart sshd")
+        assert not needs_elevation("sudo dnf install -y vim")
+        assert not needs_elevation("mountpoint /boot")
+        assert not needs_elevation("")
+
+    def test_package_tool_variants(self):
+        from fixos.platform_utils import needs_elevation
+
+        assert needs_elevation("rpm-ostree install vim")
+        assert needs_elevation("yum-config-manager --enable epel")
+        assert needs_elevation("pacman-key --init")
+        assert needs_elevation("dnf5 install -y vim")
+        assert not needs_elevation("aptitude search vim")
+
+    def test_multi_word_prefixes(self):
+        from fixos.platform_utils import needs_elevation
+
+        assert needs_elevation("grub2-mkconfig -o /boot/grub2/grub.cfg")
+        assert needs_elevation("snap install code")
+        assert not needs_elevation("snap list")
+
+    def test_windows_tokens(self):
+        from fixos import platform_utils
+
+        with patch.object(platform_utils, "IS_WINDOWS", True):
+            assert platform_utils.needs_elevation("NETSH advfirewall show")
+            assert platform_utils.needs_elevation("bcdedit.exe /enum")
+            assert not platform_utils.needs_elevation("netstat -an")
+
+
+class TestSplitSimpleCommand:
+    def test_plain_command_split(self):
+        from fixos.platform_utils import split_simple_command
+
+        assert split_simple_command("systemctl restart 'my unit'") == [
+            "systemctl",
+            "restart",
+            "my unit",
+        ]
+
+    def test_metachars_need_shell(self):
+        from fixos.platform_utils import split_simple_command
+
+        assert split_simple_command("rpm -q x &>/dev/null") is None
+        assert split_simple_command("echo $HOME") is None
+        assert split_simple_command("LANG=C dnf list") is None
+        assert split_simple_command("systemctl restart foo # restart") is None
+        assert split_simple_command("") is None
+
+
+class TestPlatformIsDangerous:
+    def test_reason_per_pattern(self):
+        from fixos.platform_utils import is_dangerous
+
+        assert is_dangerous("sudo rm -rf /") == "rm -rf / destroys root filesystem"
+        assert is_dangerous("rm -rf /etc") == "deletes critical system directory"
+        assert is_dangerous("MKFS.ext4 /dev/sdb1") == "formats filesystem"
+        assert is_dangerous("del /s C:\\Windows") == "deletes Windows system files"
+
+    def test_safe_commands(self):
+        from fixos.platform_utils import is_dangerous
+
+        assert is_dangerous("rm -rf /tmp/build") is None
+        assert is_dangerous("dd if=/dev/zero of=/dev/sda1") is None
+
+
+class TestSharedDmesg:
+    def _fake_run(self, stdout: bytes):
+        from unittest.mock import MagicMock
+
+        calls = []
+
+        def run(argv, **kwargs):
+            calls.append(argv)
+            return MagicMock(returncode=0, stdout=stdout)
+
+        return run, calls
+
+    def test_single_read_feeds_all_filters(self):
+        import re
+        from fixos.diagnostics.checks import _shared
+
+        run, calls = self._fake_run(
+            b"kern  :err   : snd_hda_intel: codec probe failed\n"
+            b"kern  :info  : Out of memory: Killed process 42\n"
+        )
+        _shared._dmesg.cache_clear()
+        with patch.object(_shared.subprocess, "run", run):
+            audio = _shared._dmesg_grep(re.compile("snd", re.I), 5)
+            errors = _shared._dmesg_grep(None, 5, levels=frozenset({"err"}))
+            oom = _shared._dmesg_grep(re.compile("out of memory", re.I), 5)
+        _shared._dmesg.cache_clear()
+
+        assert len(calls) == 1
+        assert audio == errors == "snd_hda_intel: codec probe failed"
+        assert oom == "Out of memory: Killed process 42"
+
+    def test_empty_placeholder(self):
+        import re
+        from fixos.diagnostics.checks import _shared
+
+        run, _ = self._fake_run(b"")
+        _shared._dmesg.cache_clear()
+        with patch.object(_shared.subprocess, "run", run):
+            assert _shared._dmesg_grep(re.compile("oom"), 5, empty="none") == "none"
+        _shared._dmesg.cache_clear()
+
+    def test_levels_without_decode_use_dmesg_level(self):
+        import re
+        from unittest.mock import MagicMock
+        from fixos.diagnostics.checks import _shared
+
+        calls = []
+
+        def run(argv, **kwargs):
+            calls.append(argv)
+            if "--decode" in argv:
+                return MagicMock(returncode=1, stdout=b"")
+            if any(arg.startswith("--level=") for arg in argv):
+                return MagicMock(returncode=0, stdout=b"sda: I/O error\n")
+            return MagicMock(returncode=0, stdout=b"snd_hda_intel: probe\n")
+
+        _shared._dmesg.cache_clear()
+        with patch.object(_shared.subprocess, "run", run):
+            audio = _shared._dmesg_grep(re.compile("snd", re.I), 5)
+            errors = _shared._dmesg_grep(None, 5, levels=frozenset({"err", "crit"}))
+        _shared._dmesg.cache_clear()
+
+        assert audio == "snd_hda_intel: probe"
+        assert errors == "sda: I/O error"
+        assert calls[-1] == ["dmesg", "--level=crit,err", "--notime"]
+
+
+class TestUserServiceStatus:
+    def test_units_parsed_once_and_missing_reported(self):
+        from unittest.mock import MagicMock
+        from fixos.diagnostics.checks import _shared
+
+        listing = (
+            b"pipewire.service loaded active running PipeWire Multimedia Service\n"
+            b"wireplumber.service loaded active running Multimedia Service Session Manager\n"
+        )
+        run = MagicMock(return_value=MagicMock(returncode=0, stdout=listing))
+        _shared._systemctl_user_units.cache_clear()
+        with patch.object(_shared.subprocess, "run", run):
+            pw = _shared._user_service_status("pipewire.service", 20)
+            wp = _shared._user_service_status("wireplumber.service", 20)
+            pa = _shared._user_service_status("pulseaudio.service", 10)
+        _shared._systemctl_user_units.cache_clear()
+
+        assert run.call_count == 1
+        assert pw == "pipewire.service: loaded active (running)"
+        assert "active" in wp
+        assert pa == "pulseaudio.service: (not found)"
+
+
+class TestDuAndCount:
+    def test_size_and_filtered_count_in_one_walk(self, tmp_path):
+        from fixos.diagnostics.checks._shared import _du_and_count
+
+        (tmp_path / "normal").mkdir()
+        (tmp_path / "normal" / "a.png").write_bytes(b"x" * 100)
+        (tmp_path / "normal" / "b.png").write_bytes(b"x" * 50)
+        (tmp_path / "notes.txt").write_bytes(b"x" * 10)
+
+        assert _du_and_count(tmp_path, ".png") == (160, 2)
+        assert _du_and_count(tmp_path) == (160, 3)
+
+    def test_missing_root_is_empty(self, tmp_path):
+        from fixos.diagnostics.checks._shared import _du_and_count
+
+        assert _du_and_count(tmp_path / "missing") == (0, 0)
+
+
+class TestLLMChatStream:
+    def test_stream_yields_content_and_counts_usage(self, fake_openai):
+        from fixos.config import FixOsConfig
+        from fixos.providers.llm import LLMClient
+        from tests.conftest import fake_chunk
+
+        chunks = [
+            fake_chunk("Hel"),
+            fake_chunk(None),
+            fake_chunk("lo"),
+            fake_chunk(usage=42),  # ostatni chunk: bez choices, z usage
+        ]
+        fake_openai.handler = lambda **_: iter(chunks)
+        client = LLMClient(FixOsConfig(api_key="x", model="m"))
+
+        assert "".join(client.chat_stream([{"role": "user", "content": "hi"}])) == (
+            "Hello"
+        )
+        assert client.total_tokens == 42
+        assert fake_openai.calls[0]["stream_options"] == {"include_usage": True}
+
+
+class TestLLMClientPool:
+    @patch("fixos.providers.llm.openai")
+    def test_client_shared_per_key_and_url(self, mock_openai):
+        from fixos.config import FixOsConfig
+        from fixos.providers.llm import LLMClient
+
+        mock_openai.OpenAI.side_effect = lambda **kw: object()
+        a = LLMClient(FixOsConfig(api_key="k1", model="m"))
+        b = LLMClient(FixOsConfig(api_key="k1", model="other"))
+        c = LLMClient(FixOsConfig(api_key="k2", model="m"))
+
+        assert a._client is b._client
+        assert a._client is not c._client
+        assert mock_openai.OpenAI.call_count == 2
+
+
+class TestLLMErrors:
+    @patch("fixos.providers.llm.time.sleep")
+    @patch("fixos.providers.llm.openai")
+    def test_timeout_retried_then_reported(self, mock_openai, _sleep):
+        from unittest.mock import MagicMock
+
+        import openai as real_openai
+        import pytest
+
+        from fixos.config import FixOsConfig
+        from fixos.providers.llm import LLMClient, LLMError
+
+        create = mock_openai.OpenAI.return_value.chat.completions.create
+        create.side_effect = real_openai.APITimeoutError(request=MagicMock())
+        client = LLMClient(FixOsConfig(api_key="timeout", model="m"))
+
+        with pytest.raises(LLMError, match="Timeout"):
+            client.chat([{"role": "user", "content": "hi"}])
+        assert create.call_count == 3
+
+    @patch("fixos.providers.llm.openai")
+    def test_unknown_error_not_retried(self, mock_openai):
+        import pytest
+
+        from fixos.config import FixOsConfig
+        from fixos.providers.llm import LLMClient, LLMError
+
+        create = mock_openai.OpenAI.return_value.chat.completions.create
+        create.side_effect = KeyError("boom")
+        client = LLMClient(FixOsConfig(api_key="unknown", model="m"))
+
+        with pytest.raises(LLMError, match="Nieoczekiwany"):
+            client.chat([{"role": "user", "content": "hi"}])
+        assert create.call_count == 1
+
+
+class TestOsInfo:
+    def test_read_once_and_copied(self):
+        from fixos import platform_utils
+
+        platform_utils._static_os_info.cache_clear()
+        with patch.object(platform_utils.platform, "release", return_value="r1") as rel:
+            first = platform_utils.get_os_info()
+            first["extra"] = 1
+            second = platform_utils.get_os_info()
+        platform_utils._static_os_info.cache_clear()
+
+        assert rel.call_count == 1
+        assert second["release"] == "r1" and "extra" not in second
+
+
+class TestPackageManager:
+    def test_install_cmd_uses_detected_manager(self):
+        from fixos import platform_utils
+
+        with patch.object(platform_utils, "get_package_manager", return_value="apk"):
+            assert platform_utils.install_package_cmd("curl") == "apk add curl"
+        with patch.object(platform_utils, "get_package_manager", return_value=None):
+            assert "manually" in platform_utils.install_package_cmd("curl")
+
+    def test_cmd_exists_memoized(self):
+        from fixos import platform_utils
+
+        platform_utils._cmd_exists.cache_clear()
+        with patch.object(platform_utils.shutil, "which", return_value="/bin/x") as w:
+            assert platform_utils._cmd_exists("fixos-x") is True
+            assert platform_utils._cmd_exists("fixos-x") is True
+        platform_utils._cmd_exists.cache_clear()
+        assert w.call_count == 1
+
+
+class TestShellSession:
+    def test_run_matches_run_command_shape(self):
+        from fixos.platform_utils import ShellSession
+
+        with ShellSession() as sh:
+            assert sh.run("echo out; echo err >&2; false") == (
+                False,
+                "out",
+                "err",
+                1,
+            )
+            assert sh.run("printf 'no newline'") == (True, "no newline", "", 0)
+
+    def test_run_many_preserves_order_and_survives_exit(self):
+        from fixos.platform_utils import ShellSession
+
+        with ShellSession() as sh:
+            results = sh.run_many(["echo a", "exit 7", "echo b"])
+        assert [r[1] for r in results] == ["a", "", "b"]
+        assert [r[3] for r in results] == [0, 7, 0]
+
+    def test_timeout_restarts_shell(self):
+        from fixos.platform_utils import ShellSession
+
+        with ShellSession() as sh:
+            assert sh.run("sleep 5", timeout=1)[3] == -2
+            assert sh.run("echo again") == (True, "again", "", 0)
+
+
+class TestRunCommandsParallel:
+    def test_results_in_input_order(self):
+        from fixos.platform_utils import run_commands_parallel
+
+        results = run_commands_parallel(
+            ["sleep 0.2; echo slow", "echo err >&2; exit 2", "echo fast"],
+            max_concurrency=2,
+        )
+        assert results == [
+            (True, "slow", "", 0),
+            (False, "", "err", 2),
+            (True, "fast", "", 0),
+        ]
+
+    def test_timeout_kills_children(self):
+        import time
+
+        from fixos.platform_utils import run_commands_parallel
+
+        start = time.monotonic()
+        (result,) = run_commands_parallel(["sleep 5; echo late"], timeout=1)
+        assert result == (False, "", "[TIMEOUT 1s]", -2)
+        assert time.monotonic() - start < 4
+
+    def test_empty(self):
+        from fixos.platform_utils import run_commands_parallel
+
+        assert run_commands_parallel([]) == []
+
+
+class TestRenderMdHelpers:
+    def test_severity_style_by_first_char(self):
+        from fixos.utils.terminal import _get_severity_style
+
+        assert _get_severity_style("🔴 Problem") == "bold red"
+        assert _get_severity_style("⚠️ uwaga") == "yellow"
+        assert _get_severity_style("⚠ uwaga") == "yellow"
+        assert _get_severity_style("zwykła linia") is None
+        assert _get_severity_style("") is None
+
+    def test_divider_and_action_patterns(self):
+        from fixos.utils.terminal import _classify_line, _is_divider_line
+
+        assert _is_divider_line("━━━ DIAGNOZA ━━━")
+        assert not _is_divider_line("--- yaml")
+        assert _classify_line("  [A] Wykonaj wszystkie") == "action"
+        assert _classify_line("[X] nic") is None
+        assert _classify_line("  ```bash") == "fence"
+        assert _classify_line("  🟢 OK") == "severity"
+
+    def test_render_md_prints_once(self):
+        from fixos.utils import terminal
+
+        text = "━━━ A ━━━\n🔴 one\n🔴 two\n[A] all\nplain *md*\n```sh\nls\n```"
+        with patch.object(terminal.console, "print") as printed:
+            terminal.render_md(text)
+
+        assert printed.call_count == 1
+        (group,) = printed.call_args.args
+        # rule, coalesced red lines, action line, markdown, code panel
+        assert len(group.renderables) == 5
+        assert str(group.renderables[1]) == "🔴 one\n🔴 two"
+
+    def test_render_md_fence_language_and_indented_divider(self):
+        from fixos.utils import terminal
+
+        with patch.object(terminal.console, "print") as printed:
+            terminal.render_md("  ═══ Krok 1 ═══  \n  ```  bash \nls\n```")
+
+        rule, panel = printed.call_args.args[0].renderables
+        assert "Krok 1" in str(rule.title)
+        assert panel.title == "[dim]bash[/dim]"
+
+    def test_head_lines_matches_strip_splitlines(self):
+        from fixos.utils.terminal import _head_lines
+
+        text = "\n\n  a\nb\n\nc\n\n\n"
+        assert _head_lines(text, 2) == (["a", "b"], 2)
+        assert _head_lines(text, 10) == (["a", "b", "", "c"], 0)
+        assert _head_lines("   \n", 3) == ([], 0)
+
+    def test_head_lines_splits_carriage_returns(self):
+        from fixos.utils.terminal import _head_lines
+
+        for text in (
+            "10%\r50%\r100%\ndone\n",
+            "a\r\nb\r\n\r\nc\r",
+            "\r\n x\fy\x85z\u2028w ",
+        ):
+            lines = text.strip().splitlines()
+            assert _head_lines(text, 2) == (lines[:2], len(lines[2:])), text
+            assert _head_lines(text, 10) == (lines, 0), text
+
+    def test_output_box_uses_real_newlines(self):
+        from fixos.utils import terminal
+
+        with patch.object(terminal.console, "print") as printed:
+            terminal.print_stdout_box("l1\nl2\nl3", max_lines=2)
+
+        code = printed.call_args.args[0].renderable.code
+        assert code == "l1\nl2\n[dim]... (1 więcej linii)[/dim]"
+
+    def test_render_md_handles_crlf(self):
+        from fixos.utils import terminal
+
+        with patch.object(terminal.console, "print") as printed:
+            terminal.render_md("🔴 one\r\n🔴 two\r\n")
+
+        (group,) = printed.call_args.args
+        assert str(group.renderables[0]) == "🔴 one\n🔴 two"
+
+    def test_wrap(self):
+        from fixos.utils.terminal import _wrap
+
+        assert _wrap("ala  ma\tkota i psa", 7) == ["ala ma", "kota i", "psa"]
+        assert _wrap("bardzodlugiesłowo x", 5) == ["bardzodlugiesłowo", "x"]
+        assert _wrap("   ", 10) == [""]
+
+    def test_render_tree_colored(self):
+        from fixos.orchestrator.graph import Problem
+        from fixos.utils.terminal import render_tree_colored
+
+        nodes = {
+            "P1": Problem("P1", "root", "critical", [], may_cause=["P2"]),
+            "P2": Problem("P2", "child", "info", [], caused_by=["P1"]),
+            "P3": Problem("P3", "orphan", "odd", [], caused_by=["X"]),
+        }
+
+        assert render_tree_colored(nodes, []).splitlines() == [
+            "  [bold red]🔴 [P1][/bold red] [red]root[/red]  [dim]⏳[/dim]",
+            "  └─ [bold green]🟢 [P2][/bold green] [green]child[/green]  [dim]⏳[/dim]",
+            "  [dim]◦[/dim] [bold white]⚪ [P3][/bold white] [white]orphan[/white]"
+            "  [dim]⏳[/dim]",
+        ]
+        assert render_tree_colored({}, []) == "  [dim](brak problemów)[/dim]"
+
+    def test_render_tree_colored_deep_chain(self):
+        from fixos.orchestrator.graph import Problem
+        from fixos.utils.terminal import render_tree_colored
+
+        n = 3000
+        nodes = {
+            f"P{i}": Problem(
+                f"P{i}",
+                "x",
+                "info",
+                [],
+                caused_by=[f"P{i - 1}"] if i else [],
+                may_cause=[f"P{i + 1}"] if i + 1 < n else [],
+            )
+            for i in range(n)
+        }
+
+        lines = render_tree_colored(nodes, []).splitlines()
+        assert len(lines) == n
+        assert lines[-1].startswith("  " * (n - 1) + "└─ ")
+
+    def test_terminal_defers_heavy_rich_modules(self):
+        import subprocess
+        import sys
+
+        code = (
+            "import sys, fixos.utils.terminal as t; "
+            "print(sorted(m for m in ('rich.markdown', 'rich.syntax') if m in sys.modules))"
+        )
+        out = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        )
+        assert out.stdout.strip() == "[]"
+
+
+class TestLegacySystemChecks:
+    def test_fedora_commands_run_concurrently_in_order(self):
+        import threading
+
+        from fixos import system_checks
+
+        barrier = threading.Barrier(2, timeout=5)
+
+        def fake_run(argv, keep, fallback):
+            if argv[0] in ("uname", "getenforce"):
+                barrier.wait()
+            return f"out:{' '.join(argv)}"
+
+        with (
+            patch.object(system_checks, "run_argv", side_effect=fake_run),
+            patch.dict(system_checks._FEDORA_CMDS, {"os_release": lambda: "ID=x"}),
+        ):
+            result = system_checks.get_fedora_specific()
+
+        assert list(result) == list(system_checks._FEDORA_CMDS)
+        assert result["kernel_version"] == "out:uname -r"
+        assert result["os_release"] == "ID=x"
+
+    def test_run_argv_slices_and_falls_back(self):
+        import subprocess
+
+        from fixos import system_checks
+
+        def fake_run(argv, **kwargs):
+            if argv[0] == "missing":
+                raise FileNotFoundError(argv[0])
+            rc = 1 if argv[0] == "fails" else 0
+            return subprocess.CompletedProcess(argv, rc, stdout="a\nb\nc\n")
+
+        with patch.object(system_checks.subprocess, "run", side_effect=fake_run):
+            assert system_checks.run_argv(["ok"], slice(2)) == "a\nb"
+            assert system_checks.run_argv(["ok"], slice(-1, None)) == "c"
+            assert system_checks.run_argv(["missing"], None, "brak") == "brak"
+            assert system_checks.run_argv(["missing"]) == "(brak outputu)"
+            assert system_checks.run_argv(["fails"], None, ["ok"]) == "a\nb\nc\na\nb\nc"
+            assert system_checks.run_argv(["ok"], None, ["missing"]) == "a\nb\nc"
+
+    def test_read_os_release_filters_keys(self, tmp_path):
+        from fixos import system_checks
+
+        f = tmp_path / "os-release"
+        f.write_text('NAME="Fedora"\nVERSION_ID=40\nVERSION="40"\nID=fedora\nX=1\n')
+
+        assert system_checks._read_os_release(str(f)) == (
+            'NAME="Fedora"\nVERSION="40"\nID=fedora'
+        )
+        assert system_checks._read_os_release(str(tmp_path / "nope")).startswith(
+            "[BŁĄD"
+        )
+
+    def test_top_processes_primes_cpu_and_skips_dead(self):
+        from unittest.mock import MagicMock
+
+        import psutil
+
+        from fixos import system_checks
+
+        def proc(pid, cpu, dead=False):
+            p = MagicMock()
+            p.info = {"pid": pid, "name": f"p{pid}"}
+            readings = iter([0.0, cpu])
+
+            def cpu_percent(_interval):
+                value = next(readings)
+                if dead and value == cpu:
+                    raise psutil.NoSuchProcess(pid)
+                return value
+
+            p.cpu_percent.side_effect = cpu_percent
+            return p
+
+        procs = [proc(1, 5.0), proc(2, 50.0), proc(3, 99.0, dead=True), proc(4, 20.0)]
+        with (
+            patch.object(psutil, "process_iter", return_value=procs),
+            patch.object(system_checks.time, "sleep") as sleep,
+        ):
+            top = system_checks.get_top_processes(2)
+
+        sleep.assert_called_once()
+        assert [p["pid"] for p in top] == [2, 4]
+        assert top[0]["cpu_percent"] == 50.0
+
+    def test_cpu_counts_cached(self):
+        import psutil
+
+        from fixos import system_checks
+
+        system_checks._static_cpu_counts.cache_clear()
+        with (
+            patch.object(psutil, "cpu_count", return_value=4) as cpu_count,
+            patch.object(psutil, "cpu_percent", return_value=1.0),
+        ):
+            first = system_checks.get_cpu_info()
+            second = system_checks.get_cpu_info()
+        system_checks._static_cpu_counts.cache_clear()
+
+        assert cpu_count.call_count == 2
+        assert first["count_logical"] == second["count_physical"] == 4
@@ -134,6 +134,20 @@ class TestAddSudo:
         assert cmd == "sudo dnf install foo"
 
 
+class TestIsPackageCommand:
+    """Testy is_package_command() – komendy biorące blokadę menedżera pakietów."""
+
+    def test_package_managers(self, ex):
+        assert ex.is_package_command("dnf install sof-firmware") is True
+        assert ex.is_package_command("sudo apt-get install -y curl") is True
+        assert ex.is_package_command("flatpak update") is True
+
+    def test_other_commands(self, ex):
+        assert ex.is_package_command("systemctl restart sshd") is False
+        assert ex.is_package_command("sudo mount /dev/sda1 /mnt") is False
+        assert ex.is_package_command("") is False
+
+
 class TestIsDangerous:
     """Testy is_dangerous() – walidacja niebezpiecznych komend."""
 
@@ -178,6 +192,13 @@ class TestIsDangerous:
         dangerous, _ = ex.is_dangerous("chmod -R 777 /")
         assert dangerous is True
 
+    def test_reason_matches_pattern(self, ex):
+        assert ex.is_dangerous("rm -rf /etc") == (True, "usuwanie katalogu systemowego")
+        assert ex.is_dangerous("MKFS.ext4 /dev/sda1") == (
+            True,
+            "formatowanie systemu plików",
+        )
+
 
 class TestCheckIdempotent:
     """Testy check_idempotent() – sprawdzanie stanu przed wykonaniem."""
@@ -210,6 +231,24 @@ class TestCheckIdempotent:
         check = ex.check_idempotent("sudo apt-get install -y curl")
         assert check is None
 
+    def test_batch_failure_falls_back_to_single_probes(self, ex):
+        import subprocess
+        from unittest.mock import MagicMock, patch
+
+        scripts = []
+
+        def run_check(script, timeout):
+            scripts.append(script)
+            if "\n" in script:
+                raise subprocess.TimeoutExpired(script, timeout)
+            return MagicMock(returncode=0 if "/tmp/a" in script else 1)
+
+        with patch("fixos.orchestrator.executor._run_check", side_effect=run_check):
+            satisfied = ex.check_idempotent_many(["mkdir -p /tmp/a", "mkdir -p /tmp/b"])
+
+        assert satisfied == {"mkdir -p /tmp/a"}
+        assert len(scripts) == 3
+
 
 class TestExecuteSyncDryRun:
     """Testy execute_sync() w trybie dry-run."""
@@ -229,6 +268,13 @@ class TestExecuteSyncDryRun:
         )
         assert "-y" in result.command
 
+    def test_async_execute_gets_y_in_dry_run(self, ex):
+        import asyncio
+
+        result = asyncio.run(ex.execute("apt-get install curl", add_sudo=True))
+        assert result.executed is False
+        assert result.command == "apt-get install -y curl"
+
     def test_systemctl_user_no_sudo_in_dry_run(self, ex):
         result = ex.execute_sync(
             "systemctl --user restart pipewire",
@@ -236,3 +282,14 @@ class TestExecuteSyncDryRun:
             check_idempotent=False,
         )
         assert not result.command.startswith("sudo")
+
+
+class TestShellRouting:
+    """Komendy z metaznakami powłoki idą przez /bin/sh -c."""
+
+    def test_trailing_comment_runs_through_shell(self):
+        ex = CommandExecutor(require_confirmation=False, dry_run=False)
+        result = ex.execute_sync(
+            "echo ok # restart service", add_sudo=False, check_idempotent=False
+        )
+        assert result.stdout.strip() == "ok"
@@ -5,14 +5,31 @@ Testy jednostkowe – Problem Graph, CommandExecutor, FixOrchestrator.
 from __future__ import annotations
 
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import patch
 
+from fixos.orchestrator import FixOrchestrator
 from fixos.orchestrator.graph import Problem, ProblemGraph
 from fixos.orchestrator.executor import (
     CommandExecutor,
     DangerousCommandError,
     ExecutionResult,
 )
+from tests.conftest import fake_response
+
+# Odpowiedź LLM budowana raz przy imporcie – FakeResponse jest niezmienny
+_MOCK_LLM_JSON = """{
+  "new_problems": [
+    {
+      "id": "p_sof",
+      "description": "Brak sof-firmware",
+      "severity": "critical",
+      "fix_commands": ["sudo dnf install sof-firmware"],
+      "related_to": []
+    }
+  ],
+  "explanation": "SOF firmware missing"
+}"""
+_MOCK_LLM_RESPONSE = fake_response(_MOCK_LLM_JSON, total_tokens=100)
 
 
 # ══════════════════════════════════════════════════════════
@@ -20,42 +37,36 @@ from fixos.orchestrator.executor import (
 # ══════════════════════════════════════════════════════════
 
 
+def _p(
+    pid: str,
+    severity: str = "info",
+    description: str = "test",
+    fix_commands: tuple[str, ...] = (),
+    **kw,
+) -> Problem:
+    """Problem z domyślnymi polami – testy podają tylko to, co sprawdzają."""
+    return Problem(
+        id=pid,
+        description=description,
+        severity=severity,
+        fix_commands=list(fix_commands),
+        **kw,
+    )
+
+
 class TestProblem:
     def test_is_actionable_pending(self):
-        p = Problem(
-            id="p1", description="test", severity="warning", fix_commands=["echo ok"]
-        )
-        assert p.is_actionable()
+        assert _p("p1", "warning", fix_commands=["echo ok"]).is_actionable()
 
     def test_is_actionable_resolved(self):
-        p = Problem(
-            id="p1",
-            description="test",
-            severity="warning",
-            fix_commands=[],
-            status="resolved",
-        )
-        assert not p.is_actionable()
+        assert not _p("p1", "warning", status="resolved").is_actionable()
 
     def test_is_actionable_max_attempts(self):
-        p = Problem(
-            id="p1",
-            description="test",
-            severity="warning",
-            fix_commands=[],
-            attempts=3,
-            max_attempts=3,
-        )
+        p = _p("p1", "warning", attempts=3, max_attempts=3)
         assert not p.is_actionable()
 
     def test_to_summary_keys(self):
-        p = Problem(
-            id="p1",
-            description="test",
-            severity="critical",
-            fix_commands=["dnf install x"],
-        )
-        s = p.to_summary()
+        s = _p("p1", "critical", fix_commands=["dnf install x"]).to_summary()
         assert s["id"] == "p1"
         assert s["severity"] == "critical"
         assert "fix_commands" in s
@@ -64,168 +75,111 @@ class TestProblem:
 class TestProblemGraph:
     def test_add_and_get(self):
         g = ProblemGraph()
-        p = Problem(id="p1", description="test", severity="warning", fix_commands=[])
+        p = _p("p1", "warning")
         g.add(p)
         assert g.get("p1") is p
 
     def test_next_actionable_no_deps(self):
         g = ProblemGraph()
-        p = Problem(id="p1", description="test", severity="critical", fix_commands=[])
+        p = _p("p1", "critical")
         g.add(p)
         assert g.next_actionable() is p
 
     def test_next_actionable_blocked_by_dep(self):
         g = ProblemGraph()
-        p1 = Problem(
-            id="p1",
-            description="root",
-            severity="critical",
-            fix_commands=[],
-            status="pending",
-        )
-        p2 = Problem(
-            id="p2",
-            description="child",
-            severity="warning",
-            fix_commands=[],
-            caused_by=["p1"],
-        )
-        g.add(p1)
-        g.add(p2)
+        g.add(_p("p1", "critical", "root", status="pending"))
+        g.add(_p("p2", "warning", "child", caused_by=["p1"]))
         # p2 jest zablokowane przez p1
         actionable = g.next_actionable()
         assert actionable.id == "p1"
 
     def test_next_actionable_dep_resolved(self):
         g = ProblemGraph()
-        p1 = Problem(
-            id="p1",
-            description="root",
-            severity="critical",
-            fix_commands=[],
-            status="resolved",
-        )
-        p2 = Problem(
-            id="p2",
-            description="child",
-            severity="warning",
-            fix_commands=[],
-            caused_by=["p1"],
-        )
-        g.add(p1)
-        g.add(p2)
+        g.add(_p("p1", "critical", "root", status="resolved"))
+        g.add(_p("p2", "warning", "child", caused_by=["p1"]))
         actionable = g.next_actionable()
         assert actionable.id == "p2"
 
     def test_all_done_when_all_resolved(self):
         g = ProblemGraph()
-        g.add(
-            Problem(
-                id="p1",
-                description="a",
-                severity="info",
-                fix_commands=[],
-                status="resolved",
-            )
-        )
-        g.add(
-            Problem(
-                id="p2",
-                description="b",
-                severity="info",
-                fix_commands=[],
-                status="failed",
-            )
-        )
+        g.add(_p("p1", status="resolved"))
+        g.add(_p("p2", status="failed"))
         assert g.all_done()
 
     def test_all_done_false_when_pending(self):
         g = ProblemGraph()
-        g.add(
-            Problem(
-                id="p1",
-                description="a",
-                severity="info",
-                fix_commands=[],
-                status="pending",
-            )
-        )
+        g.add(_p("p1", status="pending"))
         assert not g.all_done()
 
     def test_pending_count(self):
         g = ProblemGraph()
-        g.add(
-            Problem(
-                id="p1",
-                description="a",
-                severity="info",
-                fix_commands=[],
-                status="pending",
-            )
-        )
-        g.add(
-            Problem(
-                id="p2",
-                description="b",
-                severity="info",
-                fix_commands=[],
-                status="resolved",
-            )
-        )
+        g.add(_p("p1", status="pending"))
+        g.add(_p("p2", status="resolved"))
         assert g.pending_count() == 1
 
     def test_render_tree_not_empty(self):
         g = ProblemGraph()
-        g.add(
-            Problem(
-                id="p1",
-                description="Brak dźwięku",
-                severity="critical",
-                fix_commands=[],
-            )
-        )
+        g.add(_p("p1", "critical", "Brak dźwięku"))
         tree = g.render_tree()
         assert "p1" in tree
         assert "Brak dźwięku" in tree
         assert "🔴" in tree
 
-    def test_topological_order_critical_first(self):
+    def test_render_tree_deep_chain(self):
         g = ProblemGraph()
-        g.add(
-            Problem(id="p_info", description="info", severity="info", fix_commands=[])
-        )
-        g.add(
-            Problem(
-                id="p_crit",
-                description="critical",
-                severity="critical",
-                fix_commands=[],
-            )
-        )
-        g.add(
-            Problem(
-                id="p_warn", description="warning", severity="warning", fix_commands=[]
+        depth = 2000
+        for i in range(depth):
+            g.add(
+                _p(
+                    f"p{i}",
+                    caused_by=[f"p{i - 1}"] if i else [],
+                    may_cause=[f"p{i + 1}"] if i < depth - 1 else [],
+                )
             )
-        )
+        lines = g.render_tree().splitlines()
+        assert len(lines) == depth
+        assert lines[1].startswith("  └─ 🟢 [p1]")
+
+    def test_topological_order_critical_first(self):
+        g = ProblemGraph()
+        g.add(_p("p_info", "info"))
+        g.add(_p("p_crit", "critical"))
+        g.add(_p("p_warn", "warning"))
         # critical powinno być pierwsze
         assert g.execution_order[0] == "p_crit"
 
+    def test_all_actionable_returns_ready_layer(self):
+        g = ProblemGraph()
+        g.add(_p("p1", "info"))
+        g.add(_p("p2", "warning"))
+        g.add(_p("p3", "critical", caused_by=["p1"]))
+        assert [p.id for p in g.all_actionable()] == ["p2", "p1"]
+        g.get("p1").status = "resolved"
+        assert [p.id for p in g.all_actionable()] == ["p2", "p3"]
+
+    def test_unblocked_cache_reset_by_add(self):
+        g = ProblemGraph()
+        g.add(_p("p1"))
+        g.add(_p("p2", caused_by=["p1"]))
+        g.get("p1").status = "resolved"
+        assert g.next_actionable().id == "p2"
+        # Nowa zależność p2 – zapamiętane odblokowanie nie może jej przeskoczyć
+        g.add(_p("p0"))
+        g.get("p2").caused_by.append("p0")
+        g.add(g.get("p2"))
+        assert [p.id for p in g.all_actionable()] == ["p0"]
+
+    def test_execution_order_recalculated_after_add(self):
+        g = ProblemGraph()
+        g.add(_p("p1", "info"))
+        assert g.execution_order == ["p1"]
+        g.add(_p("p2", "critical"))
+        assert g.execution_order == ["p2", "p1"]
+
     def test_child_linked_to_parent(self):
         g = ProblemGraph()
-        parent = Problem(
-            id="p1",
-            description="parent",
-            severity="critical",
-            fix_commands=[],
-            status="resolved",
-        )
-        child = Problem(
-            id="p2",
-            description="child",
-            severity="warning",
-            fix_commands=[],
-            caused_by=["p1"],
-        )
+        parent = _p("p1", "critical", "parent", status="resolved")
+        child = _p("p2", "warning", "child", caused_by=["p1"])
         g.add(parent)
         g.add(child)
         assert "p1" in child.caused_by
@@ -236,49 +190,60 @@ class TestProblemGraph:
 # ══════════════════════════════════════════════════════════
 
 
+@pytest.fixture(scope="module")
+def executor() -> CommandExecutor:
+    """Bezstanowy CommandExecutor – wspólny dla testów klasyfikacji komend."""
+    return CommandExecutor()
+
+
 class TestCommandExecutor:
-    def test_is_dangerous_rm_rf_root(self):
-        ex = CommandExecutor()
-        dangerous, reason = ex.is_dangerous("rm -rf /")
+    def test_is_dangerous_rm_rf_root(self, executor):
+        dangerous, reason = executor.is_dangerous("rm -rf /")
         assert dangerous
         assert reason
 
-    def test_is_dangerous_safe_command(self):
-        ex = CommandExecutor()
-        dangerous, _ = ex.is_dangerous("dnf install sof-firmware")
+    def test_is_dangerous_safe_command(self, executor):
+        dangerous, _ = executor.is_dangerous("dnf install sof-firmware")
         assert not dangerous
 
-    def test_is_dangerous_dd_disk(self):
-        ex = CommandExecutor()
-        dangerous, _ = ex.is_dangerous("dd if=/dev/zero of=/dev/sda")
+    def test_is_dangerous_dd_disk(self, executor):
+        dangerous, _ = executor.is_dangerous("dd if=/dev/zero of=/dev/sda")
         assert dangerous
 
-    def test_is_dangerous_fork_bomb(self):
-        ex = CommandExecutor()
-        dangerous, _ = ex.is_dangerous(":(){ :|:& };:")
+    def test_is_dangerous_fork_bomb(self, executor):
+        dangerous, _ = executor.is_dangerous(":(){ :|:& };:")
         assert dangerous
 
-    def test_needs_sudo_dnf(self):
-        ex = CommandExecutor()
-        assert ex.needs_sudo("dnf install x")
+    def test_danger_literals_cover_every_pattern(self, executor):
+        import re
 
-    def test_needs_sudo_systemctl(self):
-        ex = CommandExecutor()
-        assert ex.needs_sudo("systemctl restart pipewire")
+        from fixos.orchestrator.executor import DANGEROUS_PATTERNS, _DANGER_LITERALS
 
-    def test_needs_sudo_already_has_sudo(self):
-        ex = CommandExecutor()
-        assert not ex.needs_sudo("sudo dnf install x")
+        for pattern, _ in DANGEROUS_PATTERNS:
+            literal_text = re.sub(r"\\(.)", r"\1", pattern).casefold()
+            assert any(lit in literal_text for lit in _DANGER_LITERALS), pattern
+        assert executor.is_dangerous("RM -RF /")[0]
+
+    def test_is_dangerous_multiline_command(self, executor):
+        dangerous, _ = executor.is_dangerous("dd if=/dev/zero \\\n  of=/dev/sda")
+        assert dangerous
 
-    def test_needs_sudo_echo(self):
-        ex = CommandExecutor()
-        assert not ex.needs_sudo("echo hello")
+    def test_needs_sudo_dnf(self, executor):
+        assert executor.needs_sudo("dnf install x")
 
-    def test_add_sudo(self):
-        ex = CommandExecutor()
-        assert ex.add_sudo("dnf install x") == "sudo dnf install x"
-        assert ex.add_sudo("echo hello") == "echo hello"
-        assert ex.add_sudo("sudo dnf install x") == "sudo dnf install x"
+    def test_needs_sudo_systemctl(self, executor):
+        assert executor.needs_sudo("systemctl restart pipewire")
+
+    def test_needs_sudo_already_has_sudo(self, executor):
+        assert not executor.needs_sudo("sudo dnf install x")
+
+    def test_needs_sudo_echo(self, executor):
+        assert not executor.needs_sudo("echo hello")
+
+    def test_add_sudo(self, executor):
+        assert executor.add_sudo("dnf install x") == "sudo dnf install x"
+        assert executor.add_sudo("echo hello") == "echo hello"
+        assert executor.add_sudo("sudo dnf install x") == "sudo dnf install x"
 
     def test_dry_run_returns_preview(self):
         ex = CommandExecutor(dry_run=True)
@@ -325,26 +290,15 @@ class TestCommandExecutor:
 # ══════════════════════════════════════════════════════════
 
 
-class TestFixOrchestrator:
-    @pytest.fixture
-    def mock_cfg(self):
-        from fixos.config import FixOsConfig
-
-        return FixOsConfig(
-            provider="gemini",
-            api_key="AIzaSy_FAKE_TOKEN_FOR_TESTING_1234567890",
-            model="gemini-2.5-flash-preview-04-17",
-            base_url="https://generativelanguage.googleapis.com/v1beta/openai/",
-            agent_mode="hitl",
-            session_timeout=60,
-            show_anonymized_data=False,
-            enable_web_search=False,
-        )
+@pytest.fixture(scope="module")
+def orch(mock_config):
+    """Orkiestrator dla testów czystych metod (bez ładowania grafu)."""
+    return FixOrchestrator(config=mock_config)
 
-    def test_load_from_dict(self, mock_cfg):
-        from fixos.orchestrator import FixOrchestrator
 
-        orch = FixOrchestrator(config=mock_cfg)
+class TestFixOrchestrator:
+    def test_load_from_dict(self, mock_config):
+        orch = FixOrchestrator(config=mock_config)
         problems = orch.load_from_dict(
             [
                 {
@@ -365,10 +319,8 @@ class TestFixOrchestrator:
         assert orch.graph.get("p1") is not None
         assert orch.graph.get("p2") is not None
 
-    def test_graph_render_after_load(self, mock_cfg):
-        from fixos.orchestrator import FixOrchestrator
-
-        orch = FixOrchestrator(config=mock_cfg)
+    def test_graph_render_after_load(self, mock_config):
+        orch = FixOrchestrator(config=mock_config)
         orch.load_from_dict(
             [
                 {
@@ -383,13 +335,10 @@ class TestFixOrchestrator:
         assert "p1" in tree
         assert "Brak dźwięku" in tree
 
-    def test_run_sync_dry_run_no_confirm(self, mock_cfg):
+    def test_run_sync_dry_run_no_confirm(self, mock_config):
         """Dry-run nie wymaga potwierdzenia i nie wykonuje komend."""
-        from fixos.orchestrator import FixOrchestrator
-        from fixos.orchestrator.executor import CommandExecutor
-
         executor = CommandExecutor(dry_run=True)
-        orch = FixOrchestrator(config=mock_cfg, executor=executor)
+        orch = FixOrchestrator(config=mock_config, executor=executor)
         orch.load_from_dict(
             [
                 {
@@ -416,52 +365,265 @@ class TestFixOrchestrator:
 
         assert summary["total"] == 1
 
-    @patch("fixos.providers.llm.openai")
-    def test_load_from_diagnostics_mock_llm(self, mock_openai, mock_cfg):
-        """load_from_diagnostics parsuje JSON z LLM."""
-        from fixos.orchestrator import FixOrchestrator
+    def test_blocked_command_not_fast_resolved(self, mock_config):
+        """Zablokowana komenda po udanej nie daje szybkiego werdyktu resolved."""
+        orch = FixOrchestrator(
+            config=mock_config, executor=CommandExecutor(require_confirmation=False)
+        )
+        orch.load_from_dict(
+            [
+                {
+                    "id": "p1",
+                    "description": "test",
+                    "fix_commands": ["echo ok", "rm -rf /"],
+                },
+            ]
+        )
+        evaluated = []
 
-        mock_resp = MagicMock()
-        mock_resp.choices[0].message.content = """{
-  "new_problems": [
-    {
-      "id": "p_sof",
-      "description": "Brak sof-firmware",
-      "severity": "critical",
-      "fix_commands": ["sudo dnf install sof-firmware"],
-      "related_to": []
-    }
-  ],
-  "explanation": "SOF firmware missing"
-}"""
-        mock_resp.usage.total_tokens = 100
-        mock_openai.OpenAI.return_value.chat.completions.create.return_value = mock_resp
+        def fake_eval(problem, result):
+            evaluated.append(result.stdout.strip())
+            problem.status = "failed"
+            return []
+
+        with patch.object(orch, "_evaluate_and_rediagnose", side_effect=fake_eval):
+            orch.run_sync(confirm_fn=lambda p, c: True)
+
+        assert evaluated == ["ok"]
+        assert orch.graph.get("p1").status == "failed"
+
+    def test_already_done_not_fast_resolved(self, mock_config, tmp_path):
+        """Stan spełniony przed naprawą nie daje szybkiego werdyktu resolved."""
+        orch = FixOrchestrator(
+            config=mock_config, executor=CommandExecutor(require_confirmation=False)
+        )
+        orch.load_from_dict(
+            [
+                {
+                    "id": "p1",
+                    "description": "test",
+                    "fix_commands": [f"mkdir -p {tmp_path}"],
+                },
+            ]
+        )
+        evaluated = []
+
+        def fake_eval(problem, result):
+            evaluated.append(result.executed)
+            problem.status = "failed"
+            return []
+
+        with patch.object(orch, "_evaluate_and_rediagnose", side_effect=fake_eval):
+            orch.run_sync(confirm_fn=lambda p, c: True)
+
+        assert evaluated == [False]
+        assert orch.graph.get("p1").status == "failed"
+
+    def _rm_then_mkdir(self, mock_config, path):
+        orch = FixOrchestrator(
+            config=mock_config, executor=CommandExecutor(require_confirmation=False)
+        )
+        orch.load_from_dict(
+            [
+                {
+                    "id": "p1",
+                    "description": "test",
+                    "fix_commands": [f"rm -rf {path}", f"mkdir -p {path}"],
+                },
+            ]
+        )
+        return orch
+
+    def test_state_rechecked_after_executed_command(self, mock_config, tmp_path):
+        """Wynik sprawdzenia sprzed pętli nie pomija mkdir po wykonanym rm."""
+        target = tmp_path / "d"
+        target.mkdir()
+        orch = self._rm_then_mkdir(mock_config, target)
+        results = []
+
+        with patch.object(orch, "_evaluate_and_rediagnose", return_value=[]):
+            orch.run_sync(
+                confirm_fn=lambda p, c: True,
+                progress_fn=lambda p, r: results.append(r),
+            )
+
+        assert target.is_dir()
+        assert [r.executed for r in results] == [True, True]
+
+    def test_state_rechecked_after_executed_command_async(self, mock_config, tmp_path):
+        import asyncio
+
+        target = tmp_path / "d"
+        target.mkdir()
+        orch = self._rm_then_mkdir(mock_config, target)
+        results = []
+
+        with patch.object(orch, "_evaluate_and_rediagnose", return_value=[]):
+            asyncio.run(
+                orch.run_async(
+                    confirm_fn=lambda p, c: True,
+                    progress_fn=lambda p, r: results.append(r),
+                )
+            )
+
+        assert target.is_dir()
+        assert [r.executed for r in results] == [True, True]
 
-        orch = FixOrchestrator(config=mock_cfg)
+    def test_run_async_dry_run(self, mock_config):
+        """run_async wykonuje komendy przez async executor i ocenia wynik."""
+        import asyncio
+
+        orch = FixOrchestrator(
+            config=mock_config, executor=CommandExecutor(dry_run=True)
+        )
+        orch.load_from_dict(
+            [
+                {"id": "p1", "description": "test", "fix_commands": ["echo test"]},
+                {"id": "p2", "description": "other", "fix_commands": ["echo 2"]},
+            ]
+        )
+        results = []
+
+        def fake_eval(problem, result):
+            problem.status = "resolved"
+            return []
+
+        with patch.object(orch, "_evaluate_and_rediagnose", side_effect=fake_eval):
+            summary = asyncio.run(
+                orch.run_async(
+                    confirm_fn=lambda p, c: True,
+                    progress_fn=lambda p, r: results.append(r),
+                )
+            )
+
+        assert summary["by_status"] == {"resolved": ["p1", "p2"]}
+        assert sorted(r.preview for r in results) == [
+            "[DRY-RUN] echo 2",
+            "[DRY-RUN] echo test",
+        ]
+
+    def test_run_async_updates_graph_on_loop_thread(self, mock_config):
+        import asyncio
+        import threading
+
+        orch = FixOrchestrator(
+            config=mock_config, executor=CommandExecutor(dry_run=True)
+        )
+        orch.load_from_dict(
+            [
+                {"id": "p1", "description": "a", "fix_commands": ["echo 1"]},
+                {"id": "p2", "description": "b", "fix_commands": ["echo 2"]},
+            ]
+        )
+        adders = []
+        add = ProblemGraph.add
+
+        def record_add(graph, problem):
+            adders.append(threading.current_thread())
+            add(graph, problem)
+
+        def fake_eval(problem, result):
+            problem.status = "resolved"
+            return [Problem(f"{problem.id}_new", "nowy", "info", [], "resolved")]
+
+        with (
+            patch.object(orch, "_evaluate_and_rediagnose", side_effect=fake_eval),
+            patch.object(ProblemGraph, "add", autospec=True, side_effect=record_add),
+        ):
+            asyncio.run(orch.run_async(confirm_fn=lambda p, c: True))
+
+        assert adders == [threading.main_thread()] * 2
+        assert orch.graph.get("p1").may_cause == ["p1_new"]
+
+    def test_run_async_package_commands_not_parallel(self, mock_config):
+        import asyncio
+
+        executor = CommandExecutor(dry_run=True)
+        orch = FixOrchestrator(config=mock_config, executor=executor)
+        orch.load_from_dict(
+            [
+                {
+                    "id": f"p{i}",
+                    "description": "pkg",
+                    "fix_commands": [f"sudo apt-get install pkg{i}"],
+                }
+                for i in range(3)
+            ]
+        )
+        running = []
+        peak = []
+
+        async def fake_execute(cmd):
+            running.append(cmd)
+            peak.append(len(running))
+            await asyncio.sleep(0.01)
+            running.remove(cmd)
+            return ExecutionResult(command=cmd, executed=True)
+
+        with (
+            patch.object(executor, "execute", side_effect=fake_execute),
+            patch.object(orch, "_evaluate_and_rediagnose", return_value=[]),
+        ):
+            asyncio.run(orch.run_async(confirm_fn=lambda p, c: True))
+
+        assert len(peak) == 3 and max(peak) == 1
+
+    def test_load_from_diagnostics_mock_llm(self, fake_openai, mock_config):
+        """load_from_diagnostics parsuje JSON z LLM."""
+        fake_openai.response = _MOCK_LLM_RESPONSE
+
+        orch = FixOrchestrator(config=mock_config)
         problems = orch.load_from_diagnostics({"system": {"os_release": "Fedora 40"}})
 
         assert len(problems) == 1
         assert problems[0].id == "p_sof"
         assert problems[0].severity == "critical"
 
-    def test_parse_json_clean(self, mock_cfg):
-        from fixos.orchestrator import FixOrchestrator
+    def test_session_log_bounded(self, mock_config):
+        from dataclasses import replace
+
+        orch = FixOrchestrator(config=replace(mock_config, session_log_max=2))
+        for i in range(3):
+            orch._log("event", {"i": i})
+        assert [e["i"] for e in orch.session_log] == [1, 2]
+        assert orch._session_summary()["log_entries"] == 3
+
+    def test_fast_verdict(self):
+        verdict = FixOrchestrator._fast_verdict
+        assert verdict(ExecutionResult(command="x", stdout="ok")) == "resolved"
+        assert verdict(ExecutionResult(command="x", stderr="warn")) is None
+        assert verdict(ExecutionResult(command="x", returncode=1)) is None
+        assert (
+            verdict(
+                ExecutionResult(
+                    command="x",
+                    executed=False,
+                    stdout="(już wykonane – stan aktualny)",
+                )
+            )
+            is None
+        )
+        assert (
+            verdict(ExecutionResult(command="x", executed=False, preview="p")) is None
+        )
 
-        orch = FixOrchestrator(config=mock_cfg)
+    def test_parse_json_clean(self, orch):
         data = orch._parse_json('{"key": "value"}')
         assert data["key"] == "value"
 
-    def test_parse_json_with_markdown_fence(self, mock_cfg):
-        from fixos.orchestrator import FixOrchestrator
-
-        orch = FixOrchestrator(config=mock_cfg)
+    def test_parse_json_with_markdown_fence(self, orch):
         raw = '```json\n{"key": "value"}\n```'
         data = orch._parse_json(raw)
         assert data["key"] == "value"
 
-    def test_parse_json_invalid_raises(self, mock_cfg):
-        from fixos.orchestrator import FixOrchestrator
+    def test_parse_json_fence_variants(self, orch):
+        assert orch._parse_json('```JSON\n{"a": 1}\n```') == {"a": 1}
+        assert orch._parse_json('```{"a": 2}```') == {"a": 2}
 
-        orch = FixOrchestrator(config=mock_cfg)
+    def test_parse_json_invalid_raises(self, orch):
         with pytest.raises(ValueError):
             orch._parse_json("not json at all")
+
+    def test_parse_json_embedded_in_text(self, orch):
+        raw = 'Sure {broken. Here: {"verdict": "resolved"} and {"x": 1}'
+        assert orch._parse_json(raw) == {"verdict": "resolved"}